@@ -0,0 +1,112 @@
+"""
+Collection backends side by side on the local mock revenue site: the Selenium scraper
+(data_collection.collect_parallel, headless Chrome) and the HTTP backend (http_collection)
+collect the same synthetic sales into fresh databases, and the time, pages/min and stored
+rows of each are printed. Both databases must end up with the same sales_data rows.
+
+    python benchmarks/collection_benchmark.py --rows 3000 --days 60 --workers 4 --latency 0.05
+
+--latency adds a delay to every grid response, closer to the real site than a local server.
+The Selenium run is skipped when Chrome cannot be started.
+"""
+import sqlite3
+import tempfile
+import time
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from benchmarks.synthetic_data import generate_sales
+from util.time_select import get_all_year_months
+from data_processing import data_collection
+from data_processing.http_collection import HttpCollector
+from data_processing.mock_revenue_site import serve_site
+from data_processing.sales_store import connect_db, SalesWriter, SALES_KEY
+
+def collected(db_path, months: int):
+    """
+    Rows stored and pages loaded: one month query per month plus one detail page per day with sales,
+    counted the same way for both backends
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f"SELECT {', '.join(SALES_KEY)} FROM sales_data ORDER BY {', '.join(SALES_KEY)}").fetchall()
+    days = conn.execute("SELECT COUNT(*) FROM scrape_progress WHERE Rows > 0").fetchone()[0]
+    conn.close()
+    return rows, months + days
+
+def run_http(login_url: str, db_path, workers: int, year_months: list):
+    collector = HttpCollector(login_url, workers= workers)
+    collector.login('mock', 'mock')
+    conn = connect_db(db_path)
+    try:
+        with SalesWriter(conn) as writer:
+            collector.collect(writer, year_months= year_months)
+    finally:
+        conn.close()
+
+def run_selenium(login_url: str, db_path, workers: int, year_months: list):
+    data_collection.collect_parallel(db_path, workers= workers, year_months= year_months,
+                                     credentials= {'username': 'mock', 'password': 'mock', 'login_url': login_url})
+
+def chrome_available():
+    try:
+        driver = data_collection.get_chrome_driver(headless= True)
+    except Exception as e:
+        print(f"Selenium skipped, Chrome is not available: {e}")
+        return False
+    driver.quit()
+    return True
+
+def benchmark(rows: int = 3000, start: str = '2024-01-01', days: int = 60, workers: int = 4, latency: float = 0,
+              backends: list = None):
+    """
+    Collect the same synthetic sales with each backend. Returns {backend: (seconds, pages, rows)}.
+    """
+    sales = generate_sales(rows, start= start, days= days, seed= 0)
+    sales = sales.astype({'Equipment': str, 'Channel': str, 'Amount': str})
+    first, last = sales['Time'].min(), sales['Time'].max()
+    year_months = get_all_year_months(first.year, first.month, last.year, last.month)
+    runners = {'http': run_http, 'selenium': run_selenium}
+    backends = backends or list(runners)
+    if 'selenium' in backends and not chrome_available():
+        backends = [backend for backend in backends if backend != 'selenium']
+
+    server = serve_site(sales, latency= latency)
+    login_url = f"http://127.0.0.1:{server.server_port}/login"
+    results = {}
+    stored = {}
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for backend in backends:
+                db_path = Path(work_dir) / f'{backend}.db'
+                start_time = time.perf_counter()
+                runners[backend](login_url, db_path, workers, year_months)
+                elapsed = time.perf_counter() - start_time
+                stored[backend], pages = collected(db_path, len(year_months))
+                results[backend] = (elapsed, pages, len(stored[backend]))
+    finally:
+        server.shutdown()
+
+    print(f"\n{len(sales)} transactions in {len(year_months)} months, {workers} workers, {latency}s latency")
+    print(f"{'backend':<10}{'seconds':>10}{'pages':>8}{'pages/min':>12}{'rows':>8}")
+    for backend, (elapsed, pages, stored_rows) in results.items():
+        print(f"{backend:<10}{elapsed:>10.2f}{pages:>8}{pages / max(elapsed, 1e-9) * 60:>12.0f}{stored_rows:>8}")
+    if len(stored) > 1 and len({tuple(backend_rows) for backend_rows in stored.values()}) > 1:
+        raise AssertionError("the backends stored different sales_data rows")
+    missing = [backend for backend, (_, _, stored_rows) in results.items() if stored_rows != len(sales)]
+    if missing:
+        raise AssertionError(f"{', '.join(missing)} stored fewer rows than the site has")
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Time the Selenium and HTTP collection backends on the mock revenue site')
+    arg_parser.add_argument('--rows', type=int, default=3000, help='synthetic transactions')
+    arg_parser.add_argument('--start', default='2024-01-01')
+    arg_parser.add_argument('--days', type=int, default=60)
+    arg_parser.add_argument('--workers', type=int, default=4, help='browser sessions / concurrent requests')
+    arg_parser.add_argument('--latency', type=float, default=0, help='seconds before each grid response')
+    arg_parser.add_argument('--backends', nargs='+', choices=['http', 'selenium'])
+    args = arg_parser.parse_args()
+    benchmark(args.rows, args.start, args.days, args.workers, args.latency, args.backends)
@@ -0,0 +1,98 @@
+"""
+detailGrid extraction (data_processing.detail_grid.extract_detail_rows, a fragment parsed
+with lxml or BeautifulSoup) against the original full-page BeautifulSoup parse, on saved
+revenue pages or synthetic ones (synthetic_page):
+
+    python benchmarks/detail_grid_benchmark.py page1.html page2.html
+    python benchmarks/detail_grid_benchmark.py --synthetic 300 --pages 20
+"""
+import re
+import time
+from html import escape
+import numpy as np
+from bs4 import BeautifulSoup
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.detail_grid import extract_detail_rows, lxml, DETAIL_COLUMNS
+
+def extract_with_full_soup(html: str):
+    """
+    The original path: parse the whole page, then regex-match the row classes
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find('table', id = "detailGrid")
+    rows = table.find_all('tr', class_=re.compile(r'ui-widget-content jqgrow ui-row-ltr'))
+    return [[cell.get_text(strip=True) for cell in row.find_all('td')] for row in rows]
+
+SYNTHETIC_EQUIPMENT = ['【01上】洗脫烘(中)', '【03下】洗脫烘(大)', '【08上】烘衣機', '儲值 / 兌幣機', '販賣機']
+SYNTHETIC_CHANNELS = ['投幣', '行動支付', '會員儲值']
+
+def synthetic_page(rows: int = 300, seed: int = 0, filler: int = 200):
+    """
+    Revenue page HTML with a jqGrid detailGrid of `rows` random transactions, for the
+    benchmark and tests (tests/fixtures/detail_grid_page.html is synthetic_page(40, 0, filler=20)).
+    Around the grid are `filler` rows of another table, like the month grid and menus of
+    a saved page. Every 5th amount cell nests its unit in a span
+    with extra whitespace and every 7th equipment cell wraps over lines, the cases where
+    text extraction can differ between parsers.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, 1440, rows))
+    grid_rows = []
+    for i, minute in enumerate(minutes):
+        equipment = escape(SYNTHETIC_EQUIPMENT[rng.integers(len(SYNTHETIC_EQUIPMENT))])
+        channel = SYNTHETIC_CHANNELS[rng.integers(len(SYNTHETIC_CHANNELS))]
+        amount = int(rng.choice([-60, 10, 20, 40, 60, 100]))
+        unit = '點' if rng.random() < 0.2 else '元'
+        if i % 7 == 3:
+            equipment = f"\n            {equipment}\n        "
+        amount_cell = f" {amount} <span class=\"unit\"> {unit} </span>&nbsp;" if i % 5 == 2 else f"{amount}{unit}"
+        cells = [f"{minute // 60:02d}:{minute % 60:02d}", equipment, channel, amount_cell]
+        grid_rows.append(f'<tr role="row" id="{i + 1}" tabindex="-1" class="ui-widget-content jqgrow ui-row-ltr">'
+                         + ''.join(f'<td role="gridcell" aria-describedby="detailGrid_{column}">{cell}</td>'
+                                   for column, cell in zip(DETAIL_COLUMNS, cells))
+                         + '</tr>')
+    filler_rows = ''.join(f'<tr class="jqgrow ui-row-ltr"><td title="2024/01/{i % 28 + 1:02d}">{i}</td>'
+                          f'<td><a href="#" class="menu-link">item {i}</a></td></tr>' for i in range(filler))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Revenue</title>
+<script>var config = {{"grid": "detailGrid", "rows": {rows}}};</script></head>
+<body>
+<div class="menu">{''.join(f'<div class="menu-item" href="/page/{i}">Page {i}</div>' for i in range(50))}</div>
+<table id="monthGrid">{filler_rows}</table>
+<div class="ui-jqdialog"><table id="detailGrid" class="ui-jqgrid-btable" role="presentation"><tbody>
+<tr class="jqgfirstrow" role="row"><td role="gridcell"></td><td role="gridcell"></td><td role="gridcell"></td><td role="gridcell"></td></tr>
+{''.join(grid_rows)}
+</tbody></table></div>
+</body></html>"""
+
+def benchmark(pages: list, repeat: int = 5):
+    """
+    Time the full-page BeautifulSoup parse against extract_detail_rows on saved pages
+    """
+    for name, extract in [('full page BeautifulSoup', extract_with_full_soup),
+                          (f"fragment {'lxml' if lxml is not None else 'BeautifulSoup'}", extract_detail_rows)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = [extract(html) for html in pages]
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{name:>28}: {elapsed * 1000:8.1f} ms for {len(pages)} pages, {sum(map(len, rows))} rows")
+    return rows
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Benchmark detailGrid extraction on saved or synthetic pages')
+    arg_parser.add_argument('pages', nargs='*', help='saved revenue page HTML files')
+    arg_parser.add_argument('--synthetic', type=int, metavar='ROWS', help='use synthetic pages with this many rows')
+    arg_parser.add_argument('--pages', type=int, default=20, dest='page_count', help='number of synthetic pages')
+    args = arg_parser.parse_args()
+    if args.synthetic:
+        pages = [synthetic_page(args.synthetic, seed) for seed in range(args.page_count)]
+    elif args.pages:
+        pages = [open(path, encoding='utf-8').read() for path in args.pages]
+    else:
+        arg_parser.error('give saved pages or --synthetic ROWS')
+    benchmark(pages)
@@ -0,0 +1,287 @@
+"""
+Benchmarks of every pipeline stage on a synthetic sales database.
+
+The stages run in pipeline order, each on a fresh copy of the previous stage's output:
+
+    read_df_from_db -> split_amount -> correct_datatypes -> add_date_columns
+    -> clean_equipment_column -> earnings_overview / analyze_cny_sales
+
+plus cleaning_main, the whole incremental cleaning run (data_cleaning.main with a full
+rebuild and the rollups) on a copy of the database.
+
+Each stage is timed (best of --repeat runs), then run once more under tracemalloc for its
+peak memory. A signature of its output (row count and a hash of the values, or the test
+statistics) tells whether the results changed. --save-baseline stores everything as JSON;
+later runs print the ratios against that baseline and exit with 1 on a slowdown beyond
+--tolerance or on changed results.
+
+No baseline is committed: timings only compare on the machine that recorded them, so save
+one locally first. With --compare, a missing baseline, or one run with other settings, is
+an error instead of a note, so a regression check cannot pass without comparing anything.
+
+    python benchmarks/run_benchmarks.py --rows 1000000 --save-baseline
+    python benchmarks/run_benchmarks.py --rows 1000000 --compare
+"""
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from benchmarks.synthetic_data import write_sales_db, default_days, START_DATE
+from data_processing import data_cleaning
+from data_processing.data_cleaning import (read_df_from_db, correct_datatypes, add_date_columns,
+                                           clean_equipment_column, RAW_COLUMNS)
+from data_processing.data_analysis import earnings_overview
+from stats.hypothesis_testing import analyze_cny_sales
+
+BASELINE_PATH = project_root / 'benchmarks' / 'baseline.json'
+STAGE_NAMES = ['read_df_from_db', 'split_amount', 'correct_datatypes', 'add_date_columns',
+               'clean_equipment_column', 'earnings_overview', 'analyze_cny_sales', 'cleaning_main']
+
+def frame_signature(df: pd.DataFrame):
+    """
+    Row count and a hash of the values; floats are rounded so that summation order
+    differences between library versions do not count as changes
+    """
+    df = df.reset_index(drop=True)
+    floats = df.select_dtypes('float').columns
+    df[floats] = df[floats].round(6)
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return {'rows': len(df), 'hash': hashlib.sha1(hashed.tobytes()).hexdigest()[:16]}
+
+def _rounded(value):
+    # NaN (e.g. no Chinese New Year in the data) as None, which equals itself after a JSON round trip
+    value = float(value)
+    return None if np.isnan(value) else round(value, 6)
+
+def results_signature(results: dict):
+    """Scalar test results, rounded"""
+    signature = {}
+    for key, value in results.items():
+        if isinstance(value, tuple):
+            signature[key] = [_rounded(v) for v in value]
+        elif np.isscalar(value):
+            signature[key] = _rounded(value)
+    return signature
+
+def database_signature(db_path):
+    """Rows and amount totals of the tables the cleaning run writes"""
+    conn = sqlite3.connect(db_path)
+    signature = {table: list(conn.execute(f"SELECT COUNT(*), SUM(Amount) FROM {table}").fetchone())
+                 for table in ['clean_sales_data', 'daily_sales_rollup', 'monthly_sales_rollup']}
+    conn.close()
+    return signature
+
+def _copy(df):
+    return df.copy()
+
+def pipeline_stages(db_path, work_dir, n_resamples: int = 0):
+    """
+    (name, prepare, run, signature) of every stage. prepare turns the previous stage's
+    output into this stage's input outside the timing, run is timed.
+    """
+    def split_amount(df):
+        # the unit split of data_cleaning.clean_sales_df
+        df[['Amount', 'Unit']] = df['Amount'].str.extract(r'(-?\d+)(\D+)')
+        return df
+
+    def copy_database(_):
+        copy_path = Path(work_dir) / 'cleaning_main.db'
+        shutil.copyfile(db_path, copy_path)
+        return str(copy_path)
+
+    def cleaning_main(path):
+        data_cleaning.main(path, full_rebuild= True, export= False)
+        return path
+
+    return [
+        ('read_df_from_db', lambda _: None, lambda _: read_df_from_db(db_path, 'sales_data', columns= RAW_COLUMNS), frame_signature),
+        ('split_amount', _copy, split_amount, frame_signature),
+        ('correct_datatypes', _copy, lambda df: correct_datatypes(df, numeric_colmns= ['Amount'], date_columns= ['Time']), frame_signature),
+        ('add_date_columns', _copy, add_date_columns, frame_signature),
+        ('clean_equipment_column', _copy, clean_equipment_column, frame_signature),
+        # both analysis stages read the clean rows, not each other's output
+        ('earnings_overview', _copy, lambda df: (earnings_overview(df), df), lambda result: frame_signature(result[0])),
+        ('analyze_cny_sales', lambda result: result[1].copy(), lambda df: analyze_cny_sales(df, n_resamples= n_resamples, workers= 1),
+         lambda result: results_signature(result[0])),
+        ('cleaning_main', copy_database, cleaning_main, database_signature),
+    ]
+
+def measure(prepare, run, previous, repeat: int = 3, memory: bool = True):
+    """
+    Best time of `repeat` runs and the tracemalloc peak (bytes) of one more run.
+    Returns (seconds, peak bytes or None, output of the last run).
+    """
+    seconds = []
+    for _ in range(repeat):
+        stage_input = prepare(previous)
+        start = time.perf_counter()
+        output = run(stage_input)
+        seconds.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        stage_input = prepare(previous)
+        tracemalloc.start()
+        output = run(stage_input)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(seconds), peak, output
+
+def run_benchmarks(db_path, rows: int, stages: list = None, repeat: int = 3, memory: bool = True, n_resamples: int = 0):
+    """
+    Run the pipeline stages on db_path. Stages not in `stages` still run once (untimed)
+    when a later stage needs their output.
+
+    Returns {stage: {seconds, rows_per_second, peak_mb, signature}}
+    """
+    stages = stages or STAGE_NAMES
+    last = max(STAGE_NAMES.index(name) for name in stages)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        output = None
+        for name, prepare, run, signature in pipeline_stages(db_path, work_dir, n_resamples)[:last + 1]:
+            if name not in stages:
+                output = run(prepare(output))
+                continue
+            seconds, peak, output = measure(prepare, run, output, repeat, memory)
+            results[name] = {
+                'seconds': round(seconds, 4),
+                'rows_per_second': round(rows / seconds) if seconds > 0 else None,
+                'peak_mb': None if peak is None else round(peak / 2**20, 1),
+                'signature': signature(output),
+            }
+            print(f"{name:>24}: {seconds:8.3f}s {results[name]['rows_per_second'] or 0:>12,} rows/s"
+                  + ('' if peak is None else f" {peak / 2**20:9.1f} MB peak"))
+    return results
+
+def environment(rows: int, days: int, seed: int, n_resamples: int):
+    """Settings that decide whether results and timings are comparable"""
+    return {
+        'rows': rows,
+        'days': days,
+        'seed': seed,
+        'n_resamples': n_resamples,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def compare_to_baseline(results: dict, settings: dict, baseline: dict, tolerance: float = 0.25):
+    """
+    Time and memory ratios against the baseline, per stage. Only a baseline run on the
+    same data (rows, days, seed, n_resamples) is compared; timings at another scale say
+    little about a regression.
+
+    Returns (comparison DataFrame, True if a stage got slower than 1 + tolerance or its results changed)
+    """
+    keys = ['rows', 'days', 'seed', 'n_resamples']
+    base_settings = baseline['settings']
+    if any(settings[key] != base_settings.get(key) for key in keys):
+        print(f"Baseline was run with {', '.join(f'{key}={base_settings.get(key)}' for key in keys)}, "
+              f"rerun with the same settings or --save-baseline.")
+        return pd.DataFrame(), False
+    rows = []
+    for name, result in results.items():
+        base = baseline['stages'].get(name)
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds']
+        results_changed = result['signature'] != base['signature']
+        memory_ratio = (result['peak_mb'] / base['peak_mb']
+                        if result['peak_mb'] is not None and base.get('peak_mb') else np.nan)
+        rows.append({
+            'stage': name,
+            'seconds': result['seconds'],
+            'baseline_seconds': base['seconds'],
+            'time_ratio': round(time_ratio, 2),
+            'memory_ratio': round(memory_ratio, 2),
+            'slower': time_ratio > 1 + tolerance,
+            'results_changed': results_changed,
+        })
+    comparison = pd.DataFrame(rows).set_index('stage') if rows else pd.DataFrame()
+    regressed = bool(len(comparison)) and bool((comparison['slower'] | comparison['results_changed']).any())
+    return comparison, regressed
+
+def main(rows: int = 100_000, seed: int = 0, days: int = None, db_path: str = None, stages: list = None,
+         repeat: int = 3, memory: bool = True, n_resamples: int = 0, baseline_path = BASELINE_PATH,
+         save_baseline: bool = False, tolerance: float = 0.25, compare: bool = False):
+    """
+    db_path: synthetic database to reuse (written there first if missing), a temporary one when None
+    compare: the baseline must exist and match the settings, checked before anything runs
+    Returns True if the run regressed against the baseline (or had nothing to compare with, with compare)
+    """
+    baseline_path = Path(baseline_path)
+    if compare and not save_baseline and not baseline_path.exists():
+        raise FileNotFoundError(f"No baseline at {baseline_path}, run with --save-baseline first.")
+    days = default_days(rows) if days is None else days
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(db_path or Path(temp_dir) / 'sales.db')
+        if not db_path.exists():
+            start = time.perf_counter()
+            write_sales_db(db_path, rows, START_DATE, days, seed)
+            print(f"Generated {rows:,} rows over {days} days in {time.perf_counter() - start:.1f}s: {db_path}")
+        conn = sqlite3.connect(db_path)
+        stored_rows = conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0]
+        conn.close()
+        if stored_rows != rows:
+            raise ValueError(f"{db_path} holds {stored_rows} rows, not --rows {rows}")
+        results = run_benchmarks(db_path, rows, stages, repeat, memory, n_resamples)
+
+    settings = environment(rows, days, seed, n_resamples)
+    if save_baseline:
+        baseline_path.write_text(json.dumps({'settings': settings, 'stages': results}, ensure_ascii=False, indent=1))
+        print(f"Baseline saved to {baseline_path}")
+        return False
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}, run with --save-baseline first.")
+        return False
+    comparison, regressed = compare_to_baseline(results, settings, json.loads(baseline_path.read_text()), tolerance)
+    if len(comparison):
+        print(comparison.to_string())
+    elif compare:
+        print("Nothing compared against the baseline.")
+        return True
+    if regressed:
+        print("Regression against the baseline.")
+    return regressed
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Time every pipeline stage on synthetic sales data')
+    arg_parser.add_argument('--rows', type=int, default=100_000, help='synthetic transactions, e.g. 10000 to 50000000')
+    arg_parser.add_argument('--days', type=int, help='days covered, default: see synthetic_data.default_days')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--db-path', help='keep the synthetic database here and reuse it on the next run')
+    arg_parser.add_argument('--stages', nargs='+', choices=STAGE_NAMES, help='only time these stages')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    arg_parser.add_argument('--resamples', type=int, default=0, help='n_resamples of analyze_cny_sales')
+    arg_parser.add_argument('--baseline', default=str(BASELINE_PATH))
+    arg_parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    arg_parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown, 0.25 = 25%%')
+    arg_parser.add_argument('--compare', action='store_true',
+                            help='fail unless the run is compared against a baseline with the same settings')
+    args = arg_parser.parse_args()
+    if args.compare and not args.save_baseline and not Path(args.baseline).exists():
+        arg_parser.error(f"no baseline at {args.baseline}, run with --save-baseline first")
+    regressed = main(rows= args.rows, seed= args.seed, days= args.days, db_path= args.db_path, stages= args.stages,
+                     repeat= args.repeat, memory= not args.no_memory, n_resamples= args.resamples,
+                     baseline_path= args.baseline, save_baseline= args.save_baseline, tolerance= args.tolerance,
+                     compare= args.compare)
+    sys.exit(1 if regressed else 0)
@@ -0,0 +1,138 @@
+"""
+Synthetic sales_data rows for benchmarks, shaped like the scraped revenue pages.
+
+Rows use the store's equipment names (【NN上】洗脫烘(中), 烘衣機, 儲值 / 兌幣機, ...), amounts
+as text with their unit ("60元", "-60點") including refunds, and transaction times that
+follow a daily and weekly rhythm. Everything is drawn with numpy from a seeded generator,
+so the same (rows, seed) always gives the same table.
+
+    python benchmarks/synthetic_data.py /tmp/sales.db --rows 1000000
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.sales_store import SALES_KEY, create_sales_table
+
+# (equipment name, share of transactions, amounts it is paid with)
+EQUIPMENT = [
+    ('【01上】洗脫烘(中)', 0.09, [60, 70, 80]),
+    ('【02上】洗脫烘(中)', 0.09, [60, 70, 80]),
+    ('【03下】洗脫烘(大)', 0.08, [80, 100, 120]),
+    ('【04下】洗脫烘(大)', 0.08, [80, 100, 120]),
+    ('【05上】洗脫(中)', 0.07, [40, 50]),
+    ('【06下】洗脫(大)', 0.06, [50, 60]),
+    ('【07】洗鞋機', 0.02, [50]),
+    ('【08上】烘衣機', 0.10, [10, 20, 30, 40]),
+    ('【09上】烘衣機', 0.10, [10, 20, 30, 40]),
+    ('【10下】烘衣機', 0.09, [10, 20, 30, 40]),
+    ('儲值 / 兌幣機', 0.14, [100, 200, 500, 1000]),
+    ('販賣機', 0.06, [20, 25, 35]),
+    ('【11】烘鞋機', 0.02, [20, 30]),
+]
+CHANNELS = ['投幣', '行動支付', '會員儲值']
+CHANNEL_SHARES = [0.6, 0.25, 0.15]
+# share of 點 (stored-value points) among the units, the rest is 元
+POINT_SHARE = 0.2
+# refunds and corrections are stored as negative amounts
+REFUND_SHARE = 0.01
+# relative traffic by hour of day and by weekday (Monday first)
+HOUR_WEIGHTS = np.array([2, 1, 1, 0.5, 0.5, 0.5, 1, 2, 3, 4, 4, 4, 4, 4, 4, 4, 5, 6, 7, 8, 8, 7, 5, 3], dtype=float)
+WEEKDAY_WEIGHTS = np.array([0.9, 0.85, 0.85, 0.9, 1.0, 1.3, 1.3])
+START_DATE = '2023-09-01'
+ROWS_PER_DAY = 300
+
+def default_days(rows: int):
+    """
+    Days spanned by `rows` transactions at a store's ROWS_PER_DAY, at least 400 so every
+    table covers a Chinese New Year and at most 10 years, after which days just get busier
+    """
+    return int(np.clip(rows // ROWS_PER_DAY, 400, 3650))
+
+def generate_sales(rows: int, start = START_DATE, days: int = None, seed: int = 0, first_day: int = 0):
+    """
+    Raw sales_data rows (Time, Equipment, Channel, Amount, Seq) on the days
+    [first_day, first_day + days) after start, sorted by Time.
+    """
+    rng = np.random.default_rng(seed)
+    days = default_days(rows) if days is None else days
+    start = pd.Timestamp(start) + pd.Timedelta(days= first_day)
+    weekday = (start.weekday() + np.arange(days)) % 7
+    day = rng.choice(days, size= rows, p= WEEKDAY_WEIGHTS[weekday] / WEEKDAY_WEIGHTS[weekday].sum())
+    hour = rng.choice(24, size= rows, p= HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    # the pages show minutes only
+    minutes = day * 1440 + hour * 60 + rng.integers(0, 60, size= rows)
+    minutes.sort()
+    time = start.to_datetime64().astype('datetime64[m]') + minutes
+
+    names, shares, prices = zip(*EQUIPMENT)
+    equipment = rng.choice(len(names), size= rows, p= np.array(shares) / sum(shares))
+    # each machine draws from its own prices: index into a padded (machine, price) table
+    price_table = np.array([p + [p[-1]] * (max(map(len, prices)) - len(p)) for p in prices])
+    price = price_table[equipment, (rng.random(rows) * np.array(list(map(len, prices)))[equipment]).astype(int)]
+    amount = np.where(rng.random(rows) < REFUND_SHARE, -price, price)
+    points = rng.random(rows) < POINT_SHARE
+    channel = rng.choice(len(CHANNELS), size= rows, p= CHANNEL_SHARES)
+    # only a few dozen distinct "amount+unit" texts: format each once and index
+    amount_units, amount_codes = np.unique(amount * 2 + points, return_inverse= True)
+    amount_texts = [f"{key // 2}{'點' if key % 2 else '元'}" for key in amount_units.tolist()]
+
+    df = pd.DataFrame({
+        'Time': time.astype('datetime64[s]'),
+        'Equipment': pd.Categorical.from_codes(equipment, list(names)),
+        'Channel': pd.Categorical.from_codes(channel, CHANNELS),
+        'Amount': pd.Categorical.from_codes(amount_codes, amount_texts),
+    })
+    # identical transactions in the same minute are told apart by Seq, like the scraper does
+    df['Seq'] = df.groupby(['Time', 'Equipment', 'Channel', 'Amount'], observed=True, sort=False).cumcount()
+    return df
+
+def write_sales_db(db_path, rows: int, start = START_DATE, days: int = None, seed: int = 0,
+                   chunk_rows: int = 1_000_000, table_name = 'sales_data'):
+    """
+    Write `rows` synthetic transactions into sales_data of a new SQLite database.
+
+    Rows are generated and inserted a block of days at a time, so 50M rows never sit in
+    memory at once. Each block has its own seed (seed, block number). The unique key index
+    of sales_store is built once at the end instead of on every insert.
+
+    Returns the number of days covered.
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        raise FileExistsError(f"{db_path} already exists")
+    days = default_days(rows) if days is None else days
+    blocks = max(1, min(days, -(-rows // chunk_rows)))
+    day_edges = np.linspace(0, days, blocks + 1).astype(int)
+    row_edges = np.linspace(0, rows, blocks + 1).astype(int)
+    conn = sqlite3.connect(db_path)
+    try:
+        for block in range(blocks):
+            df = generate_sales(row_edges[block + 1] - row_edges[block], start, day_edges[block + 1] - day_edges[block],
+                                seed= [seed, block], first_day= day_edges[block])
+            df['Time'] = df['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+            df[SALES_KEY].to_sql(table_name, conn, if_exists='append', index=False,
+                                 dtype= {'Time': 'TIMESTAMP', 'Seq': 'INTEGER'})
+            conn.commit()
+        create_sales_table(conn, table_name)
+    finally:
+        conn.close()
+    return days
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    arg_parser = argparse.ArgumentParser(description='Write synthetic sales_data rows into a new SQLite database')
+    arg_parser.add_argument('db_path')
+    arg_parser.add_argument('--rows', type=int, default=100_000)
+    arg_parser.add_argument('--days', type=int, help='days covered, default: see default_days')
+    arg_parser.add_argument('--start', default=START_DATE)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+    start_time = time.perf_counter()
+    days = write_sales_db(args.db_path, args.rows, args.start, args.days, args.seed)
+    print(f"{args.rows} rows over {days} days written to {args.db_path} in {time.perf_counter() - start_time:.1f}s")
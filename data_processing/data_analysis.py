@@ -1,10 +1,29 @@
+import numpy as np
 import pandas as pd
 import plotly.express as px
-
-
-from data_cleaning import read_df_from_db
-
-def earnings_trend(df, window_size = 7):
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.rollups import read_rollup, DAILY_ROLLUP, MONTHLY_ROLLUP
+from data_processing.rolling import complete_calendar, rolling_stats
+from data_processing.period_comparison import load_rollup, compare_monthly
+from data_processing.utilization import utilization
+from data_processing.stores import select_stores
+
+# earnings_trend, moving_average_plot: df can be transaction rows or the daily/monthly rollups,
+# both are summed over Date (or Year, Month) x Unit
+WINDOW_LABELS = {7: 'Weekly Average', 14: 'Biweekly Average', 30: 'Monthly Average'}
+
+def earnings_overview(df, window_size = (7, 14, 30), store = None):
+    """
+    Daily 元 / 點 / Earnings with the moving averages of earnings_trend, without the plot
+
+    window_size: one window or a list of windows, in calendar days
+    store: store id(s) to keep when df comes from stores.read_store_rollups, None sums all stores
+    """
+    df = select_stores(df, store)
     sales_overview = pd.pivot_table(
         data= df,
         index= 'Date',
@@ -12,24 +31,32 @@ def earnings_trend(df, window_size = 7):
         values= 'Amount',
         aggfunc="sum",
         fill_value=0
-    ).reset_index()
+    )
+    # days without sales count as zero earnings, so every window spans window_size days
+    sales_overview = complete_calendar(sales_overview, 'D').reset_index()
     sales_overview['Earnings'] = sales_overview['元'] + sales_overview['點']
-    # Calculate the moving average 
-    sales_overview['Weekly Average'] = sales_overview['Earnings'].rolling(window=7).mean()
-    sales_overview['Biweekly Average'] = sales_overview['Earnings'].rolling(window=14).mean()
-    sales_overview['Monthly Average'] = sales_overview['Earnings'].rolling(window=30).mean()
+    # Calculate the moving averages in one pass
+    averages = rolling_stats(sales_overview['Earnings'], window_size, stats= ('mean',))
+    averages.columns = [WINDOW_LABELS.get(w, f'{w}-Day Average') for w in np.atleast_1d(window_size)]
+    return pd.concat([sales_overview, averages], axis=1)
+
+def earnings_trend(df, window_size = (7, 14, 30), store = None):
+    """window_size, store: see earnings_overview"""
+    sales_overview = earnings_overview(df, window_size, store)
+    averages = sales_overview.columns[sales_overview.columns.get_loc('Earnings') + 1:]
 
     # Create a line plot with Plotly Express
     fig = px.line(sales_overview, 
                   x='Date', 
-                  y=['Earnings', 'Weekly Average', 'Biweekly Average', 'Monthly Average'],
+                  y=['Earnings', *averages],
                 labels={'value': 'Earnings', 'variable': 'Metric'},
                 title="Earnings Trend with Moving Average",
                 # color={"Earnings"}
                 )
     fig.show()
 
-def moving_average_plot(df):
+def moving_average_plot(df, window_size = 3):
+    """window_size: months in the seasonal average"""
     sales_overview_monthly = pd.pivot_table(
         data= df,
         index= ['Year', 'Month'],
@@ -38,30 +65,42 @@ def moving_average_plot(df):
         aggfunc="sum",
         fill_value=0
     ).reset_index()
+    sales_overview_monthly.index = pd.to_datetime(
+        pd.DataFrame({'year': sales_overview_monthly['Year'], 'month': sales_overview_monthly['Month'], 'day': 1})
+    ).rename('Period')
+    sales_overview_monthly = complete_calendar(sales_overview_monthly, 'MS')
+    sales_overview_monthly['Year'] = sales_overview_monthly.index.year
+    sales_overview_monthly['Month'] = sales_overview_monthly.index.month
     sales_overview_monthly['Monthly Earnings'] = sales_overview_monthly['元'] + sales_overview_monthly['點']
-    sales_overview_monthly['Seasonal Average'] = sales_overview_monthly['Monthly Earnings'].rolling(window=3).mean()
-    fig = px.line(sales_overview_monthly, x='Month', y=['Monthly Earnings', 'Seasonal Average'],
+    sales_overview_monthly['Seasonal Average'] = rolling_stats(
+        sales_overview_monthly['Monthly Earnings'], window_size)[f'mean_{window_size}']
+    fig = px.line(sales_overview_monthly.reset_index(), x='Period', y=['Monthly Earnings', 'Seasonal Average'],
                 labels={'value': 'Earnings', 'variable': 'Metric'},
                 title="Earnings Trend with Moving Average")
     fig.show()
 
-def yoy(df:pd.DataFrame):
-    ...
+def yoy(df:pd.DataFrame, by: list = ('Unit',)):
+    """YoY change per month of a monthly rollup, by Unit and/or Equipment_Category"""
+    return compare_monthly(df, by= by, lags= {'YoY': 12})
 
-def mom(df:pd.DataFrame):
-    ...
+def mom(df:pd.DataFrame, by: list = ('Unit',)):
+    """MoM change per month of a monthly rollup, by Unit and/or Equipment_Category"""
+    return compare_monthly(df, by= by, lags= {'MoM': 1})
 
 
 def main():
     db_path = 'data/database.db'
-    table_name = 'clean_sales_data'
-
-    df = read_df_from_db(db_path, table_name)
+    # daily/monthly rollups maintained by data_cleaning instead of transaction-level rows
+    daily_sales = read_rollup(db_path, DAILY_ROLLUP, columns= ['Date', 'Unit', 'Amount'])
+    # cached until the database changes, so every year/month filter reuses it
+    monthly_sales = load_rollup(db_path, MONTHLY_ROLLUP)
     # in dashboard, have a filter for year/ month 
 
 
     # genearl summary 
     # YoY MoM revenue 
+    print(yoy(monthly_sales).tail(2))
+    print(mom(monthly_sales, by= ['Equipment_Category']).tail(4))
     # px.bar(sales_overview_monthly, 
     #        x=['Year', 'Month'], 
     #        y='Monthly Earnings',
@@ -72,13 +111,17 @@ def main():
 
 
     # time series related
-    earnings_trend(df)
-    moving_average_plot(df)
+    earnings_trend(daily_sales)
+    moving_average_plot(monthly_sales)
     # by weekday
     print('t')
 
     # analysis for equipment
     ## using rate (in terms of time)
+    busy_fraction, concurrency = utilization(db_path)
+    px.imshow(busy_fraction, labels={'x': 'Hour', 'y': 'Machine', 'color': 'Busy fraction'},
+              title="Machine Utilization by Hour of Day").show()
+    print(concurrency)
 
     # customer analysis
 
@@ -1,53 +1,253 @@
 
 import re
 import sqlite3
+import gzip
+import bz2
+import lzma
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
 
-def read_df_from_db(db_path, table_name= 'sales_data'):
+# columns stored as "YYYY-MM-DD HH:MM:SS" text that read_df_from_db parses back
+DATE_COLUMNS = ['Time', 'Date']
+
+def read_df_from_db(
+        db_path,
+        table_name= 'sales_data',
+        columns: list = None,
+        start = None,
+        end = None,
+        dtype: dict = None,
+        chunksize: int = None,
+        time_column: str = 'Time'
+        ):
+    """
+    Read a table (or view) into a DataFrame.
+
+    - columns: only select these columns, default all
+    - start / end: keep rows with start <= time_column < end, filtered in SQLite (see create_time_index)
+    - dtype: explicit dtypes for the selected columns
+    - chunksize: return an iterator of DataFrames with this many rows instead of one DataFrame
+    """
+    select = '*' if columns is None else ', '.join(columns)
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d %H:%M:%S"))
+    if end is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d %H:%M:%S"))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    query = f""" SELECT {select} FROM {table_name}{where} """
+    parse_dates = [col for col in DATE_COLUMNS if columns is None or col in columns]
+
+    if chunksize is not None:
+        return _iter_df_from_db(db_path, query, params, chunksize, parse_dates, dtype)
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql(f""" SELECT * FROM {table_name} """,
+    df = pd.read_sql(query,
                         con= conn,
-                        parse_dates='Time')
+                        params= params,
+                        parse_dates= parse_dates,
+                        dtype= dtype)
     conn.close()
     return df
 
+def _iter_df_from_db(db_path, query, params, chunksize, parse_dates, dtype):
+    # keeps the connection open until the caller has consumed every chunk
+    conn = sqlite3.connect(db_path)
+    try:
+        yield from pd.read_sql(query,
+                                con= conn,
+                                params= params,
+                                parse_dates= parse_dates,
+                                dtype= dtype,
+                                chunksize= chunksize)
+    finally:
+        conn.close()
+
+def create_time_index(conn, table_name, time_column= 'Time'):
+    """
+    Index time_column so the start/end filters of read_df_from_db do not scan the table
+    """
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{time_column.lower()} ON {table_name} ({time_column})")
+
 def save_df_to_db(df, db_path, table_name= 'table'):
     conn = sqlite3.connect(db_path)
     df.to_sql(table_name, conn, if_exists='replace', index=False)
     print(f"Data saved to {db_path}. Table {table_name}")
     conn.close()
 
-def db2excel(excel_path:str, db_path: str = None, df:pd.DataFrame = None ):
-    if df is None:
-        df = read_df_from_db(db_path, 'sales_data')
-    df.to_excel(excel_path, sheet_name='Sheet1', index=False, )
-    print(f"Data saved to {excel_path}")
+def table_exists(conn, table_name):
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
+    return cursor.fetchone() is not None
+
+def get_watermark(conn, name):
+    """
+    Return the last raw rowid processed into `name`, or None if never processed
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS etl_watermark (name TEXT PRIMARY KEY, last_rowid INTEGER)")
+    row = conn.execute("SELECT last_rowid FROM etl_watermark WHERE name = ?", (name,)).fetchone()
+    return None if row is None else row[0]
+
+def set_watermark(conn, name, last_rowid):
+    """
+    Record the last raw rowid processed into `name`. Not committed here.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS etl_watermark (name TEXT PRIMARY KEY, last_rowid INTEGER)")
+    conn.execute("INSERT OR REPLACE INTO etl_watermark (name, last_rowid) VALUES (?, ?)", (name, last_rowid))
+
+# xlsx sheets hold at most 1,048,576 rows including the header
+EXCEL_MAX_ROWS = 1048575
 
-def db2csv(csv_path:str, db_path: str = None, df:pd.DataFrame = None):
-    if df is None:
-        df = read_df_from_db(db_path, 'sales_data')
-    df.to_csv(csv_path, index=False)
-    print(f"Data saved to {csv_path}")
+def _iter_export_chunks(db_path, table_name, export_path: str, columns: list = None, chunksize: int = 50000, since_last_export: bool = False):
+    """
+    Stream (last rowid, chunk) pairs of a table (or clean_sales_view, through its Row_Id) in
+    rowid order. With since_last_export, only rows after the export_path watermark are read.
+    The watermark is not moved here: the caller records the last rowid with
+    set_export_watermark once the file is written.
+    """
+    conn = sqlite3.connect(db_path, timeout= 30)
+    try:
+        is_view = conn.execute("SELECT type FROM sqlite_master WHERE name = ?", (table_name,)).fetchone() == ('view',)
+        rowid_column = 'Row_Id' if is_view else 'rowid'
+        last_rowid = (get_watermark(conn, f'export:{export_path}') or 0) if since_last_export else 0
+        select = '*' if columns is None else ', '.join(columns)
+        chunks = pd.read_sql(f""" SELECT {rowid_column} AS export_rowid, {select} FROM {table_name}
+                                  WHERE {rowid_column} > ? ORDER BY {rowid_column} """,
+                             con= conn,
+                             params= (last_rowid,),
+                             parse_dates= DATE_COLUMNS,
+                             chunksize= chunksize)
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if 'Date' in chunk:
+                # Date is only turned back into text for the exports
+                chunk['Date'] = chunk['Date'].dt.strftime("%Y/%m/%d")
+            yield int(chunk['export_rowid'].max()), chunk.drop(columns= ['export_rowid', 'Row_Id'], errors= 'ignore')
+    finally:
+        conn.close()
+
+def db2excel(excel_path:str, db_path: str = None, df:pd.DataFrame = None, table_name: str = 'sales_data',
+             columns: list = None, chunksize: int = 50000, since_last_export: bool = False):
+    """
+    Export to xlsx. From the database, rows are streamed in chunks into a write-only
+    (constant memory) workbook, continuing on Sheet2, Sheet3 ... past the xlsx row limit.
+    since_last_export: once excel_path holds a full export, leave it as it is and write the
+    rows added since the last export to <name>.<last rowid>.xlsx next to it (nothing is
+    written when there are none)
+    """
+    if df is not None:
+        df.to_excel(excel_path, sheet_name='Sheet1', index=False, )
+        print(f"Data saved to {excel_path}")
+        return
+    from openpyxl import Workbook
+    # a workbook cannot be appended to like a csv; without a full export yet, this run writes it
+    new_rows_only = since_last_export and Path(excel_path).exists() and get_export_watermark(db_path, excel_path) is not None
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, rows, last_rowid = None, EXCEL_MAX_ROWS, 0, None
+    for last_rowid, chunk in _iter_export_chunks(db_path, table_name, excel_path, columns, chunksize, new_rows_only):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            if sheet_rows == EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f'Sheet{len(workbook.worksheets) + 1}')
+                sheet.append(list(chunk.columns))
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+        rows += len(chunk)
+    save_path = excel_path
+    if new_rows_only:
+        if rows == 0:
+            print(f"No new rows for {excel_path}")
+            return
+        save_path = Path(excel_path).with_suffix(f'.{last_rowid}.xlsx')
+    if sheet is None:
+        workbook.create_sheet('Sheet1')
+    workbook.save(save_path)
+    if last_rowid is not None:
+        set_export_watermark(db_path, excel_path, last_rowid)
+    print(f"{rows} rows saved to {save_path}")
+
+def db2csv(csv_path:str, db_path: str = None, df:pd.DataFrame = None, table_name: str = 'sales_data',
+           columns: list = None, chunksize: int = 100000, compression: str = None, since_last_export: bool = False):
+    """
+    Export to csv. From the database, rows are streamed in chunks.
+    compression: e.g. 'gzip' (csv_path should then end in .gz)
+    since_last_export: only append rows added since the last export to this path
+    """
+    if df is not None:
+        df.to_csv(csv_path, index=False, compression=compression)
+        print(f"Data saved to {csv_path}")
+        return
+    append = since_last_export and Path(csv_path).exists() and get_export_watermark(db_path, csv_path) is not None
+    opener = {None: open, 'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}[compression]
+    rows, last_rowid = 0, None
+    # a gzip/bz2/xz stream may be appended to: the result decompresses as one file
+    with opener(csv_path, 'at' if append else 'wt', encoding='utf-8', newline='') as handle:
+        # a missing csv is written in full, even with since_last_export
+        for last_rowid, chunk in _iter_export_chunks(db_path, table_name, csv_path, columns, chunksize, append):
+            chunk.to_csv(handle, index=False, header= not append and rows == 0)
+            rows += len(chunk)
+    if last_rowid is not None:
+        set_export_watermark(db_path, csv_path, last_rowid)
+    print(f"{rows} rows saved to {csv_path}")
+
+def get_export_watermark(db_path, path):
+    conn = sqlite3.connect(db_path, timeout= 30)
+    last_rowid = get_watermark(conn, f'export:{path}')
+    conn.close()
+    return last_rowid
 
+def set_export_watermark(db_path, path, last_rowid):
+    """
+    Record the last rowid written to the export at `path`, once the file is saved
+    """
+    conn = sqlite3.connect(db_path, timeout= 30)
+    with conn:
+        set_watermark(conn, f'export:{path}', last_rowid)
+    conn.close()
+
+def run_exports(exports: list, parallel: bool = True):
+    """
+    Run (export function, kwargs) pairs, each in its own process when parallel
+    """
+    if not parallel:
+        for func, kwargs in exports:
+            func(**kwargs)
+        return
+    with ProcessPoolExecutor(max_workers= len(exports)) as executor:
+        for future in [executor.submit(func, **kwargs) for func, kwargs in exports]:
+            future.result()
 
 def add_date_columns(df:pd.DataFrame):
     """
-    Add date columns: Date, Year, Month, Weekday, Day
+    Add date columns: Date (midnight of Time, as datetime), Year, Month, Weekday, Day (small ints)
     """
-    df['Date'] = df['Time'].dt.strftime("%Y/%m/%d")
-    df['Year'] = df['Time'].dt.year
-    df['Month'] = df['Time'].dt.month
-    df['Weekday'] = df['Time'].dt.weekday
-    df['Day'] = df['Time'].dt.day
+    df['Date'] = df['Time'].dt.floor('D')
+    df['Year'] = compact_int(df['Time'].dt.year, 'int16')
+    df['Month'] = compact_int(df['Time'].dt.month, 'int8')
+    df['Weekday'] = compact_int(df['Time'].dt.weekday, 'int8')
+    df['Day'] = compact_int(df['Time'].dt.day, 'int8')
 
     return df
 
+def compact_int(series:pd.Series, dtype:str):
+    """
+    Cast to a small integer dtype, or its nullable version (e.g. Int16) if there are missing values
+    """
+    return series.astype(dtype if series.notna().all() else dtype.capitalize())
 
 def correct_datatypes(
         df:pd.DataFrame, 
         numeric_colmns: list = [],
-        date_columns: list = []
+        date_columns: list = [],
+        category_columns: list = []
         ):
     """
     Correct the data types of the columns
@@ -57,10 +257,26 @@ def correct_datatypes(
 
     for col in date_columns:
         df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    for col in category_columns:
+        df[col] = df[col].astype('category')
     
     return df
 
+def compact_clean_dtypes(df:pd.DataFrame):
+    """
+    Schema of clean sales rows: int32 Amount, small int calendar parts and categorical text columns
+    """
+    if 'Amount' in df:
+        df['Amount'] = compact_int(df['Amount'], 'int32')
+    for col, dtype in [('Year', 'int16'), ('Month', 'int8'), ('Weekday', 'int8'), ('Day', 'int8')]:
+        if col in df:
+            df[col] = compact_int(df[col], dtype)
+    return correct_datatypes(df, category_columns= [col for col in ['Unit', 'Channel', 'Equipment'] if col in df])
+
 def split_equipment(equipment_name):
+    if not isinstance(equipment_name, str):  # missing equipment cell
+        return (np.nan, np.nan, np.nan)
     match = re.match(r'【(\d+)([上下]?)】(.+)', equipment_name)
     if match:
         return match.groups()
@@ -68,6 +284,8 @@ def split_equipment(equipment_name):
         return (np.nan, np.nan, equipment_name)
 
 def categorize_equipment(equipment_type):
+    if not isinstance(equipment_type, str):
+        return np.nan, np.nan
     if '洗' in equipment_type:  # If it contains '洗' (wash)
         if '中' in equipment_type:
             return 'wash', 'medium'
@@ -85,30 +303,205 @@ def categorize_equipment(equipment_type):
         return 'others', np.nan
 
 
+def parse_equipment(equipment_names):
+    """
+    Parse each distinct equipment name once with split_equipment/categorize_equipment.
+    Returns a frame indexed by equipment name.
+    """
+    columns = ['Equipment_ID', 'Equipment_Location', 'Equipment_Type', 'Equipment_Category', 'Wash_Scale']
+    rows = []
+    for name in equipment_names:
+        equipment_id, location, equipment_type = split_equipment(name)
+        rows.append((equipment_id, location, equipment_type) + categorize_equipment(equipment_type))
+    parsed = pd.DataFrame(rows, columns= columns, index= pd.Index(equipment_names, name= 'Equipment'))
+    parsed['Equipment_Location'] = parsed['Equipment_Location'].replace({'上': 'Up', '下': 'Down', '': np.nan})
+    return parsed
+
 def clean_equipment_column(df):
-    df[['Equipment_ID', 'Equipment_Location', 'Equipment_Type']]    = df['Equipment'].apply(split_equipment).apply(pd.Series)
-    df['Equipment_Location']                                        = df['Equipment_Location'].replace({'上': 'Up', '下': 'Down', '': np.nan})
-    df[['Equipment_Category', 'Wash_Scale']]                        = df['Equipment_Type'].apply(categorize_equipment).apply(pd.Series)
+    # a store only has a few dozen machines: parse the distinct names and broadcast back
+    codes, uniques = pd.factorize(df['Equipment'], use_na_sentinel=False)
+    parsed = parse_equipment(list(uniques))
+    for col in parsed.columns:
+        df[col] = pd.Series(parsed[col].to_numpy()[codes], index=df.index)
 
     return df
 
-def main():
-    db_path = 'data/database.db'
-    table_name = 'sales_data'
+# scraped columns of sales_data
+RAW_COLUMNS = ['Time', 'Equipment', 'Channel', 'Amount']
+EQUIPMENT_COLUMNS = ['Equipment_ID', 'Equipment_Location', 'Equipment_Type', 'Equipment_Category', 'Wash_Scale']
+# bump when the layout of clean_sales_data or its derived tables changes; stored as PRAGMA user_version
+CLEAN_SCHEMA_VERSION = 4
+
+def update_equipment_table(conn, equipment_names):
+    """
+    Add unseen equipment names to the `equipment` dimension table (not committed here).
+    Missing names are not equipment and get no row.
+    Returns a Series mapping every known equipment name to its Equipment_Key.
+    """
+    conn.execute(""" CREATE TABLE IF NOT EXISTS equipment (
+                        Equipment_Key INTEGER PRIMARY KEY,
+                        Equipment TEXT UNIQUE,
+                        Equipment_ID TEXT,
+                        Equipment_Location TEXT,
+                        Equipment_Type TEXT,
+                        Equipment_Category TEXT,
+                        Wash_Scale TEXT
+                    ) """)
+    known = pd.read_sql(""" SELECT Equipment, Equipment_Key FROM equipment """, con= conn)
+    known_names = set(known['Equipment'])
+    new_names = [name for name in pd.unique(pd.Series(equipment_names).dropna()) if name not in known_names]
+    if new_names:
+        next_key = int(known['Equipment_Key'].max()) + 1 if len(known) else 1
+        parsed = parse_equipment(new_names).reset_index()
+        parsed.insert(0, 'Equipment_Key', range(next_key, next_key + len(parsed)))
+        parsed = parsed.astype(object).where(parsed.notna(), None)
+        conn.executemany(f""" INSERT INTO equipment (Equipment_Key, Equipment, {', '.join(EQUIPMENT_COLUMNS)})
+                              VALUES ({', '.join(['?'] * (len(EQUIPMENT_COLUMNS) + 2))}) """,
+                         parsed.itertuples(index=False, name=None))
+        known = pd.concat([known, parsed[['Equipment', 'Equipment_Key']]], ignore_index=True)
+    return known.set_index('Equipment')['Equipment_Key'].astype('int64')
+
+def encode_equipment(conn, df:pd.DataFrame):
+    """
+    Replace the Equipment text column with the integer Equipment_Key of the equipment table,
+    a nullable Int64 (NULL in SQLite) for rows without equipment
+    """
+    keys = update_equipment_table(conn, df['Equipment'])
+    df['Equipment_Key'] = compact_int(df['Equipment'].map(keys), 'int64')
+    return df.drop(columns= ['Equipment'])
+
+def recreate_table(conn, df:pd.DataFrame, table_name):
+    """
+    Drop table_name and create it empty with the columns to_sql would give df, in the
+    caller's transaction. to_sql(if_exists='replace') commits the empty table before it
+    inserts the rows.
+    """
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(pd.io.sql.get_schema(df, table_name, con= conn))
+
+def create_clean_sales_view(conn):
+    """
+    clean_sales_view joins clean_sales_data with equipment back into the wide layout,
+    plus the fact rowid as Row_Id for incremental exports
+    """
+    conn.execute(""" DROP VIEW IF EXISTS clean_sales_view """)
+    conn.execute(f""" CREATE VIEW clean_sales_view AS
+                      SELECT s.Time, e.Equipment, s.Channel, s.Amount, s.Unit,
+                             s.Date, s.Year, s.Month, s.Weekday, s.Day,
+                             {', '.join('e.' + col for col in EQUIPMENT_COLUMNS)},
+                             s.rowid AS Row_Id
+                      FROM clean_sales_data AS s
+                      LEFT JOIN equipment AS e ON s.Equipment_Key = e.Equipment_Key """)
 
-    df = read_df_from_db(db_path, table_name)
-    db2excel(excel_path = 'data/raw_sales_data.xlsx', df = df)
-    db2csv(csv_path = 'data/raw_sales_data.csv', df = df)
-    df[['Amount', 'Unit']] = df['Amount'].str.extract('(-?\d+)(\D+)') # split unit
+def read_clean_sales(db_path, categorical:bool = True):
+    """
+    Read clean_sales_data together with its equipment attributes.
+
+    With `categorical`, the equipment columns are built as pandas categoricals straight
+    from Equipment_Key, so the equipment strings are only materialized once per machine.
+    Otherwise the rows are joined in SQLite through clean_sales_view.
+    """
+    if not categorical:
+        return read_df_from_db(db_path, 'clean_sales_view').drop(columns= ['Row_Id'])
+    df = compact_clean_dtypes(read_df_from_db(db_path, 'clean_sales_data'))
+    equipment = read_df_from_db(db_path, 'equipment').set_index('Equipment_Key').sort_index()
+    positions = equipment.index.get_indexer(df.pop('Equipment_Key'))
+    for col in ['Equipment'] + EQUIPMENT_COLUMNS:
+        attribute = equipment[col].astype('category')
+        codes = np.where(positions >= 0, attribute.cat.codes.to_numpy()[positions], -1)
+        df[col] = pd.Categorical.from_codes(codes, attribute.cat.categories)
+    return df
+
+def clean_sales_df(df:pd.DataFrame):
+    """
+    Turn raw sales_data rows into clean_sales_data rows, equipment still as text
+    """
+    df[['Amount', 'Unit']] = df['Amount'].str.extract(r'(-?\d+)(\D+)') # split unit
     df = correct_datatypes(df, numeric_colmns= ['Amount'], date_columns= ['Time'])
     df = add_date_columns(df)
-    df = clean_equipment_column(df)
-    db2excel(excel_path = 'data/clean_sales_data.xlsx', df = df)
-    db2csv(csv_path = 'data/clean_sales_data.csv', df = df)
-    save_df_to_db(df = df, db_path = db_path, table_name = "clean_sales_data")
-    print('Data cleaning completed.')
+    return compact_clean_dtypes(df)
 
-if __name__ == "__main__":
-    main()
+def main(db_path:str = 'data/database.db', full_rebuild:bool = False, export:bool = True,
+         export_new_only:bool = False, csv_compression:str = None):
+    # rollups reads tables through this module, so import it here rather than at the top
+    from data_processing.rollups import update_rollups
+    table_name = 'sales_data'
+    clean_table_name = 'clean_sales_data'
 
+    conn = sqlite3.connect(db_path)
+    try:
+        last_rowid = get_watermark(conn, clean_table_name)
+        schema_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version != CLEAN_SCHEMA_VERSION and not full_rebuild:
+            print(f"clean_sales_data layout changed (v{schema_version} -> v{CLEAN_SCHEMA_VERSION}), rebuilding.")
+        if full_rebuild or last_rowid is None or schema_version != CLEAN_SCHEMA_VERSION or not table_exists(conn, clean_table_name):
+            full_rebuild = True
+            last_rowid = 0
 
+        # only rows scraped after the last cleaning run
+        df = pd.read_sql(f""" SELECT rowid AS raw_rowid, {', '.join(RAW_COLUMNS)} FROM {table_name} WHERE rowid > ? ORDER BY rowid """,
+                            con= conn,
+                            params= (last_rowid,),
+                            parse_dates='Time')
+        if df.empty:
+            print('No new rows to clean.')
+        else:
+            new_rowid = int(df.pop('raw_rowid').max())
+            df = clean_sales_df(df)
+            # sqlite3 does not open a transaction for DDL by itself: without BEGIN the drops
+            # below would be committed on their own. Everything up to the end of to_sql,
+            # which commits (or rolls back) once its rows are inserted, is one transaction.
+            conn.execute("BEGIN")
+            if full_rebuild:
+                conn.execute("DROP TABLE IF EXISTS equipment")
+            df = encode_equipment(conn, df)
+            update_rollups(conn, df, rebuild= full_rebuild)
+            set_watermark(conn, clean_table_name, new_rowid)
+            if full_rebuild:
+                recreate_table(conn, df, clean_table_name)
+            df.to_sql(clean_table_name, conn, if_exists='append', index=False)
+            create_time_index(conn, clean_table_name)
+            create_time_index(conn, table_name)
+            conn.commit()
+            print(f"{len(df)} rows cleaned ({'full rebuild' if full_rebuild else 'incremental'}). Table {clean_table_name}")
+        if schema_version != CLEAN_SCHEMA_VERSION and table_exists(conn, clean_table_name):
+            create_clean_sales_view(conn)
+            conn.execute(f"PRAGMA user_version = {CLEAN_SCHEMA_VERSION}")
+            # reclaim the pages of the old wide layout
+            conn.execute("VACUUM")
+    finally:
+        # closing without a commit discards a half written batch
+        conn.close()
+
+    if export:
+        # after a rebuild the old clean exports no longer line up with the new rows
+        export_new_only = export_new_only and not full_rebuild
+        csv_suffix = {None: '', 'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}[csv_compression]
+        export_dir = Path(db_path).parent
+        run_exports([
+            (db2excel, dict(excel_path = str(export_dir / 'raw_sales_data.xlsx'), db_path = db_path, table_name = table_name,
+                            columns = RAW_COLUMNS, since_last_export = export_new_only)),
+            (db2csv, dict(csv_path = str(export_dir / f'raw_sales_data.csv{csv_suffix}'), db_path = db_path, table_name = table_name,
+                          columns = RAW_COLUMNS, compression = csv_compression, since_last_export = export_new_only)),
+            (db2excel, dict(excel_path = str(export_dir / 'clean_sales_data.xlsx'), db_path = db_path, table_name = 'clean_sales_view',
+                            since_last_export = export_new_only)),
+            (db2csv, dict(csv_path = str(export_dir / f'clean_sales_data.csv{csv_suffix}'), db_path = db_path, table_name = 'clean_sales_view',
+                          compression = csv_compression, since_last_export = export_new_only)),
+        ])
+    print('Data cleaning completed.')
+
+if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Clean sales_data into clean_sales_data')
+    arg_parser.add_argument('--db-path', default='data/database.db')
+    arg_parser.add_argument('--full-rebuild', action='store_true',
+                            help='ignore the watermark and rebuild clean_sales_data from every raw row')
+    arg_parser.add_argument('--skip-export', action='store_true',
+                            help='do not write the xlsx/csv exports')
+    arg_parser.add_argument('--export-new-only', action='store_true',
+                            help='csv exports get the rows added since the last export appended, xlsx exports write them to '
+                                 'a separate <name>.<last rowid>.xlsx')
+    arg_parser.add_argument('--csv-compression', choices=['gzip', 'bz2', 'xz'])
+    args = arg_parser.parse_args()
+    main(db_path= args.db_path, full_rebuild= args.full_rebuild, export= not args.skip_export,
+         export_new_only= args.export_new_only, csv_compression= args.csv_compression)
@@ -1,96 +1,255 @@
 import time
-import re 
 import pandas as pd
-import sqlite3
 import os
+import queue
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import sys
 from pathlib import Path
 # Dynamically find the project root and add it to sys.path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
-from util.time_select import get_first_and_last_dates, get_all_dates, get_all_year_months
+from util.time_select import get_first_and_last_dates, get_month_dates, get_all_year_months
+from util.retry import with_retries
+from data_processing.detail_grid import read_detail_grid, read_month_dates, detail_rows_to_df
+from data_processing.sales_store import connect_db, load_done_dates, SalesWriter, DONE, FAILED
 
 load_dotenv()
 
-def get_chrome_driver():
+# seconds to wait for each kind of page change before giving up
+DEFAULT_TIMEOUTS = {
+    'page': 20,     # login, menu and revenue page navigation
+    'month': 15,    # month query refreshing the revenue grid
+    'day': 20,      # detailGrid rows after opening a day
+    'close': 10,    # detail dialog closing
+}
+
+# first month available on the revenue page
+START_YEAR = 2023
+START_MONTH = 11
+
+def get_chrome_driver(headless: bool = False):
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
     try:
-        driver = webdriver.Chrome()
+        driver = webdriver.Chrome(options=options)
     except:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
     return driver
 
-def get_data(driver, conn):
-    start_y = 2023
-    start_m = 11
-    for y, m in get_all_year_months(start_year= start_y, start_month= start_m):
-        start_date, end_date = get_first_and_last_dates(y, m)
-        # 3. select by month 
-        driver.find_element(By.ID, 'startDate').click()
-        driver.find_element(By.ID, 'startDate').clear()
-        driver.find_element(By.ID, 'startDate').send_keys(f"{start_date}")
-        driver.find_element(By.ID, 'endDate').click()
-        driver.find_element(By.ID, 'endDate').clear()
-        driver.find_element(By.ID, 'endDate').send_keys(f"{end_date}")
-        driver.find_element(By.ID, 'query').send_keys(Keys.RETURN)
-        time.sleep(6)
-        # 4. scrape every detail transactions
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        for date in get_all_dates(start_date, end_date):
-            if date not in str(soup) or date in cached_date:
-                continue
-            wait = WebDriverWait(driver = driver,timeout= 20, poll_frequency=2)
-            element = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, f'td[title="{date}"]')))
-            element.click()
-            time.sleep(5)
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            table = soup.find('table', id = "detailGrid")
-            rows = table.find_all(
-                'tr', 
-                class_=re.compile(r'ui-widget-content jqgrow ui-row-ltr'), 
-                # id=re.compile(r'[A-Z]{2}\d_[A-Z]{2}[\dA-Z]')
-                )
-            # Create a list to store the row data
-            data = []
-            # Extract data from the filtered rows
-            for row in rows:
-                row_data = [cell.get_text(strip=True) for cell in row.find_all('td')]
-                data.append(row_data)
-            # Create a Pandas DataFrame
-            df = pd.DataFrame(data, columns=['Time', 'Equipment', 'Channel', 'Amount'])
-            df['Time'] = pd.to_datetime(f'{date} ' + df['Time'], format='%Y/%m/%d %H:%M')
-            df.to_sql('sales_data', conn, if_exists='append', index=False)
-            conn.commit()
-            driver.find_element(By.CSS_SELECTOR, 'a[aria-label="Close"]').click()
-            print(f"Saved data on {date}")
-            time.sleep(5)
+def get_wait(driver, timeouts: dict, kind: str):
+    timeout = {**DEFAULT_TIMEOUTS, **(timeouts or {})}[kind]
+    return WebDriverWait(driver = driver, timeout= timeout, poll_frequency=0.2)
+
+def wait_for_refresh(driver, old_element, timeouts: dict, kind: str):
+    """
+    Wait until an element from before a reload has been replaced, if there was one.
+    Raises TimeoutException if it is still there, so old content is never read as new.
+    """
+    if old_element is not None:
+        get_wait(driver, timeouts, kind).until(EC.staleness_of(old_element))
+
+# counts the page's XMLHttpRequests (jqGrid loads its data with them); installed once per page.
+# Returns the counts so far, to tell the month query's request from earlier ones.
+XHR_COUNTER_SCRIPT = """
+if (!window.__xhrCounts) {
+    window.__xhrCounts = {started: 0, finished: 0, failed: 0};
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        const counts = window.__xhrCounts;
+        counts.started++;
+        // loadend comes after the load handlers, i.e. after the grid has rendered the response
+        this.addEventListener('loadend', () => {
+            counts.finished++;
+            if (!(this.status >= 200 && this.status < 400)) counts.failed++;
+        });
+        return send.apply(this, arguments);
+    };
+}
+return Object.assign({}, window.__xhrCounts);
+"""
+
+# request counts (null after a full page load), page state and the number of day cells of a month
+MONTH_GRID_SCRIPT = """
+return {
+    counts: window.__xhrCounts ? Object.assign({}, window.__xhrCounts) : null,
+    ready: document.readyState,
+    cells: document.querySelectorAll('td[title^="' + arguments[0] + '"]').length,
+};
+"""
+
+class MonthQueryFailed(WebDriverException):
+    pass
+
+def month_grid_settled(month_prefix: str, counts_before: dict, old_cell = None):
+    """
+    Wait condition for a month query. Returns 'sales' once the grid shows days of the
+    month, 'empty' once the query's requests have finished (or the page reloaded) and the
+    refreshed grid has no day of the month, and False while the query is still running.
+    A failed request raises MonthQueryFailed. Day cells only count once the grid has
+    reloaded, so the cells of an earlier query of the same month are not taken as the answer.
+    """
+    def condition(driver):
+        state = driver.execute_script(MONTH_GRID_SCRIPT, month_prefix)
+        counts = state['counts']
+        if counts is None:
+            settled = state['ready'] == 'complete'
+        else:
+            if counts['failed'] > counts_before['failed']:
+                raise MonthQueryFailed(f"month query request failed for {month_prefix}")
+            settled = counts['started'] > counts_before['started'] and counts['finished'] == counts['started']
+        if state['cells'] and (settled or old_cell is None or EC.staleness_of(old_cell)(driver)):
+            return 'sales'
+        return 'empty' if settled else False
+    return condition
+
+def query_month(driver, year: int, month: int, timeouts: dict = None):
+    """
+    Query the revenue page for one month and wait for the grid to show that month.
+    Returns the first and last dates, and whether any day of the month has sales.
+
+    An empty month is only reported once the reloaded grid shows it, never because a
+    wait ran out: a slow or broken grid raises TimeoutException (or MonthQueryFailed) so
+    the caller's retries handle it.
+    """
+    start_date, end_date = get_first_and_last_dates(year, month)
+    old_cells = driver.find_elements(By.CSS_SELECTOR, 'td[title]')
+    counts_before = driver.execute_script(XHR_COUNTER_SCRIPT)
+    driver.find_element(By.ID, 'startDate').click()
+    driver.find_element(By.ID, 'startDate').clear()
+    driver.find_element(By.ID, 'startDate').send_keys(f"{start_date}")
+    driver.find_element(By.ID, 'endDate').click()
+    driver.find_element(By.ID, 'endDate').clear()
+    driver.find_element(By.ID, 'endDate').send_keys(f"{end_date}")
+    driver.find_element(By.ID, 'query').send_keys(Keys.RETURN)
+    state = get_wait(driver, timeouts, 'month').until(
+        month_grid_settled(start_date[:8], counts_before, old_cells[0] if old_cells else None),
+        f"grid of {start_date[:7]} did not load")
+    return start_date, end_date, state == 'sales'
+
+def open_day(driver, date: str, timeouts: dict = None):
+    """
+    Open the detail dialog of one day and wait for its detailGrid rows
+    """
+    old_rows = driver.find_elements(By.CSS_SELECTOR, '#detailGrid tr.jqgrow')
+    element = get_wait(driver, timeouts, 'day').until(EC.element_to_be_clickable((By.CSS_SELECTOR, f'td[title="{date}"]')))
+    element.click()
+    wait_for_refresh(driver, old_rows[0] if old_rows else None, timeouts, 'day')
+    get_wait(driver, timeouts, 'day').until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, '#detailGrid tr.jqgrow')))
 
+def close_day(driver, timeouts: dict = None):
+    driver.find_element(By.CSS_SELECTOR, 'a[aria-label="Close"]').click()
+    get_wait(driver, timeouts, 'close').until(
+        EC.invisibility_of_element_located((By.CSS_SELECTOR, 'a[aria-label="Close"]')))
+
+def scrape_day(driver, date: str, timeouts: dict = None):
+    """
+    Open one day, read its detailGrid into a DataFrame and close it again
+    """
+    try:
+        open_day(driver, date, timeouts)
+        # cell texts straight from the browser instead of re-parsing page_source
+        df = detail_rows_to_df(date, read_detail_grid(driver))
+    except Exception:
+        # back to the month grid, so a retry starts from a clean page. The Close link may
+        # be there but hidden; if closing fails too, the error of the day is still the one raised
+        try:
+            if driver.find_elements(By.CSS_SELECTOR, 'a[aria-label="Close"]'):
+                close_day(driver, timeouts)
+        except Exception as close_error:
+            print(f"Err: could not close {date}: {close_error}")
+        raise
+    close_day(driver, timeouts)
+    return df
+
+def scrape_month(driver, year: int, month: int, writer, done_dates = (), timeouts: dict = None, retries: int = 3, backoff: float = 2.0):
+    """
+    Scrape every day of the month that is not in done_dates into writer
+    (a SalesWriter or QueueWriter). Returns the number of pages loaded.
+
+    The month is not queried at all when all of its days are done. A day that keeps
+    failing after `retries` is recorded as failed and the month carries on; if the month
+    query itself keeps failing, all of its days are. Days are only recorded as done with
+    0 rows when the reloaded month grid shows no sales for them (see query_month).
+    """
+    today = datetime.today().strftime("%Y/%m/%d")
+    # memoized per month; "YYYY/MM/DD" strings compare in date order
+    month_dates = [date for date in get_month_dates(year, month) if date <= today and date not in done_dates]
+    if not month_dates:
+        return 0
+    # 3. select by month 
+    try:
+        start_date, end_date, has_sales = with_retries(
+            lambda: query_month(driver, year, month, timeouts), f"{year}/{month:02d}", retries, backoff)
+    except Exception as e:
+        # the grid never showed the month: nothing is known about its days, scrape them again next run
+        print(f"Err: giving up on {year}/{month:02d}: {e}")
+        for date in month_dates:
+            writer.mark(date, FAILED, error= str(e))
+        return 0
+    pages = 1
+    dates_with_sales = read_month_dates(driver) if has_sales else set()
+    # 4. scrape every detail transactions
+    for date in month_dates:
+        if date not in dates_with_sales:
+            # no sales that day; nothing more can appear once the day is over
+            if date < today:
+                writer.mark(date, DONE, rows= 0)
+            continue
+        try:
+            df = with_retries(lambda: scrape_day(driver, date, timeouts), date, retries, backoff)
+        except Exception as e:
+            print(f"Err: giving up on {date}: {e}")
+            writer.mark(date, FAILED, error= str(e))
+            continue
+        pages += 1
+        writer.add(date, df)
+        print(f"Scraped data on {date}")
+    return pages
+
+def report_throughput(pages: int, start_time: float, label: str = ''):
+    elapsed = time.perf_counter() - start_time
+    print(f"{label}Scraped {pages} pages in {elapsed:.0f}s ({pages / max(elapsed, 1e-9) * 60:.1f} pages/min)")
+
+def get_data(driver, conn, done_dates = (), timeouts: dict = None, year_months: list = None, retries: int = 3, backoff: float = 2.0):
+    if year_months is None:
+        year_months = get_all_year_months(start_year= START_YEAR, start_month= START_MONTH)
+    start_time = time.perf_counter()
+    pages = 0
+    with SalesWriter(conn) as writer:
+        for y, m in year_months:
+            try:
+                pages += scrape_month(driver, y, m, writer, done_dates, timeouts, retries, backoff)
+            except Exception as e:
+                # the month's days stay unfinished and are picked up by the next run
+                print(f"Err: skipping {y}/{m:02d}: {e}")
+    report_throughput(pages, start_time)
 
     # 6. Don't forget to log out (menu-logout-list logout)
-    driver.find_element(By.CSS_SELECTOR, '.menu-icon').click()
-    time.sleep(3)
-    driver.find_element(By.CSS_SELECTOR, 'div[href="/user/logout"]').click()
-    driver.find_element(By.CLASS_NAME, "k-button.k-primary").click()
-
-
-def main(db_path):
-    global cached_date
-    my_username = os.getenv('USERNAME')
-    my_password = os.getenv('PASSWORD')
-    url = os.getenv('LOGIN_URL')
-    # save_path = os.path.join(os.getcwd(), 'data')
-    # db_file = os.path.join(save_path,'database.db')
-    db_file = db_path
-
-    driver = get_chrome_driver()
+    logout(driver, timeouts)
+
+def login(driver, timeouts: dict = None, credentials: dict = None):
+    """
+    Log in and open the revenue page.
+    credentials: username / password / login_url of the store (see stores.store_credentials),
+    the .env USERNAME / PASSWORD / LOGIN_URL when not given
+    """
+    credentials = credentials or {}
+    my_username = credentials.get('username') or os.getenv('USERNAME')
+    my_password = credentials.get('password') or os.getenv('PASSWORD')
+    url = credentials.get('login_url') or os.getenv('LOGIN_URL')
     driver.get(url)
     # driver.maximize_window()
     print(driver.title)
@@ -105,41 +264,135 @@ def main(db_path):
     # log in
     password.send_keys(Keys.RETURN)
     print('Logged In')
-    # Wait for a few seconds to ensure the page loads
-    time.sleep(5)
 
+    # 1. go into menu-icon, once the landing page is ready
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.CSS_SELECTOR, '.menu-icon'))).click()
     print(driver.current_url)
-    # Now that you're logged in, you can scrape data using BeautifulSoup
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-
-    # Your scraping code here (e.g., find and extract data from the soup)
-
-    # 1. go into menu-icon
-    driver.find_element(By.CSS_SELECTOR, '.menu-icon').click()
-    time.sleep(3)
     # 2. go to revenue page
-    driver.find_element(By.CSS_SELECTOR, 'div[href="/owner/revenue"]').click()
-    time.sleep(3)
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'div[href="/owner/revenue"]'))).click()
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.ID, 'startDate')))
     print(driver.current_url)
 
-    # cache from database by date
-    # save all dates from datebase, list unique dates, exclude from scarping
-    conn = sqlite3.connect(db_file)
-    # Check if the table 'sales_data' exists
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sales_data'")
-    table_exists = cursor.fetchone() is not None
-    if table_exists:
-        db_df = pd.read_sql(""" SELECT * FROM sales_data """,
-                            con=conn,
-                            parse_dates='Time')
-        cached_date = db_df['Time'].dt.strftime("%Y/%m/%d").unique().tolist()
-    else:
-        cached_date = []
-        print("Table 'sales_data' does not exist. Skipping the operation.")
+def logout(driver, timeouts: dict = None):
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.CSS_SELECTOR, '.menu-icon'))).click()
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.CSS_SELECTOR, 'div[href="/user/logout"]'))).click()
+    get_wait(driver, timeouts, 'page').until(EC.element_to_be_clickable((By.CLASS_NAME, "k-button.k-primary"))).click()
+
+class QueueWriter:
+    """
+    Stand-in for SalesWriter in parallel workers: forwards add/mark calls
+    to the writer thread through a queue.
+    """
+
+    def __init__(self, rows_queue: queue.Queue):
+        self.rows_queue = rows_queue
+
+    def add(self, date: str, df: pd.DataFrame) -> None:
+        self.rows_queue.put(('add', (date, df)))
+
+    def mark(self, date: str, state: str, rows: int = None, error: str = None) -> None:
+        self.rows_queue.put(('mark', (date, state, rows, error)))
+
+def _collect_worker(worker_id: int, year_months: list, done_dates, rows_queue: queue.Queue, timeouts: dict, headless: bool,
+                    credentials: dict = None):
+    # one independent, separately logged in browser session per worker
+    driver = get_chrome_driver(headless= headless)
+    writer = QueueWriter(rows_queue)
+    start_time = time.perf_counter()
+    pages = 0
+    try:
+        login(driver, timeouts, credentials)
+        for y, m in year_months:
+            try:
+                pages += scrape_month(driver, y, m, writer, done_dates, timeouts)
+            except Exception as e:
+                print(f"Err: [worker {worker_id}] skipping {y}/{m:02d}: {e}")
+        report_throughput(pages, start_time, label= f"[worker {worker_id}] ")
+        logout(driver, timeouts)
+    finally:
+        driver.quit()
+    return pages
+
+def _write_rows(db_path, rows_queue: queue.Queue):
+    # the only connection that writes sales_data during a parallel collection
+    conn = connect_db(db_path)
+    writer = SalesWriter(conn)
+    try:
+        while True:
+            item = rows_queue.get()
+            if item is None:
+                break
+            method, args = item
+            # keep draining the queue on errors so workers never block on a full queue
+            try:
+                getattr(writer, method)(*args)
+            except Exception as e:
+                print(f"Err: could not save {', '.join(writer.dates)}: {e}")
+                writer.discard()
+        writer.flush()
+    finally:
+        conn.close()
+
+def collect_parallel(db_path, workers: int = 4, timeouts: dict = None, headless: bool = True, year_months: list = None, rescrape_dates: list = None,
+                     credentials: dict = None):
+    """
+    Scrape with `workers` browser sessions at once, each taking every n-th month.
+    Scraped days are handed to a single writer thread, so SQLite only ever has one writer.
+    """
+    if year_months is None:
+        year_months = get_all_year_months(start_year= START_YEAR, start_month= START_MONTH)
+    conn = connect_db(db_path)
+    done_dates = load_done_dates(conn) - set(rescrape_dates or [])
+    conn.close()
+
+    rows_queue = queue.Queue(maxsize= 4 * workers)
+    writer = threading.Thread(target= _write_rows, args= (db_path, rows_queue))
+    writer.start()
+    start_time = time.perf_counter()
+    pages = 0
+    try:
+        # browsers are separate processes, threads only wait on them
+        with ThreadPoolExecutor(max_workers= workers) as executor:
+            futures = [
+                executor.submit(_collect_worker, i, year_months[i::workers], done_dates, rows_queue, timeouts, headless, credentials)
+                for i in range(workers)
+            ]
+            for future in as_completed(futures):
+                try:
+                    pages += future.result()
+                except Exception as e:
+                    print(f"Err: {e} at line {e.__traceback__.tb_lineno}")
+    finally:
+        rows_queue.put(None)
+        writer.join()
+    report_throughput(pages, start_time)
+
+def main(db_path, timeouts: dict = None, workers: int = 1, rescrape_dates: list = None, backend: str = 'selenium',
+         credentials: dict = None, headless: bool = False):
+    """
+    rescrape_dates: "YYYY/MM/DD" dates to scrape again even though they are done,
+    e.g. after a partial run. Rows already stored are ignored.
+    backend: 'selenium' drives Chrome, 'http' fetches the grid data directly (http_collection)
+    credentials: login of the store to scrape, the .env login when not given
+    """
+    if backend == 'http':
+        from data_processing.http_collection import collect_http
+        conn = connect_db(db_path)
+        done_dates = load_done_dates(conn) - set(rescrape_dates or [])
+        conn.close()
+        collect_http(db_path, workers= workers, done_dates= done_dates, credentials= credentials)
+        return
+    if workers > 1:
+        collect_parallel(db_path, workers= workers, timeouts= timeouts, rescrape_dates= rescrape_dates, credentials= credentials)
+        return
+
+    driver = get_chrome_driver(headless= headless)
+    login(driver, timeouts, credentials)
+    conn = connect_db(db_path)
+    done_dates = load_done_dates(conn) - set(rescrape_dates or [])
 
     try:
-        get_data(driver=driver, conn= conn)
+        get_data(driver=driver, conn= conn, done_dates= done_dates, timeouts= timeouts)
     except Exception as e:
         print(f"Err: {e} at line {e.__traceback__.tb_lineno}")
         pass
@@ -149,4 +402,13 @@ def main(db_path):
         driver.quit()
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Scrape daily transactions into sales_data')
+    arg_parser.add_argument('--db-path', default='data/database.db')
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help='number of parallel headless browser sessions, or concurrent requests with --backend http')
+    arg_parser.add_argument('--backend', choices=['selenium', 'http'], default='selenium')
+    arg_parser.add_argument('--rescrape', nargs='*', default=[], metavar='YYYY/MM/DD',
+                            help='dates to scrape again, rows already stored are skipped')
+    args = arg_parser.parse_args()
+    main(db_path= args.db_path, workers= args.workers, rescrape_dates= args.rescrape, backend= args.backend)
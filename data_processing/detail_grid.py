@@ -0,0 +1,81 @@
+"""
+Extraction of the jqGrid detailGrid (one day's transactions) from the revenue page.
+
+read_detail_grid pulls the cell texts straight out of the browser with one
+execute_script call. extract_detail_rows parses saved HTML: it cuts out the detailGrid
+table instead of parsing the whole page and uses lxml when it is installed.
+benchmarks/detail_grid_benchmark.py compares it with the full-page BeautifulSoup parse.
+"""
+import pandas as pd
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # extract_detail_rows falls back to BeautifulSoup
+    lxml = None
+
+DETAIL_COLUMNS = ['Time', 'Equipment', 'Channel', 'Amount']
+
+# cell texts of every transaction row, as a list of lists. Each text node is trimmed and
+# the pieces joined, so cells with nested elements read like get_text(strip=True).
+DETAIL_GRID_SCRIPT = """
+const cellText = td => {
+    const walker = document.createTreeWalker(td, NodeFilter.SHOW_TEXT);
+    const pieces = [];
+    while (walker.nextNode()) pieces.push(walker.currentNode.data.trim());
+    return pieces.join('');
+};
+return Array.from(
+    document.querySelectorAll('#detailGrid tr.jqgrow'),
+    tr => Array.from(tr.cells, cellText)
+);
+"""
+
+# titles of the day cells shown by a month query
+MONTH_DATES_SCRIPT = """
+return Array.from(document.querySelectorAll('td[title]'), td => td.title);
+"""
+
+def read_detail_grid(driver):
+    """
+    Cell texts of the open detailGrid, read in the browser in a single round trip
+    """
+    return driver.execute_script(DETAIL_GRID_SCRIPT)
+
+def read_month_dates(driver):
+    """
+    Set of "YYYY/MM/DD" titles on the month grid, i.e. the days with sales
+    """
+    return set(driver.execute_script(MONTH_DATES_SCRIPT))
+
+def _detail_grid_fragment(html: str):
+    start = html.find('id="detailGrid"')
+    if start == -1:
+        return None
+    start = html.rfind('<table', 0, start)
+    end = html.find('</table>', start)
+    return html[start:end + len('</table>')]
+
+def extract_detail_rows(html: str):
+    """
+    Cell texts of the detailGrid transaction rows in a page (or table) HTML string
+    """
+    fragment = _detail_grid_fragment(html)
+    if fragment is None:
+        return []
+    if lxml is not None:
+        table = lxml.html.fromstring(fragment)
+        rows = table.xpath('.//tr[contains(concat(" ", normalize-space(@class), " "), " jqgrow ")]')
+        # strip each text piece and join them, like BeautifulSoup's get_text(strip=True)
+        return [[''.join(text.strip() for text in td.itertext()) for td in row.findall('td')] for row in rows]
+    table = BeautifulSoup(fragment, "html.parser")
+    return [[cell.get_text(strip=True) for cell in row.find_all('td')]
+            for row in table.find_all('tr', class_='jqgrow')]
+
+def detail_rows_to_df(date: str, rows: list):
+    """
+    Typed DataFrame of one day's transactions; Time is combined with the date
+    """
+    df = pd.DataFrame(rows, columns= DETAIL_COLUMNS)
+    df['Time'] = pd.to_datetime(f'{date} ' + df['Time'], format='%Y/%m/%d %H:%M')
+    return df
@@ -0,0 +1,176 @@
+"""
+Browserless collection backend.
+
+Logs in with a pooled requests.Session and fetches the JSON the revenue page's jqGrids
+load, instead of driving Chrome. Scraped days go through the same SalesWriter and
+scrape_progress bookkeeping as the Selenium scraper.
+
+The endpoint paths come from .env (REVENUE_QUERY_PATH, REVENUE_DETAIL_PATH); read them
+off the browser's network tab when the revenue page runs a query or opens a day. Both
+grids are expected in jqGrid's JSON reader format:
+    {"rows": [{"id": "...", "cell": ["2024/01/31", ...]}, ...]}
+The defaults match the bundled mock site (mock_revenue_site.py, mock_revenue_server.py).
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode, urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import sys
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from util.time_select import get_first_and_last_dates, get_month_dates, get_all_year_months
+from util.retry import with_retries
+from data_processing.detail_grid import detail_rows_to_df
+from data_processing.sales_store import connect_db, load_done_dates, SalesWriter, DONE, FAILED
+from data_processing.data_collection import START_YEAR, START_MONTH
+
+load_dotenv()
+
+DEFAULT_QUERY_PATH = '/owner/revenue/query'
+DEFAULT_DETAIL_PATH = '/owner/revenue/detail'
+
+def grid_rows(payload):
+    """
+    Cell lists of a jqGrid JSON response ({"rows": [{"cell": [...]}]}, or plain lists/dicts)
+    """
+    rows = payload.get('rows', []) if isinstance(payload, dict) else payload
+    cells = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = row['cell'] if 'cell' in row else list(row.values())
+        cells.append([str(cell).strip() for cell in row])
+    return cells
+
+class HttpCollector:
+    """
+    Revenue page client on a pooled requests.Session.
+
+    Parameters:
+    -----------
+    login_url : str
+        The login form URL (LOGIN_URL); the endpoint paths are resolved against it
+    workers : int
+        How many days are fetched concurrently; also the connection pool size
+    record_dir : str
+        If set, every response is saved there in the format mock_revenue_server replays
+    """
+
+    def __init__(self, login_url: str, workers: int = 4, timeout: float = 20, record_dir: str = None,
+                 query_path: str = None, detail_path: str = None):
+        self.login_url = login_url
+        self.workers = workers
+        self.timeout = timeout
+        self.query_url = urljoin(login_url, query_path or os.getenv('REVENUE_QUERY_PATH', DEFAULT_QUERY_PATH))
+        self.detail_url = urljoin(login_url, detail_path or os.getenv('REVENUE_DETAIL_PATH', DEFAULT_DETAIL_PATH))
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections= 1, pool_maxsize= workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests = 0
+        self._record_lock = threading.Lock()
+
+    def login(self, username: str, password: str) -> None:
+        # same form fields as the login page (userId, password)
+        response = self.session.post(self.login_url, data= {'userId': username, 'password': password}, timeout= self.timeout)
+        response.raise_for_status()
+        print('Logged In')
+
+    def get_json(self, url: str, params: dict):
+        response = self.session.get(url, params= params, timeout= self.timeout)
+        response.raise_for_status()
+        self.requests += 1
+        payload = response.json()
+        if self.record_dir is not None:
+            with self._record_lock:
+                record_response(self.record_dir, url, params, payload)
+        return payload
+
+    def fetch_month_dates(self, year: int, month: int):
+        """
+        Set of "YYYY/MM/DD" days with sales in the month (first cell of the month grid)
+        """
+        start_date, end_date = get_first_and_last_dates(year, month)
+        payload = self.get_json(self.query_url, {'startDate': start_date, 'endDate': end_date})
+        return {row[0] for row in grid_rows(payload) if row}
+
+    def fetch_day(self, date: str):
+        payload = self.get_json(self.detail_url, {'date': date})
+        return detail_rows_to_df(date, grid_rows(payload))
+
+    def collect(self, writer, done_dates = (), year_months: list = None, retries: int = 3, backoff: float = 2.0):
+        """
+        Fetch every day that is not in done_dates into writer, `workers` days at a time.
+        Only the calling thread touches writer.
+        """
+        if year_months is None:
+            year_months = get_all_year_months(start_year= START_YEAR, start_month= START_MONTH)
+        today = datetime.today().strftime("%Y/%m/%d")
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers= self.workers) as executor:
+            for y, m in year_months:
+                month_dates = [date for date in get_month_dates(y, m) if date <= today and date not in done_dates]
+                if not month_dates:
+                    continue
+                try:
+                    dates_with_sales = with_retries(lambda: self.fetch_month_dates(y, m), f"{y}/{m:02d}", retries, backoff)
+                except Exception as e:
+                    print(f"Err: giving up on {y}/{m:02d}: {e}")
+                    for date in month_dates:
+                        writer.mark(date, FAILED, error= str(e))
+                    continue
+                futures = {}
+                for date in month_dates:
+                    if date in dates_with_sales:
+                        futures[date] = executor.submit(with_retries, lambda date=date: self.fetch_day(date), date, retries, backoff)
+                    elif date < today:
+                        writer.mark(date, DONE, rows= 0)
+                for date, future in futures.items():
+                    try:
+                        writer.add(date, future.result())
+                        print(f"Fetched data on {date}")
+                    except Exception as e:
+                        print(f"Err: giving up on {date}: {e}")
+                        writer.mark(date, FAILED, error= str(e))
+        elapsed = time.perf_counter() - start_time
+        print(f"Fetched {self.requests} responses in {elapsed:.1f}s ({self.requests / max(elapsed, 1e-9) * 60:.1f} pages/min)")
+
+def recording_key(path: str, params: dict):
+    # path and sorted query string identify a recorded response
+    return f"{urlsplit(path).path}?{urlencode(sorted(params.items()))}"
+
+def record_response(record_dir: Path, url: str, params: dict, payload) -> None:
+    record_dir.mkdir(parents=True, exist_ok=True)
+    index_path = record_dir / 'index.json'
+    index = json.loads(index_path.read_text()) if index_path.exists() else {}
+    key = recording_key(url, params)
+    body_file = index.get(key, f"response_{len(index):05d}.json")
+    (record_dir / body_file).write_text(json.dumps(payload, ensure_ascii=False))
+    index[key] = body_file
+    index_path.write_text(json.dumps(index, ensure_ascii=False, indent=1))
+
+def collect_http(db_path, workers: int = 4, done_dates = None, year_months: list = None, record_dir: str = None, login_url: str = None,
+                 credentials: dict = None):
+    """
+    Log in and fetch everything not yet done into sales_data.
+    credentials: username / password / login_url of the store, the .env login when not given
+    """
+    credentials = credentials or {}
+    collector = HttpCollector(login_url or credentials.get('login_url') or os.getenv('LOGIN_URL'), workers= workers, record_dir= record_dir)
+    collector.login(credentials.get('username') or os.getenv('USERNAME'), credentials.get('password') or os.getenv('PASSWORD'))
+    conn = connect_db(db_path)
+    try:
+        if done_dates is None:
+            done_dates = load_done_dates(conn)
+        with SalesWriter(conn) as writer:
+            collector.collect(writer, done_dates, year_months)
+    finally:
+        conn.close()
@@ -0,0 +1,75 @@
+"""
+Local stand-in for the revenue site that replays recorded JSON responses, so the HTTP
+backend (http_collection) can be run and benchmarked offline. The pages and the server
+are mock_revenue_site's; only the grid responses come from the recordings.
+
+A recording directory holds index.json, mapping "path?sorted query" to a response file.
+HttpCollector(record_dir=...) writes recordings of the real site; write_recordings_from_db
+builds them from an existing sales_data table.
+
+    python data_processing/mock_revenue_server.py data/recordings --port 8765 --latency 0.2
+"""
+import json
+import threading
+from pathlib import Path
+import sys
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from util.time_select import get_first_and_last_dates
+from data_processing.data_cleaning import read_df_from_db
+from data_processing.http_collection import recording_key, record_response, DEFAULT_QUERY_PATH, DEFAULT_DETAIL_PATH
+from data_processing.mock_revenue_site import day_cells, grid_payload, month_payload, serve as serve_lookup
+
+def replay_lookup(record_dir: Path):
+    """
+    Grid lookup for mock_revenue_site.serve that answers from the recordings, 404 for anything not recorded
+    """
+    index = json.loads((record_dir / 'index.json').read_text())
+
+    def lookup(path: str, params: dict):
+        body_file = index.get(recording_key(path, params))
+        if body_file is None:
+            return None
+        return 200, (record_dir / body_file).read_bytes()
+
+    return lookup
+
+def serve(record_dir, port: int = 0, latency: float = 0):
+    """
+    Start the replay server in a background thread. Returns the server;
+    its base URL is f"http://127.0.0.1:{server.server_port}", stop it with server.shutdown().
+    """
+    return serve_lookup(replay_lookup(Path(record_dir)), port, latency)
+
+def write_recordings_from_db(db_path, record_dir, query_path: str = DEFAULT_QUERY_PATH, detail_path: str = DEFAULT_DETAIL_PATH):
+    """
+    Record month and day responses for every transaction in sales_data
+    """
+    record_dir = Path(record_dir)
+    days = day_cells(read_df_from_db(db_path, 'sales_data', columns= ['Time', 'Equipment', 'Channel', 'Amount']))
+    for month in sorted({date[:7] for date in days}):
+        start_date, end_date = get_first_and_last_dates(int(month[:4]), int(month[5:]))
+        record_response(record_dir, query_path, {'startDate': start_date, 'endDate': end_date},
+                        month_payload(days, start_date, end_date))
+        for date, rows in days.items():
+            if date.startswith(month):
+                record_response(record_dir, detail_path, {'date': date}, grid_payload(rows))
+    print(f"Recordings saved to {record_dir}")
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Replay recorded revenue page responses')
+    arg_parser.add_argument('record_dir')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--latency', type=float, default=0, help='seconds added to every GET')
+    arg_parser.add_argument('--from-db', help='first record every day of this database\'s sales_data')
+    args = arg_parser.parse_args()
+    if args.from_db:
+        write_recordings_from_db(args.from_db, args.record_dir)
+    server = serve(args.record_dir, args.port, args.latency)
+    print(f"Serving {args.record_dir} on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
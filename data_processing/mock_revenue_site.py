@@ -0,0 +1,214 @@
+"""
+Local stand-in for the revenue site, so both collection backends can run offline against
+known sales: the Selenium scraper (data_collection, also collect_parallel) drives its pages
+and the HTTP backend (http_collection) fetches the grid JSON behind them.
+
+It serves the parts the scraper drives: the login form, the menu, the revenue page with
+#startDate / #endDate / #query, the month grid (td[title="YYYY/MM/DD"] for each day with
+sales) and the detail dialog with #detailGrid rows and its Close link. Like the jqGrid
+pages, the month grid and the detail rows are loaded with XMLHttpRequest, in jqGrid's JSON
+reader format from the paths http_collection uses, and rendered as new elements.
+The grid responses come from a lookup function; serve_site answers them from sales_data
+rows, mock_revenue_server from recordings.
+
+    python data_processing/mock_revenue_site.py data/database.db --port 8766 --latency 0.2
+
+then log in at http://127.0.0.1:8766/login with any user id and password.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.data_cleaning import read_df_from_db
+from data_processing.http_collection import DEFAULT_QUERY_PATH, DEFAULT_DETAIL_PATH
+
+MENU = """
+<div class="menu-icon" onclick="document.getElementById('menu').style.display = 'block'">&#9776;</div>
+<div id="menu" style="display: none">
+  <div href="/owner/revenue" onclick="location.href = '/owner/revenue'">Revenue</div>
+  <div href="/user/logout" onclick="document.getElementById('logout').style.display = 'block'">Log out</div>
+</div>
+<div id="logout" style="display: none">
+  Log out? <button class="k-button k-primary" onclick="location.href = '/login'">OK</button>
+</div>
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Mock revenue site</title></head><body>
+<form method="post" action="/login">
+  <input name="userId"> <input name="password" type="password"> <button type="submit">Log in</button>
+</form>
+</body></html>"""
+
+HOME_PAGE = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Home</title></head><body>{MENU}</body></html>"""
+
+REVENUE_PAGE = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Revenue</title></head><body>
+{MENU}
+<input id="startDate"> <input id="endDate"> <button id="query">Query</button>
+<table id="monthGrid"><tbody></tbody></table>
+<div id="dialog" style="display: none">
+  <a aria-label="Close" href="#">x</a>
+  <table id="detailGrid"><tbody></tbody></table>
+</div>
+<script>
+function load(url, render) {{
+    const request = new XMLHttpRequest();
+    request.open('GET', url);
+    request.onload = () => {{ if (request.status === 200) render(JSON.parse(request.responseText)); }};
+    request.send();
+}}
+function esc(text) {{
+    return String(text).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;');
+}}
+function rows(tbody, html) {{
+    // new row elements on every load, like jqGrid
+    tbody.innerHTML = html;
+}}
+document.getElementById('query').addEventListener('click', () => {{
+    const query = new URLSearchParams({{
+        startDate: document.getElementById('startDate').value,
+        endDate: document.getElementById('endDate').value,
+    }});
+    load('{DEFAULT_QUERY_PATH}?' + query, data => rows(
+        document.querySelector('#monthGrid tbody'),
+        data.rows.map(row => `<tr class="jqgrow"><td title="${{esc(row.cell[0])}}">${{esc(row.cell[0])}}</td><td>${{esc(row.cell[1])}}</td></tr>`).join('')));
+}});
+document.getElementById('monthGrid').addEventListener('click', event => {{
+    const date = event.target.getAttribute('title');
+    if (!date) return;
+    load('{DEFAULT_DETAIL_PATH}?' + new URLSearchParams({{date: date}}), data => {{
+        rows(document.querySelector('#detailGrid tbody'),
+             data.rows.map(row => '<tr class="ui-widget-content jqgrow ui-row-ltr">'
+                                  + row.cell.map(cell => `<td>${{esc(cell)}}</td>`).join('') + '</tr>').join(''));
+        document.getElementById('dialog').style.display = 'block';
+    }});
+}});
+document.querySelector('a[aria-label="Close"]').addEventListener('click', event => {{
+    event.preventDefault();
+    document.getElementById('dialog').style.display = 'none';
+}});
+</script>
+</body></html>"""
+
+PAGES = {
+    '/': LOGIN_PAGE,
+    '/login': LOGIN_PAGE,
+    '/home': HOME_PAGE,
+    '/owner/revenue': REVENUE_PAGE,
+}
+
+def day_cells(sales: pd.DataFrame):
+    """{"YYYY/MM/DD": [[HH:MM, Equipment, Channel, Amount], ...]} in Time order, as text"""
+    sales = sales.sort_values('Time', kind='stable')
+    dates = sales['Time'].dt.strftime("%Y/%m/%d")
+    cells = pd.DataFrame({
+        'Time': sales['Time'].dt.strftime("%H:%M"),
+        'Equipment': sales['Equipment'].astype(str),
+        'Channel': sales['Channel'].astype(str),
+        'Amount': sales['Amount'].astype(str),
+    })
+    return {date: day.to_numpy().tolist() for date, day in cells.groupby(dates, sort=True)}
+
+def grid_payload(rows: list):
+    # jqGrid's JSON reader format, as http_collection.grid_rows reads it
+    return {'rows': [{'id': str(i), 'cell': row} for i, row in enumerate(rows)]}
+
+def month_payload(days: dict, start_date: str, end_date: str):
+    """Month grid of the days between start_date and end_date: [date, transactions] per day with sales"""
+    return grid_payload([[date, str(len(rows))] for date, rows in days.items() if start_date <= date <= end_date])
+
+def make_handler(lookup, latency: float = 0):
+    """
+    lookup(path, params) answers the grid requests with (status, JSON bytes), or None for a 404.
+    latency: seconds before each grid response
+    """
+
+    class SiteHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes = b'', content_type: str = 'text/html; charset=utf-8', headers: dict = None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            # any login succeeds
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._send(303, headers= {'Location': '/home', 'Set-Cookie': 'session=mock; Path=/'})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            page = PAGES.get(url.path)
+            if page is not None:
+                self._send(200, page.encode('utf-8'))
+                return
+            if latency:
+                time.sleep(latency)
+            response = lookup(url.path, dict(parse_qsl(url.query)))
+            if response is None:
+                self._send(404, b'not found', 'text/plain')
+                return
+            status, body = response
+            self._send(status, body, 'application/json')
+
+        def log_message(self, format, *args):
+            pass
+
+    return SiteHandler
+
+def serve(lookup, port: int = 0, latency: float = 0):
+    """
+    Start the site in a background thread, answering grid requests with lookup (see make_handler).
+    Returns the server; log in at f"http://127.0.0.1:{server.server_port}/login",
+    stop it with server.shutdown().
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(lookup, latency))
+    threading.Thread(target= server.serve_forever, daemon= True).start()
+    return server
+
+def serve_site(sales: pd.DataFrame, port: int = 0, latency: float = 0, fail_months = ()):
+    """
+    Serve the pages for these sales_data rows (Time, Equipment, Channel, Amount), see serve.
+    fail_months: "YYYY/MM" months whose month query answers 500, to exercise retries
+    """
+    days = day_cells(sales)
+
+    def lookup(path: str, params: dict):
+        if path == DEFAULT_QUERY_PATH:
+            start_date, end_date = params.get('startDate', ''), params.get('endDate', '')
+            if start_date[:7] in fail_months:
+                return 500, b'{"error": "month query failed"}'
+            payload = month_payload(days, start_date, end_date)
+        elif path == DEFAULT_DETAIL_PATH:
+            payload = grid_payload(days.get(params.get('date'), []))
+        else:
+            return None
+        return 200, json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    return serve(lookup, port, latency)
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Serve the sales_data rows of a database as the revenue site')
+    arg_parser.add_argument('db_path')
+    arg_parser.add_argument('--port', type=int, default=8766)
+    arg_parser.add_argument('--latency', type=float, default=0, help='seconds before each grid response')
+    args = arg_parser.parse_args()
+    server = serve_site(read_df_from_db(args.db_path, 'sales_data', columns= ['Time', 'Equipment', 'Channel', 'Amount']),
+                        args.port, args.latency)
+    print(f"Log in at http://127.0.0.1:{server.server_port}/login, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,115 @@
+"""
+Period-over-period comparisons (MoM, YoY, same weekday last year) on the rollups.
+
+The monthly and daily rollups are already aggregated, so each comparison pivots a few
+hundred rows into a period x group matrix, fills the calendar gaps and compares it with
+a shifted copy of itself. The rollups are read once per database state and cached.
+"""
+import sqlite3
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.rollups import read_rollup, DAILY_ROLLUP, MONTHLY_ROLLUP
+from data_processing.rolling import complete_calendar
+
+# number of rows of the completed calendar between a period and the one it is compared with
+MONTHLY_LAGS = {'MoM': 1, 'YoY': 12}
+# 364 days = 52 weeks, so the previous-year day falls on the same weekday
+DAILY_LAGS = {'DoD': 1, 'WoW': 7, 'SWLY': 364}
+
+def rollup_marker(db_path):
+    """
+    Fingerprint of the rollups. They are updated in the same transaction that appends to
+    clean_sales_data, so its highest rowid plus the schema version identify their state.
+    """
+    conn = sqlite3.connect(db_path)
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    max_rowid = conn.execute("SELECT MAX(rowid) FROM clean_sales_data").fetchone()[0]
+    conn.close()
+    return schema_version, max_rowid
+
+@lru_cache(maxsize=8)
+def _cached_rollup(db_path, table_name, marker):
+    return read_rollup(db_path, table_name)
+
+def load_rollup(db_path, table_name= MONTHLY_ROLLUP):
+    """
+    Rollup table as a DataFrame, cached until the database changes.
+    Treat the result as read-only; it is shared between calls.
+    """
+    db_path = str(Path(db_path).resolve())
+    return _cached_rollup(db_path, table_name, rollup_marker(db_path))
+
+def _period_matrix(df, period, by, value, freq):
+    """
+    Pivot `value` to one row per period (every period of the calendar, gaps filled with 0)
+    and one column per combination of `by`
+    """
+    wide = pd.pivot_table(df.assign(Period= period), index= 'Period', columns= by or None,
+                          values= value, aggfunc= 'sum', fill_value= 0, observed= True)
+    return complete_calendar(wide, freq)
+
+def _compare(wide, lags: dict, value, by):
+    """
+    Compare every period with the period `lag` rows earlier for each named lag, in one
+    pass over the (periods x groups) matrix. Returns one row per period and group.
+    """
+    current = wide.to_numpy(dtype=float)
+    columns = {value: current.ravel()}
+    for name, lag in lags.items():
+        previous = np.full_like(current, np.nan)
+        if lag < len(current):
+            previous[lag:] = current[:-lag]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(previous != 0, (current - previous) / np.abs(previous) * 100, np.nan)
+        columns[f'{name}_Previous'] = previous.ravel()
+        columns[f'{name}_Change'] = (current - previous).ravel()
+        columns[f'{name}_Pct'] = pct.ravel()
+    # row-major ravel: period i, group j is row i * n_groups + j
+    keys = {'Period': np.repeat(wide.index.to_numpy(), wide.shape[1])}
+    if by:
+        groups = pd.DataFrame(list(wide.columns), columns= by)
+        for column in by:
+            keys[column] = np.tile(groups[column].to_numpy(), len(wide))
+    return pd.DataFrame({**keys, **columns})
+
+def compare_monthly(monthly:pd.DataFrame, by: list = ('Unit',), value = 'Amount', lags: dict = None):
+    """
+    MoM and YoY comparison of a monthly rollup (Year, Month, by..., value).
+
+    Parameters:
+    -----------
+    monthly : pd.DataFrame
+        Rows of monthly_sales_rollup, or any frame with Year and Month columns
+    by : list
+        Grouping columns, e.g. ['Unit'], ['Equipment_Category'] or [] for the store total
+    lags : dict
+        Name -> lag in months, defaults to MONTHLY_LAGS
+
+    Returns:
+    --------
+    DataFrame with Year, Month, the `by` columns, `value` and for each lag the
+    <name>_Previous, <name>_Change and <name>_Pct (percent, NaN when previous is 0) columns
+    """
+    by = list(by)
+    period = pd.to_datetime(pd.DataFrame({'year': monthly['Year'], 'month': monthly['Month'], 'day': 1}))
+    wide = _period_matrix(monthly, period, by, value, 'MS')
+    result = _compare(wide, lags or MONTHLY_LAGS, value, by)
+    result.insert(0, 'Year', result['Period'].dt.year)
+    result.insert(1, 'Month', result['Period'].dt.month)
+    return result.drop(columns= 'Period')
+
+def compare_daily(daily:pd.DataFrame, by: list = ('Unit',), value = 'Amount', lags: dict = None):
+    """
+    Day-over-day, week-over-week and same-weekday-last-year comparison of a daily rollup.
+    Same parameters as compare_monthly, with lags in days (DAILY_LAGS by default).
+    """
+    by = list(by)
+    wide = _period_matrix(daily, pd.to_datetime(daily['Date']), by, value, 'D')
+    result = _compare(wide, lags or DAILY_LAGS, value, by)
+    return result.rename(columns= {'Period': 'Date'})
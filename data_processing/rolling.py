@@ -0,0 +1,77 @@
+"""
+Multi-window rolling statistics over a complete calendar.
+
+The pivots in data_analysis only have rows for days (or months) with sales, so a
+positional .rolling(7) can span more than 7 calendar days. complete_calendar fills the
+gaps first; rolling_stats then computes every window from one cumulative-sum pass.
+"""
+import numpy as np
+import pandas as pd
+
+def complete_calendar(df, freq: str = 'D', fill_value = 0):
+    """
+    Reindex a DataFrame/Series with a DatetimeIndex to every period between its first
+    and last date (freq 'D' for days, 'MS' for months), filling the new rows.
+    """
+    if len(df) == 0:
+        return df
+    index = pd.date_range(df.index.min(), df.index.max(), freq= freq, name= df.index.name)
+    return df.reindex(index, fill_value= fill_value)
+
+def rolling_stats(values: pd.Series, windows, stats = ('mean',), min_periods: int = None):
+    """
+    Trailing rolling statistics of `values` for several window sizes at once.
+
+    Parameters:
+    -----------
+    values : pd.Series
+        Evenly spaced values, e.g. the output of complete_calendar. NaN values are
+        skipped, as in pandas
+    windows : int or list of int
+        Window sizes in rows
+    stats : tuple
+        Any of 'sum', 'mean' and 'std' (sample std, ddof=1 like pandas)
+    min_periods : int
+        Non-NaN values a window needs for a result, the window size by default
+
+    Returns:
+    --------
+    DataFrame with the index of `values` and one column per statistic and window,
+    named like 'mean_7'. As with .rolling(window, min_periods), windows with fewer than
+    min_periods values are NaN, and so is std for windows with fewer than 2.
+    """
+    windows = np.atleast_1d(np.asarray(windows, dtype=int))
+    x = values.to_numpy(dtype=float)
+    n = len(x)
+    missing = np.isnan(x)
+    # centering keeps the sum of squares small, so var = E[x^2] - E[x]^2 stays accurate
+    shift = x[~missing].mean() if (~missing).any() else 0.0
+    centered = np.where(missing, 0.0, x - shift)
+    csum = np.concatenate([[0.0], np.cumsum(centered)])
+    ccount = np.concatenate([[0], np.cumsum(~missing)])
+    end = np.arange(1, n + 1)[None, :]
+    start = end - windows[:, None]
+    start = np.clip(start, 0, None)
+    # non-NaN values in each window, the first windows are cut short at row 0
+    counts = ccount[end] - ccount[start]
+    required = windows[:, None] if min_periods is None else max(min_periods, 1)
+    enough = counts >= required
+    window_sums = np.where(enough, csum[end] - csum[start], np.nan)
+
+    result = {}
+    for stat in stats:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if stat == 'sum':
+                block = window_sums + shift * counts
+            elif stat == 'mean':
+                block = window_sums / counts + shift
+            elif stat == 'std':
+                csum_sq = np.concatenate([[0.0], np.cumsum(centered ** 2)])
+                window_sq = csum_sq[end] - csum_sq[start]
+                var = (window_sq - window_sums ** 2 / counts) / (counts - 1)
+                block = np.where(counts >= 2, np.sqrt(np.clip(var, 0, None)), np.nan)
+            else:
+                raise ValueError(f"Unknown statistic {stat!r}, expected 'sum', 'mean' or 'std'")
+        for window, row in zip(windows, block):
+            result[f'{stat}_{window}'] = row
+    return pd.DataFrame(result, index= values.index)
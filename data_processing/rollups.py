@@ -0,0 +1,97 @@
+"""
+Daily and monthly sales rollups maintained by the cleaning step.
+
+daily_sales_rollup   : one row per Date x Unit x Equipment_Category
+monthly_sales_rollup : one row per Year x Month x Unit x Equipment_Category
+
+Both carry the summed Amount and the number of Transactions. Cleaning only ever appends
+new raw rows, so each cleaned batch is aggregated and added onto the existing rows with
+an upsert instead of re-aggregating the whole history.
+"""
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.data_cleaning import read_df_from_db
+
+DAILY_ROLLUP = 'daily_sales_rollup'
+MONTHLY_ROLLUP = 'monthly_sales_rollup'
+
+ROLLUP_KEYS = {
+    DAILY_ROLLUP: ['Date', 'Unit', 'Equipment_Category'],
+    MONTHLY_ROLLUP: ['Year', 'Month', 'Unit', 'Equipment_Category'],
+}
+# calendar columns carried along with the daily key
+DAILY_EXTRA_COLUMNS = ['Year', 'Month', 'Weekday']
+
+def create_rollup_tables(conn, rebuild: bool = False):
+    if rebuild:
+        conn.execute(f"DROP TABLE IF EXISTS {DAILY_ROLLUP}")
+        conn.execute(f"DROP TABLE IF EXISTS {MONTHLY_ROLLUP}")
+    conn.execute(f""" CREATE TABLE IF NOT EXISTS {DAILY_ROLLUP} (
+                        Date TEXT,
+                        Year INTEGER,
+                        Month INTEGER,
+                        Weekday INTEGER,
+                        Unit TEXT,
+                        Equipment_Category TEXT,
+                        Amount INTEGER,
+                        Transactions INTEGER,
+                        PRIMARY KEY (Date, Unit, Equipment_Category)
+                    ) """)
+    conn.execute(f""" CREATE TABLE IF NOT EXISTS {MONTHLY_ROLLUP} (
+                        Year INTEGER,
+                        Month INTEGER,
+                        Unit TEXT,
+                        Equipment_Category TEXT,
+                        Amount INTEGER,
+                        Transactions INTEGER,
+                        PRIMARY KEY (Year, Month, Unit, Equipment_Category)
+                    ) """)
+
+def aggregate_sales(df:pd.DataFrame, keys: list):
+    """
+    Sum Amount and count transactions of clean rows by `keys`
+    """
+    return df.groupby(keys, observed=True).agg(
+        Amount= ('Amount', 'sum'),
+        Transactions= ('Amount', 'size')
+    ).reset_index()
+
+def _upsert(conn, table_name, rollup:pd.DataFrame, keys: list):
+    columns = list(rollup.columns)
+    conn.executemany(f""" INSERT INTO {table_name} ({', '.join(columns)})
+                          VALUES ({', '.join(['?'] * len(columns))})
+                          ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+                              Amount = Amount + excluded.Amount,
+                              Transactions = Transactions + excluded.Transactions """,
+                     rollup.astype(object).itertuples(index=False, name=None))
+
+def update_rollups(conn, df:pd.DataFrame, rebuild: bool = False):
+    """
+    Add a batch of newly cleaned rows (with Equipment_Key) to the rollup tables.
+    Runs inside the caller's transaction; nothing is committed here.
+    """
+    create_rollup_tables(conn, rebuild= rebuild)
+    categories = pd.read_sql(""" SELECT Equipment_Key, Equipment_Category FROM equipment """, con= conn)
+    batch = df[['Date', 'Year', 'Month', 'Weekday', 'Amount']].copy()
+    # same text form to_sql gives datetimes, so Date ranges compare like Time
+    batch['Date'] = batch['Date'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    # NULL never conflicts in a primary key, so missing keys get a placeholder
+    batch['Unit'] = df['Unit'].astype(object).fillna('unknown')
+    batch['Equipment_Category'] = df['Equipment_Key'].map(categories.set_index('Equipment_Key')['Equipment_Category']).fillna('unknown')
+
+    daily = aggregate_sales(batch, ROLLUP_KEYS[DAILY_ROLLUP] + DAILY_EXTRA_COLUMNS)
+    _upsert(conn, DAILY_ROLLUP, daily, ROLLUP_KEYS[DAILY_ROLLUP])
+    monthly = aggregate_sales(batch, ROLLUP_KEYS[MONTHLY_ROLLUP])
+    _upsert(conn, MONTHLY_ROLLUP, monthly, ROLLUP_KEYS[MONTHLY_ROLLUP])
+
+def read_rollup(db_path, table_name= DAILY_ROLLUP, columns: list = None, start = None, end = None):
+    """
+    Read a rollup table; rows have the Date/Year/Month, Unit and Amount columns the
+    analysis functions pivot on, at one row per day (or month) instead of per transaction.
+    start / end filter the daily rollup on Date.
+    """
+    return read_df_from_db(db_path, table_name, columns= columns, start= start, end= end, time_column= 'Date')
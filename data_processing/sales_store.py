@@ -0,0 +1,210 @@
+"""
+SQLite storage for scraped sales_data rows.
+"""
+import sqlite3
+from datetime import datetime
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.data_cleaning import table_exists, create_time_index
+
+SALES_COLUMNS = ['Time', 'Equipment', 'Channel', 'Amount']
+# natural key of a transaction; Seq numbers identical transactions within a day
+SALES_KEY = SALES_COLUMNS + ['Seq']
+
+def connect_db(db_path, timeout: float = 30):
+    """
+    Open the database in WAL mode, so readers (cleaning, analysis) are not blocked
+    while the scraper writes, and wait up to `timeout` seconds on a locked database.
+    """
+    conn = sqlite3.connect(db_path, timeout= timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # with WAL, NORMAL only syncs at checkpoints and is still safe against corruption
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def create_sales_table(conn, table_name: str = 'sales_data'):
+    """
+    Create sales_data with a unique index on its natural key, adding and backfilling
+    the Seq column on tables created before it existed.
+    """
+    # same column types pandas.to_sql created for the table
+    conn.execute(f""" CREATE TABLE IF NOT EXISTS {table_name} (
+                        "Time" TIMESTAMP,
+                        "Equipment" TEXT,
+                        "Channel" TEXT,
+                        "Amount" TEXT,
+                        "Seq" INTEGER
+                    ) """)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    if 'Seq' not in columns:
+        print(f"Adding Seq to {table_name}.")
+        with conn:
+            # explicit transaction so the column is never left half backfilled
+            conn.execute("BEGIN")
+            conn.execute(f""" ALTER TABLE {table_name} ADD COLUMN Seq INTEGER """)
+            conn.execute(f""" CREATE TEMP TABLE seq_backfill AS
+                              SELECT rowid AS rid,
+                                     ROW_NUMBER() OVER (PARTITION BY {', '.join(SALES_COLUMNS)} ORDER BY rowid) - 1 AS seq
+                              FROM {table_name} """)
+            conn.execute(""" CREATE INDEX temp.idx_seq_backfill ON seq_backfill (rid) """)
+            conn.execute(f""" UPDATE {table_name}
+                              SET Seq = (SELECT seq FROM seq_backfill WHERE rid = {table_name}.rowid) """)
+            conn.execute(""" DROP TABLE temp.seq_backfill """)
+    conn.execute(f""" CREATE UNIQUE INDEX IF NOT EXISTS idx_{table_name}_key ON {table_name} ({', '.join(SALES_KEY)}) """)
+    conn.commit()
+
+# scrape_progress.State values
+DONE = 'done'         # every transaction of the day is stored (or the day had no sales)
+PENDING = 'pending'   # scraped, but the day was not over yet
+FAILED = 'failed'     # gave up after retries, scraped again on the next run
+
+def create_progress_table(conn):
+    conn.execute(""" CREATE TABLE IF NOT EXISTS scrape_progress (
+                        Date TEXT PRIMARY KEY,
+                        State TEXT,
+                        Rows INTEGER,
+                        Attempts INTEGER,
+                        Error TEXT,
+                        Updated_At TEXT
+                    ) """)
+    conn.commit()
+
+def record_progress(conn, records: list):
+    """
+    Upsert (date, state, rows, error) records into scrape_progress. Not committed here.
+    """
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.executemany(""" INSERT INTO scrape_progress (Date, State, Rows, Attempts, Error, Updated_At)
+                         VALUES (?, ?, ?, 1, ?, ?)
+                         ON CONFLICT (Date) DO UPDATE SET
+                             State = excluded.State,
+                             Rows = excluded.Rows,
+                             Attempts = Attempts + 1,
+                             Error = excluded.Error,
+                             Updated_At = excluded.Updated_At """,
+                     [(date, state, rows, error, updated_at) for date, state, rows, error in records])
+
+def load_cached_date(conn):
+    """
+    Set of "YYYY/MM/DD" dates already in sales_data, excluded from scraping.
+
+    Walks the Time index one day at a time (one index seek per day), so the cost
+    depends on the number of days rather than the number of transactions.
+    """
+    # Check if the table 'sales_data' exists
+    if not table_exists(conn, 'sales_data'):
+        print("Table 'sales_data' does not exist. Skipping the operation.")
+        return set()
+    create_time_index(conn, 'sales_data')
+    conn.commit()
+    days = conn.execute(""" WITH RECURSIVE days(day) AS (
+                                SELECT substr(MIN(Time), 1, 10) FROM sales_data
+                                UNION ALL
+                                SELECT (SELECT substr(MIN(Time), 1, 10) FROM sales_data WHERE Time >= date(day, '+1 day'))
+                                FROM days WHERE day IS NOT NULL
+                            )
+                            SELECT day FROM days WHERE day IS NOT NULL """).fetchall()
+    return {day.replace('-', '/') for day, in days}
+
+def load_done_dates(conn):
+    """
+    Set of "YYYY/MM/DD" dates whose scrape is finished, from scrape_progress.
+    The first time, the table is seeded with the days already in sales_data
+    (except today, which may be partial).
+    """
+    create_progress_table(conn)
+    if conn.execute("SELECT COUNT(*) FROM scrape_progress").fetchone()[0] == 0:
+        today = datetime.today().strftime("%Y/%m/%d")
+        with conn:
+            record_progress(conn, [(date, DONE, None, None) for date in load_cached_date(conn) if date < today])
+    return {date for date, in conn.execute("SELECT Date FROM scrape_progress WHERE State = ?", (DONE,))}
+
+def add_sequence(df: pd.DataFrame):
+    """
+    Number identical transactions of one day 0, 1, 2, ... in page order
+    """
+    df['Seq'] = df.groupby(SALES_COLUMNS, sort=False).cumcount()
+    return df
+
+class SalesWriter:
+    """
+    Buffer scraped days and insert them into sales_data with executemany,
+    one transaction per `batch_size` rows.
+
+    Rows whose natural key (SALES_KEY) is already stored are ignored, so a day can
+    be scraped again after a partial or crashed run without creating duplicates.
+    The scrape_progress state of each day is written in the same transaction as its rows.
+
+    Used as a context manager, buffered days are still written when the scrape
+    raises, so a crash only loses the day that was being scraped.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 2000, table_name: str = 'sales_data'):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.table_name = table_name
+        self.rows = []
+        self.dates = []
+        self.progress = []
+        self.saved_rows = 0
+        create_sales_table(conn, table_name)
+        create_progress_table(conn)
+
+    def add(self, date: str, df: pd.DataFrame) -> None:
+        """
+        Queue all transactions of one day, flushing once the batch is full.
+        """
+        rows = df[SALES_COLUMNS].copy()
+        rows['Time'] = rows['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+        rows = add_sequence(rows)
+        self.rows.extend(rows.itertuples(index=False, name=None))
+        self.dates.append(date)
+        # today's page keeps growing, so it is only final once the day is over
+        state = DONE if date < datetime.today().strftime("%Y/%m/%d") else PENDING
+        self.progress.append((date, state, len(rows), None))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def mark(self, date: str, state: str, rows: int = None, error: str = None) -> None:
+        """
+        Queue a progress record for a day without transactions to store,
+        e.g. a day without sales (DONE, 0 rows) or one that kept failing (FAILED).
+        """
+        self.progress.append((date, state, rows, error))
+
+    def flush(self) -> None:
+        """
+        Insert the buffered rows in a single transaction.
+        """
+        if not self.dates and not self.progress:
+            return
+        changes_before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                f""" INSERT OR IGNORE INTO {self.table_name} ({', '.join(SALES_KEY)}) VALUES (?, ?, ?, ?, ?) """,
+                self.rows)
+            inserted = self.conn.total_changes - changes_before
+            record_progress(self.conn, self.progress)
+        self.saved_rows += inserted
+        if self.dates:
+            print(f"Saved {inserted} new rows ({len(self.rows) - inserted} already stored) for {', '.join(self.dates)}")
+        self.discard()
+
+    def discard(self) -> None:
+        """
+        Drop the buffered rows, e.g. after a failed flush.
+        """
+        self.rows = []
+        self.dates = []
+        self.progress = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
@@ -0,0 +1,87 @@
+"""
+Columnar snapshot of clean_sales_data for the analysis entry points.
+
+The snapshot is an uncompressed Arrow IPC (feather) file next to the database, with
+typed and categorical columns, so it can be memory-mapped instead of re-reading SQLite
+and re-parsing Time on every run. A small marker file records the state of the database
+the snapshot was taken from; the snapshot is rebuilt as soon as the marker changes.
+"""
+import json
+import os
+import sqlite3
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.data_cleaning import read_clean_sales
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # snapshots are optional, read_snapshot falls back to SQLite
+    pa = None
+    feather = None
+
+def db_change_marker(db_path, table_name= 'clean_sales_data'):
+    """
+    Cheap fingerprint of the fact and equipment tables.
+
+    PRAGMA data_version only changes within a single connection, so the marker is built
+    from PRAGMA schema_version (bumped by a full rebuild) plus the highest rowid of the
+    append-only fact table and of the equipment table, which are O(1) lookups.
+    """
+    conn = sqlite3.connect(db_path)
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table_name}").fetchone()[0]
+    max_equipment_key = conn.execute("SELECT MAX(Equipment_Key) FROM equipment").fetchone()[0]
+    conn.close()
+    return {
+        'table': table_name,
+        'schema_version': schema_version,
+        'max_rowid': max_rowid,
+        'max_equipment_key': max_equipment_key
+    }
+
+def _snapshot_paths(db_path, cache_dir, table_name):
+    cache_dir = Path(cache_dir) if cache_dir is not None else Path(db_path).resolve().parent / 'cache'
+    return cache_dir / f'{table_name}.arrow', cache_dir / f'{table_name}.marker.json'
+
+def write_snapshot(db_path, cache_dir= None, table_name= 'clean_sales_data'):
+    """
+    Read the table from SQLite and write it as a snapshot. Returns the DataFrame.
+    """
+    snapshot_path, marker_path = _snapshot_paths(db_path, cache_dir, table_name)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    marker = db_change_marker(db_path, table_name)
+    df = read_clean_sales(db_path, categorical=True)
+
+    # write to temporary files first so a reader never sees a half written snapshot
+    tmp_snapshot = snapshot_path.with_suffix('.arrow.tmp')
+    feather.write_feather(df, tmp_snapshot, compression='uncompressed')
+    os.replace(tmp_snapshot, snapshot_path)
+    tmp_marker = marker_path.with_suffix('.json.tmp')
+    tmp_marker.write_text(json.dumps(marker))
+    os.replace(tmp_marker, marker_path)
+    print(f"Snapshot saved to {snapshot_path}")
+    return df
+
+def read_snapshot(db_path, columns: list = None, cache_dir= None, table_name= 'clean_sales_data'):
+    """
+    Return clean_sales_data (with equipment attributes) from the snapshot, rebuilding it
+    first if the database changed since it was written.
+
+    - columns: only load these columns from the snapshot
+    """
+    if feather is None:
+        df = read_clean_sales(db_path, categorical=True)
+        return df if columns is None else df[columns]
+
+    snapshot_path, marker_path = _snapshot_paths(db_path, cache_dir, table_name)
+    marker = db_change_marker(db_path, table_name)
+    if snapshot_path.exists() and marker_path.exists() and json.loads(marker_path.read_text()) == marker:
+        return feather.read_table(snapshot_path, columns=columns, memory_map=True).to_pandas()
+
+    df = write_snapshot(db_path, cache_dir, table_name)
+    return df if columns is None else df[columns]
@@ -0,0 +1,149 @@
+"""
+Several stores, one partitioned database per store.
+
+Every store keeps the single-store layout in its own directory,
+data/stores/{store_id}/database.db (plus its exports and cache), so collection, cleaning
+and the rollups work unchanged and stores never contend for the same SQLite file.
+
+The stores are listed in data/stores.json:
+
+    [{"id": "taipei", "name": "Taipei Main St."}, {"id": "banqiao", "backend": "http", "workers": 4}]
+
+and each store logs in with its own .env entries, e.g. for store "taipei":
+
+    STORE_TAIPEI_USERNAME, STORE_TAIPEI_PASSWORD, STORE_TAIPEI_LOGIN_URL (defaults to LOGIN_URL)
+"""
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from dotenv import load_dotenv
+from data_processing.rollups import read_rollup, DAILY_ROLLUP
+
+load_dotenv()
+
+STORE_CONFIG = 'data/stores.json'
+STORES_DIR = 'data/stores'
+
+def load_stores(config_path = STORE_CONFIG):
+    """
+    Store entries (dicts with at least an "id") from the store config. Without a config
+    file, the comma separated STORE_IDS environment variable lists the store ids.
+    """
+    config_path = Path(config_path)
+    if config_path.exists():
+        stores = json.loads(config_path.read_text(encoding='utf-8'))
+    else:
+        stores = [{'id': store_id.strip()} for store_id in os.getenv('STORE_IDS', '').split(',') if store_id.strip()]
+    for store in stores:
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', str(store.get('id', ''))):
+            raise ValueError(f"Invalid store id {store.get('id')!r}, use letters, digits, '-' and '_'")
+    return stores
+
+def store_db_path(store_id: str, root = STORES_DIR):
+    """
+    Database of one store; its directory is created if needed
+    """
+    db_path = Path(root) / store_id / 'database.db'
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    return db_path
+
+def store_credentials(store_id: str):
+    """
+    Login of one store from STORE_{ID}_USERNAME / _PASSWORD / _LOGIN_URL. The login URL
+    falls back to LOGIN_URL; username and password have no fallback, so one store's
+    login is never used for another.
+    """
+    prefix = 'STORE_' + re.sub(r'\W', '_', store_id).upper()
+    credentials = {
+        'username': os.getenv(f'{prefix}_USERNAME'),
+        'password': os.getenv(f'{prefix}_PASSWORD'),
+        'login_url': os.getenv(f'{prefix}_LOGIN_URL') or os.getenv('LOGIN_URL'),
+    }
+    missing = [f'{prefix}_{key.upper()}' for key, value in credentials.items() if not value]
+    if missing:
+        raise KeyError(f"Missing {', '.join(missing)} for store {store_id}")
+    return credentials
+
+def run_store(store: dict, root = STORES_DIR, collect: bool = True, clean: bool = True, export: bool = True):
+    """
+    Collect and clean one store into its own database. Runs in a worker process of run_stores.
+    """
+    from data_processing import data_cleaning, data_collection
+    store_id = store['id']
+    db_path = str(store_db_path(store_id, root))
+    if collect:
+        data_collection.main(db_path, workers= store.get('workers', 1), backend= store.get('backend', 'selenium'),
+                             credentials= store_credentials(store_id), headless= True)
+    if clean:
+        data_cleaning.main(db_path, export= export)
+    return db_path
+
+def run_stores(stores: list = None, processes: int = None, root = STORES_DIR, **kwargs):
+    """
+    Run run_store for every store in parallel worker processes. A failing store is
+    reported and does not stop the others. Returns {store id: db path or the error}.
+    """
+    stores = load_stores() if stores is None else stores
+    results = {}
+    with ProcessPoolExecutor(max_workers= processes or len(stores) or 1) as executor:
+        futures = {executor.submit(run_store, store, root, **kwargs): store['id'] for store in stores}
+        for future in as_completed(futures):
+            store_id = futures[future]
+            try:
+                results[store_id] = future.result()
+                print(f"[{store_id}] done")
+            except Exception as e:
+                print(f"Err: [{store_id}] {e}")
+                results[store_id] = e
+    return results
+
+def read_store_rollups(store_ids: list = None, table_name = DAILY_ROLLUP, columns: list = None,
+                       start = None, end = None, root = STORES_DIR):
+    """
+    One rollup table of several stores, with a Store column. Only the small per-store
+    rollups are read, never the raw rows; the analysis pivots (Date x Unit, ...) then sum
+    across stores unless they are filtered with select_stores.
+    """
+    store_ids = [store['id'] for store in load_stores()] if store_ids is None else store_ids
+    frames = []
+    for store_id in store_ids:
+        db_path = Path(root) / store_id / 'database.db'
+        if not db_path.exists():
+            print(f"Err: no database for store {store_id}")
+            continue
+        frames.append(read_rollup(db_path, table_name, columns= columns, start= start, end= end).assign(Store= store_id))
+    if not frames:
+        return pd.DataFrame(columns= (columns or []) + ['Store'])
+    df = pd.concat(frames, ignore_index=True)
+    df['Store'] = df['Store'].astype('category')
+    return df
+
+def select_stores(df: pd.DataFrame, store = None):
+    """
+    Rows of one store id or a list of store ids; df unchanged when store is None
+    """
+    if store is None:
+        return df
+    stores = [store] if isinstance(store, str) else list(store)
+    return df[df['Store'].isin(stores)]
+
+if __name__ == '__main__':
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Collect and clean every store, one process per store')
+    arg_parser.add_argument('--config', default=STORE_CONFIG)
+    arg_parser.add_argument('--stores', nargs='*', metavar='ID', help='only these store ids')
+    arg_parser.add_argument('--processes', type=int, help='parallel stores, defaults to all of them')
+    arg_parser.add_argument('--skip-collect', action='store_true')
+    arg_parser.add_argument('--skip-clean', action='store_true')
+    arg_parser.add_argument('--skip-export', action='store_true')
+    args = arg_parser.parse_args()
+    stores = [store for store in load_stores(args.config) if not args.stores or store['id'] in args.stores]
+    run_stores(stores, processes= args.processes, collect= not args.skip_collect,
+               clean= not args.skip_clean, export= not args.skip_export)
@@ -0,0 +1,181 @@
+"""
+Machine utilization from transaction times.
+
+Each paid transaction on a washer or dryer starts a cycle of a known length, so the
+transactions of a machine give its occupied intervals. Overlapping intervals (e.g. a
+cycle paid partly in 元 and partly in 點) are merged per machine, then
+
+- hourly_busy_fraction splits the intervals at hour boundaries and sums the busy seconds
+  per machine and hour of day with np.bincount
+- peak_concurrency sweeps +1/-1 events to find how many machines run at once
+
+Everything works on int64 second arrays, no Python loop over transactions.
+"""
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+# Dynamically find the project root and add it to sys.path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from data_processing.snapshot_cache import read_snapshot
+
+# cycle length in minutes by (Equipment_Category, Wash_Scale); None is the fallback for a
+# category whose scale is missing or not listed. Other categories are not occupied.
+CYCLE_MINUTES = {
+    ('wash', 'medium'): 60,
+    ('wash', 'large'): 70,
+    ('wash', None): 60,
+    ('dry', 'large'): 40,
+    ('dry', None): 40,
+}
+UTILIZATION_COLUMNS = ['Time', 'Amount', 'Equipment_ID', 'Equipment_Category', 'Wash_Scale']
+HOUR = 3600
+DAY = 24 * HOUR
+
+def cycle_seconds(category: pd.Series, scale: pd.Series, cycle_minutes: dict = None):
+    """
+    Cycle length in seconds for each row, NaN where the category has no cycle.
+    Only the distinct (category, scale) pairs are looked up, then indexed by their codes.
+    """
+    cycle_minutes = cycle_minutes or CYCLE_MINUTES
+    category_codes, categories = pd.factorize(category)
+    scale_codes, scales = pd.factorize(scale)
+    # one extra row/column for missing values, which factorize codes as -1
+    table = np.full((len(categories) + 1, len(scales) + 1), np.nan)
+    for i, name in enumerate(list(categories) + [None]):
+        for j, size in enumerate(list(scales) + [None]):
+            table[i, j] = cycle_minutes.get((name, size), cycle_minutes.get((name, None), np.nan))
+    return table[category_codes, scale_codes] * 60
+
+def occupancy_intervals(df:pd.DataFrame, cycle_minutes: dict = None, machine_column = 'Equipment_ID'):
+    """
+    Merged occupied intervals per machine.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Clean sales rows with Time, Amount, Equipment_Category, Wash_Scale and machine_column
+    cycle_minutes : dict
+        (Equipment_Category, Wash_Scale) -> minutes, defaults to CYCLE_MINUTES
+
+    Returns:
+    --------
+    DataFrame with machine_column, Equipment_Category, Start and End (int64 seconds since
+    the epoch), sorted by machine and Start, with no two intervals of a machine overlapping
+    """
+    duration = cycle_seconds(df['Equipment_Category'], df['Wash_Scale'], cycle_minutes)
+    # refunds and corrections carry non-positive amounts and start no cycle
+    keep = ~np.isnan(duration) & (df['Amount'].to_numpy() > 0) & df[machine_column].notna().to_numpy()
+    codes, labels = pd.factorize(df.loc[keep, machine_column], sort= True)
+    category_codes, category_names = pd.factorize(df.loc[keep, 'Equipment_Category'])
+    start = df.loc[keep, 'Time'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    end = start + duration[keep].astype(np.int64)
+
+    # epoch seconds fit in 32 bits, so (machine, time) packs into one int64 sort key
+    order = np.argsort((codes.astype(np.int64) << 32) | start)
+    codes, category_codes, start, end = codes[order], category_codes[order], start[order], end[order]
+    # an interval opens a new block when it starts after everything before it on the same
+    # machine has ended. With the machine in the high bits, a running max over the packed
+    # End restarts at each machine.
+    reach = np.maximum.accumulate((codes.astype(np.int64) << 32) | end) & 0xFFFFFFFF
+    new_block = np.ones(len(start), dtype=bool)
+    new_block[1:] = (codes[1:] != codes[:-1]) | (start[1:] > reach[:-1])
+    first = np.flatnonzero(new_block)
+    return pd.DataFrame({
+        machine_column: np.asarray(labels, dtype=object)[codes[first]],
+        'Equipment_Category': np.asarray(category_names, dtype=object)[category_codes[first]],
+        'Start': start[first],
+        'End': np.maximum.reduceat(end, first) if len(first) else end,
+    })
+
+def _split_by_hour(start, end):
+    """
+    Split intervals at hour boundaries. Returns the source row, the hour (seconds since
+    the epoch // 3600) and the seconds of the interval inside that hour for each piece.
+    """
+    first_hour = start // HOUR
+    pieces = (end - 1) // HOUR - first_hour + 1
+    row = np.repeat(np.arange(len(start)), pieces)
+    offsets = np.arange(len(row)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    hour = first_hour[row] + offsets
+    seconds = np.minimum(end[row], (hour + 1) * HOUR) - np.maximum(start[row], hour * HOUR)
+    return row, hour, seconds
+
+def _observed_days(intervals, days):
+    if days is not None:
+        return days
+    return int(intervals['End'].max() // DAY - intervals['Start'].min() // DAY + 1)
+
+def hourly_busy_fraction(intervals:pd.DataFrame, machine_column = 'Equipment_ID', days: int = None):
+    """
+    Share of time each machine is occupied, by hour of day (local time as stored).
+
+    - days: number of days observed, defaults to the span of the intervals
+
+    Returns a machine x hour-of-day (0-23) DataFrame of fractions between 0 and 1
+    """
+    machines, codes = np.unique(intervals[machine_column].astype(str), return_inverse= True)
+    if len(machines) == 0:
+        return pd.DataFrame(columns= range(24), dtype=float)
+    row, hour, seconds = _split_by_hour(intervals['Start'].to_numpy(), intervals['End'].to_numpy())
+    busy = np.bincount(codes[row] * 24 + hour % 24, weights= seconds, minlength= len(machines) * 24)
+    fraction = busy.reshape(len(machines), 24) / (_observed_days(intervals, days) * HOUR)
+    return pd.DataFrame(fraction, index= pd.Index(machines, name= machine_column), columns= range(24))
+
+def peak_concurrency(intervals:pd.DataFrame, by = 'Equipment_Category', days: int = None):
+    """
+    Sweep-line concurrency curve by hour of day.
+
+    Each interval adds +1 at Start and -1 at End; the running sum over the time-sorted
+    events is the number of machines in use. Zero-weight events at every hour boundary
+    make sure an hour fully covered by a long cycle still gets its level.
+
+    Returns a DataFrame indexed by hour of day with, per group of `by` (or 'all' if None),
+    the peak number of machines running at once in that hour over all days and the mean
+    number running (busy machine-seconds / observed seconds).
+    """
+    groups = intervals[by].astype(str).to_numpy() if by else np.full(len(intervals), 'all')
+    names, group = np.unique(groups, return_inverse= True)
+    start, end = intervals['Start'].to_numpy(), intervals['End'].to_numpy()
+    if len(names) == 0:
+        return pd.DataFrame(index= pd.RangeIndex(24, name= 'Hour'))
+
+    boundaries = np.arange(start.min() // HOUR, end.max() // HOUR + 1) * HOUR
+    boundary_group = np.repeat(np.arange(len(names)), len(boundaries))
+    time = np.concatenate([start, end, np.tile(boundaries, len(names))])
+    delta = np.concatenate([np.ones(len(start), dtype=np.int64), -np.ones(len(end), dtype=np.int64),
+                            np.zeros(len(boundary_group), dtype=np.int64)])
+    event_group = np.concatenate([group, group, boundary_group])
+    # within a group and timestamp, ends come before starts so back-to-back cycles don't count twice
+    order = np.lexsort((delta, time, event_group))
+    # every interval adds +1 and -1 in its own group, so the running sum is back at 0 at
+    # each group boundary and one cumsum serves all groups
+    level = np.cumsum(delta[order])
+    hour_of_day = (time[order] // HOUR) % 24
+
+    peak = np.zeros(len(names) * 24, dtype=np.int64)
+    np.maximum.at(peak, event_group[order] * 24 + hour_of_day, level)
+    row, hour, seconds = _split_by_hour(start, end)
+    busy = np.bincount(group[row] * 24 + hour % 24, weights= seconds, minlength= len(names) * 24)
+    mean = busy / (_observed_days(intervals, days) * HOUR)
+
+    columns = pd.MultiIndex.from_product([names, ['Peak', 'Mean']], names= [by or 'Group', 'Metric'])
+    data = np.stack([peak.reshape(len(names), 24), mean.reshape(len(names), 24)], axis=1)
+    return pd.DataFrame(data.reshape(len(names) * 2, 24).T, index= pd.RangeIndex(24, name= 'Hour'), columns= columns)
+
+def utilization(db_path, cycle_minutes: dict = None, start = None, end = None):
+    """
+    Read clean sales from the snapshot and return (busy fraction heatmap, concurrency curve)
+    for the transactions between start and end
+    """
+    df = read_snapshot(db_path, columns= UTILIZATION_COLUMNS)
+    if start is not None:
+        df = df[df['Time'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Time'] < pd.Timestamp(end)]
+    intervals = occupancy_intervals(df, cycle_minutes)
+    if len(intervals) == 0:
+        return hourly_busy_fraction(intervals), peak_concurrency(intervals)
+    days = int((df['Time'].max().normalize() - df['Time'].min().normalize()).days + 1)
+    return hourly_busy_fraction(intervals, days= days), peak_concurrency(intervals, days= days)
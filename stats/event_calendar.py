@@ -0,0 +1,218 @@
+"""
+Holiday / event calendar for the daily sales tests.
+
+Events are rows of (Event, Start, Days). Chinese New Year is built in; typhoon days and
+school holidays differ per year and region, so they are loaded from a CSV with the same
+columns (see load_events).
+
+Every day is placed relative to the events with one np.searchsorted over the sorted
+event starts: the days since the latest event started, how far the latest running event
+reaches, and the days until the next event. The window labels of any (days_before,
+event_days) configuration are then plain comparisons on those arrays, which lets
+window_grid test a whole grid of configurations on one set of daily totals.
+"""
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# first day of Chinese New Year
+CNY_DATES = {
+    2020: '2020-01-25',
+    2021: '2021-02-12',
+    2022: '2022-02-01',
+    2023: '2023-01-22',
+    2024: '2024-02-10',
+    2025: '2025-01-29',
+    2026: '2026-02-17',
+    2027: '2027-02-06',
+    2028: '2028-01-26',
+    2029: '2029-02-13',
+    2030: '2030-02-03',
+}
+
+# window labels returned by label_windows
+REGULAR, PRE, DURING, POST = 0, 1, 2, 3
+WINDOW_NAMES = np.array(['regular', 'pre', 'during', 'post'])
+
+def make_events(name: str, dates, days: int = 1):
+    """
+    Event table with one row per start date, each lasting `days` days
+    """
+    starts = pd.to_datetime(pd.Series(list(dates)))
+    return pd.DataFrame({'Event': name, 'Start': starts, 'Days': days})
+
+def cny_events(holiday_days: int = 5):
+    return make_events('CNY', CNY_DATES.values(), holiday_days)
+
+def load_events(path, name: str = None):
+    """
+    Read events from a CSV with Event, Start and optionally Days (default 1) columns,
+    e.g. typhoon days off or school holidays. `name` keeps only that Event.
+    """
+    events = pd.read_csv(path, parse_dates=['Start'])
+    if 'Days' not in events.columns:
+        events['Days'] = 1
+    if name is not None:
+        events = events[events['Event'] == name]
+    return events[['Event', 'Start', 'Days']].reset_index(drop=True)
+
+def _day_numbers(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+def event_offsets(dates, events:pd.DataFrame):
+    """
+    Position of each date relative to the events, from one searchsorted pass.
+
+    Returns:
+    --------
+    since_start : days since the latest event started on or before the date (NaN if none)
+    since_end   : days since the latest-ending of those events ended, negative while one
+                  is still running, so nested or overlapping events are handled (NaN if none)
+    until_next  : days until the next event starts after the date (NaN if none)
+    """
+    day = _day_numbers(dates).astype(float)
+    if len(events) == 0:
+        missing = np.full(len(day), np.nan)
+        return missing, missing.copy(), missing.copy()
+    events = events.sort_values('Start')
+    start = _day_numbers(events['Start']).astype(float)
+    reach = np.maximum.accumulate(start + events['Days'].to_numpy(dtype=float))
+
+    latest = np.searchsorted(start, day, side='right') - 1
+    upcoming = latest + 1
+    since_start = np.where(latest >= 0, day - start[latest.clip(0)], np.nan)
+    since_end = np.where(latest >= 0, day - reach[latest.clip(0)], np.nan)
+    until_next = np.where(upcoming < len(start), start[upcoming.clip(max= len(start) - 1)] - day, np.nan)
+    return since_start, since_end, until_next
+
+def window_masks(since_start, since_end, until_next, days_before, event_days, days_after):
+    """
+    (pre, during, post) boolean masks; with array arguments the masks broadcast, so a
+    column vector of days_before gives one row per configuration
+    """
+    with np.errstate(invalid='ignore'):
+        if event_days is None:
+            during = since_end < 0
+            after = since_end
+        else:
+            during = since_start < event_days
+            after = since_start - event_days
+        pre = (until_next >= 1) & (until_next <= days_before)
+        post = (after >= 0) & (after < days_after)
+    return pre, during, post
+
+def label_windows(dates, events:pd.DataFrame, days_before: int = 14, event_days: int = None, days_after: int = 0):
+    """
+    Label each date as REGULAR, PRE, DURING or POST relative to the events.
+
+    Parameters:
+    -----------
+    dates : array-like of dates
+    events : pd.DataFrame
+        Event, Start, Days rows (e.g. cny_events() or load_events())
+    days_before : int
+        Days before an event start labelled PRE
+    event_days : int
+        Length of every event; None uses each event's own Days
+    days_after : int
+        Days after an event ends labelled POST
+
+    A date in several windows gets the first of DURING, PRE, POST.
+    """
+    pre, during, post = window_masks(*event_offsets(dates, events), days_before, event_days, days_after)
+    return np.select([during, pre, post], [DURING, PRE, POST], REGULAR).astype(np.int8)
+
+def daily_totals(df:pd.DataFrame, value = 'Amount'):
+    """
+    Sum transaction or rollup rows to one row per Date
+    """
+    return df.groupby(pd.to_datetime(df['Date']))[value].sum().reset_index()
+
+def mannwhitney_batch(values, group1, group2, alternative = 'greater'):
+    """
+    Mann-Whitney U tests of many (group1, group2) subsets of the same values at once.
+
+    Parameters:
+    -----------
+    values : 1-d array of n values
+    group1, group2 : (configurations, n) boolean masks selecting each sample
+
+    Returns (U of group1, p-value) arrays. Ranks come from a single sort of `values` and a
+    cumulative count of the selected values per tie block. The p-values use the normal
+    approximation with tie and continuity correction, like
+    scipy.stats.mannwhitneyu(method='asymptotic').
+    """
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    group1 = np.atleast_2d(group1)[:, order].astype(np.int64)
+    group2 = np.atleast_2d(group2)[:, order].astype(np.int64)
+    if len(values) == 0:
+        return np.full(len(group1), np.nan), np.full(len(group1), np.nan)
+    blocks = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    selected = np.add.reduceat(group1 + group2, blocks, axis=1)
+    in_group1 = np.add.reduceat(group1, blocks, axis=1)
+    below = np.cumsum(selected, axis=1) - selected
+    # tied values share the average of the ranks they span
+    rank_sum = (in_group1 * (below + (selected + 1) / 2)).sum(axis=1)
+    n1, n2 = group1.sum(axis=1), group2.sum(axis=1)
+    n = n1 + n2
+    u1 = rank_sum - n1 * (n1 + 1) / 2
+    u2 = n1 * n2 - u1
+
+    ties = (selected ** 3 - selected).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+        if alternative == 'greater':
+            z = (u1 - n1 * n2 / 2 - 0.5) / sigma
+            p = stats.norm.sf(z)
+        elif alternative == 'less':
+            z = (u2 - n1 * n2 / 2 - 0.5) / sigma
+            p = stats.norm.sf(z)
+        elif alternative == 'two-sided':
+            z = (np.maximum(u1, u2) - n1 * n2 / 2 - 0.5) / sigma
+            p = np.clip(2 * stats.norm.sf(z), 0, 1)
+        else:
+            raise ValueError(f"Unknown alternative {alternative!r}")
+    p = np.where((n1 > 0) & (n2 > 0), p, np.nan)
+    return u1, p
+
+def window_grid(daily_sales:pd.DataFrame, events:pd.DataFrame, days_before_grid, event_days_grid,
+                alternative = 'greater', value = 'Amount'):
+    """
+    Test pre-event against regular days for every (days_before, event_days) pair.
+
+    Daily totals are labelled once; each configuration only changes the comparisons on
+    the offset arrays, and all Mann-Whitney tests run in one mannwhitney_batch call.
+
+    Returns a DataFrame with one row per configuration: days_before, event_days, the
+    mean / median / days of both samples, percent_difference, statistic and p_value.
+    """
+    days_before, event_days = np.meshgrid(np.asarray(days_before_grid), np.asarray(event_days_grid), indexing='ij')
+    days_before, event_days = days_before.ravel()[:, None], event_days.ravel()[:, None]
+    amounts = daily_sales[value].to_numpy(dtype=float)
+    pre, during, _ = window_masks(*event_offsets(daily_sales['Date'], events), days_before, event_days, 0)
+    regular = ~(pre | during)
+
+    statistic, p_value = mannwhitney_batch(amounts, pre, regular, alternative)
+    # empty samples give NaN statistics instead of warnings
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        pre_values = np.where(pre, amounts, np.nan)
+        regular_values = np.where(regular, amounts, np.nan)
+        pre_mean, regular_mean = np.nanmean(pre_values, axis=1), np.nanmean(regular_values, axis=1)
+        result = pd.DataFrame({
+            'days_before': days_before.ravel(),
+            'event_days': event_days.ravel(),
+            'pre_daily_mean': pre_mean,
+            'regular_daily_mean': regular_mean,
+            'pre_daily_median': np.nanmedian(pre_values, axis=1),
+            'regular_daily_median': np.nanmedian(regular_values, axis=1),
+            'pre_days': pre.sum(axis=1),
+            'regular_days': regular.sum(axis=1),
+            'percent_difference': (pre_mean - regular_mean) / regular_mean * 100,
+            'statistic': statistic,
+            'p_value': p_value,
+        })
+    return result
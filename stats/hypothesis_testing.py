@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import scipy.stats as stats
 import statsmodels.api as sm
 from typing import Union, Tuple, Dict
@@ -13,14 +15,18 @@ from pathlib import Path
 # Dynamically find the project root and add it to sys.path
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
-from data_processing.data_cleaning import read_df_from_db
+from data_processing.rollups import read_rollup, DAILY_ROLLUP
+from data_processing.stores import read_store_rollups, select_stores
+from stats.resampling import resampling_tests
+from stats.event_calendar import CNY_DATES, cny_events, daily_totals, event_offsets, window_masks, window_grid
 
 class NormalityAnalyzer:
     """
     A class to analyze the normality of data through various statistical methods and visualizations.
     """
     
-    def __init__(self, data: Union[pd.Series, np.ndarray], column_name: str = "Value"):
+    def __init__(self, data: Union[pd.Series, np.ndarray], column_name: str = "Value",
+                 max_sample: int = 5000, seed: int = 0):
         """
         Initialize the analyzer with data.
         
@@ -30,24 +36,48 @@ class NormalityAnalyzer:
             The data to analyze
         column_name : str
             Name of the data column for plotting
+        max_sample : int
+            Shapiro-Wilk and the plots use a seeded random subsample of at most this many
+            points; Shapiro-Wilk p-values are not reliable above 5000 points
+        seed : int
+            Seed of the subsample, so repeated runs give the same results
         """
         self.data = pd.Series(data) if isinstance(data, np.ndarray) else data
         self.column_name = column_name
+        self.max_sample = max_sample
+        self.seed = seed
     
-    def plot_normality_checks(self) -> None:
+    def sample(self) -> pd.Series:
+        """
+        The data, or a seeded subsample of max_sample points when it is larger
+        """
+        if len(self.data) <= self.max_sample:
+            return self.data
+        return self.data.sample(n=self.max_sample, random_state=self.seed)
+    
+    def plot_normality_checks(self, save_path: str = None) -> None:
         """
         Create visual plots to check normality:
         1. Histogram with normal curve overlay
         2. Q-Q plot
+        
+        With save_path the figure is rendered with the Agg canvas and written to that file
+        instead of shown, so no display is needed (e.g. under cron).
         """
         # Create a figure with two subplots side by side
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        if save_path is None:
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        else:
+            fig = Figure(figsize=(15, 6))
+            FigureCanvasAgg(fig)
+            ax1, ax2 = fig.subplots(1, 2)
+        sample = self.sample()
         
         # Histogram with normal curve
         mu, sigma = stats.norm.fit(self.data)
         x = np.linspace(self.data.min(), self.data.max(), 100)
         
-        ax1.hist(self.data, bins='auto', density=True, alpha=0.7, color='skyblue')
+        ax1.hist(sample, bins='auto', density=True, alpha=0.7, color='skyblue')
         ax1.plot(x, stats.norm.pdf(x, mu, sigma), 'r-', lw=2, 
                 label=f'Normal(μ={mu:.1f}, σ={sigma:.1f})')
         ax1.set_title(f'Histogram of {self.column_name} with Normal Curve')
@@ -56,11 +86,14 @@ class NormalityAnalyzer:
         ax1.legend()
         
         # Q-Q plot
-        sm.graphics.qqplot(self.data, line='45', ax=ax2)
-        ax2.set_title('Q-Q Plot')
+        sm.graphics.qqplot(sample, line='45', ax=ax2)
+        ax2.set_title('Q-Q Plot' if len(sample) == len(self.data) else f'Q-Q Plot ({len(sample)} sampled points)')
         
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
+        if save_path is None:
+            plt.show()
+        else:
+            fig.savefig(save_path)
     
     def run_statistical_tests(self) -> Dict[str, Tuple[float, float]]:
         """
@@ -70,15 +103,21 @@ class NormalityAnalyzer:
         --------
         Dict containing test results with test statistics and p-values
         """
-        # Shapiro-Wilk test
-        shapiro_stat, shapiro_p = stats.shapiro(self.data)
+        # Shapiro-Wilk test, on the subsample for large data
+        shapiro_stat, shapiro_p = stats.shapiro(self.sample())
         
         # D'Agostino-Pearson test
         k2_stat, k2_p = stats.normaltest(self.data)
         
+        # Anderson-Darling and Jarque-Bera tests, both fine on the full data at large n
+        ad_stat, ad_p = anderson_darling_normal(self.data.to_numpy(dtype=float))
+        jb_stat, jb_p = stats.jarque_bera(self.data)
+        
         return {
             'shapiro': (shapiro_stat, shapiro_p),
-            'dagostino': (k2_stat, k2_p)
+            'dagostino': (k2_stat, k2_p),
+            'anderson': (ad_stat[0], ad_p[0]),
+            'jarque_bera': (jb_stat, jb_p)
         }
     
     def calculate_shape_statistics(self) -> Dict[str, float]:
@@ -121,6 +160,18 @@ class NormalityAnalyzer:
         print(f"P-value: {test_results['dagostino'][1]:.4f}")
         print(f"Interpretation: {'Not normal' if test_results['dagostino'][1] < 0.05 else 'Cannot reject normality'}")
         
+        # Anderson-Darling test results
+        print("\nAnderson-Darling test:")
+        print(f"Statistic: {test_results['anderson'][0]:.4f}")
+        print(f"P-value: {test_results['anderson'][1]:.4f}")
+        print(f"Interpretation: {'Not normal' if test_results['anderson'][1] < 0.05 else 'Cannot reject normality'}")
+        
+        # Jarque-Bera test results
+        print("\nJarque-Bera test:")
+        print(f"Statistic: {test_results['jarque_bera'][0]:.4f}")
+        print(f"P-value: {test_results['jarque_bera'][1]:.4f}")
+        print(f"Interpretation: {'Not normal' if test_results['jarque_bera'][1] < 0.05 else 'Cannot reject normality'}")
+        
         print("\n2. Shape Statistics:")
         print("-"*20)
         print(f"Skewness: {shape_stats['skewness']:.4f}")
@@ -128,17 +179,129 @@ class NormalityAnalyzer:
         print(f"Kurtosis: {shape_stats['kurtosis']:.4f}")
         print(f"  - Interpretation: {'Normal tails' if abs(shape_stats['kurtosis']) < 0.5 else 'Heavy tails' if shape_stats['kurtosis'] > 0 else 'Light tails'}")
         
-    def analyze_normality(self) -> None:
+    def analyze_normality(self, save_path: str = None) -> None:
         """
         Perform complete normality analysis including plots and statistical tests.
+        save_path: write the plots to this file instead of showing them
         """
         # Create visualizations
-        self.plot_normality_checks()
+        self.plot_normality_checks(save_path)
         
         # Print analysis results
         self.print_analysis_results()
 
-def analyze_cny_sales(df, days_before=14, cny_holiday_days=5):
+def anderson_darling_normal(values: np.ndarray, groups: np.ndarray = None, n_groups: int = None):
+    """
+    Anderson-Darling normality test (mean and variance estimated) for every group at once.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        The data
+    groups : np.ndarray
+        Integer group code of each value (0 .. n_groups - 1), None for a single group
+    
+    Returns:
+    --------
+    (statistic, p-value) arrays with one entry per group. The p-value uses the
+    D'Agostino & Stephens (1986) approximation for the small-sample adjusted statistic.
+    """
+    if groups is None:
+        groups, n_groups = np.zeros(len(values), dtype=np.int64), 1
+    n_groups = n_groups if n_groups is not None else int(groups.max()) + 1
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    n = np.bincount(groups, minlength=n_groups).astype(float)
+    mean = np.bincount(groups, weights=values, minlength=n_groups) / n
+    std = np.sqrt(np.bincount(groups, weights=(values - mean[groups]) ** 2, minlength=n_groups) / (n - 1))
+    z = (values - mean[groups]) / std[groups]
+    # 1-based position of each value within its sorted group
+    i = np.arange(1, len(values) + 1) - np.repeat(np.cumsum(n) - n, n.astype(np.int64))
+    # A2 = -n - 1/n * sum((2i - 1) log F(z_i) + (2n + 1 - 2i) log(1 - F(z_i)))
+    terms = (2 * i - 1) * stats.norm.logcdf(z) + (2 * n[groups] + 1 - 2 * i) * stats.norm.logsf(z)
+    a2 = -n - np.bincount(groups, weights=terms, minlength=n_groups) / n
+    
+    adjusted = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    with np.errstate(over='ignore'):
+        p_value = np.select(
+            # beyond 13 the approximation turns back up; the p-value is < 5e-31 there
+            [adjusted > 13, adjusted >= 0.6, adjusted >= 0.34, adjusted >= 0.2],
+            [0.0,
+             np.exp(1.2937 - 5.709 * adjusted + 0.0186 * adjusted ** 2),
+             np.exp(0.9177 - 4.279 * adjusted - 1.38 * adjusted ** 2),
+             1 - np.exp(-8.318 + 42.796 * adjusted - 59.938 * adjusted ** 2)],
+            1 - np.exp(-13.436 + 101.14 * adjusted - 223.73 * adjusted ** 2)
+        )
+    return a2, np.clip(p_value, 0, 1)
+
+def normality_batch(df: pd.DataFrame, value: str = 'Amount', by: Union[str, list] = 'Weekday') -> pd.DataFrame:
+    """
+    Normality tests for every group of `by` (e.g. per Weekday or per Equipment) in one call.
+    
+    The moment-based tests (D'Agostino-Pearson, Jarque-Bera) only need each group's
+    central moments, which come from a single groupby; Anderson-Darling runs on one sort
+    of all values. Shapiro-Wilk has no vectorized form and is left to NormalityAnalyzer.
+    
+    Returns:
+    --------
+    DataFrame indexed by group with n, mean, std, skewness, kurtosis (excess) and the
+    statistic / p-value of each test. Groups need at least 8 values for D'Agostino-Pearson.
+    """
+    data = df[[value] + ([by] if isinstance(by, str) else list(by))].dropna()
+    x = data[value].astype(float)
+    grouped = x.groupby([data[col] for col in ([by] if isinstance(by, str) else by)], observed=True)
+    mean = grouped.transform('mean')
+    deviation = x - mean
+    moments = pd.DataFrame({
+        'n': grouped.size(),
+        'mean': grouped.mean(),
+        'm2': (deviation ** 2).groupby(grouped.ngroup()).mean().to_numpy(),
+        'm3': (deviation ** 3).groupby(grouped.ngroup()).mean().to_numpy(),
+        'm4': (deviation ** 4).groupby(grouped.ngroup()).mean().to_numpy(),
+    })
+    n, m2 = moments['n'].to_numpy(dtype=float), moments['m2'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skewness = moments['m3'].to_numpy() / m2 ** 1.5
+        kurtosis = moments['m4'].to_numpy() / m2 ** 2
+        
+        # skewtest and kurtosistest as in scipy.stats.normaltest
+        y = skewness * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alpha = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+        
+        expected = 3.0 * (n - 1) / (n + 1)
+        variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x_kurt = (kurtosis - expected) / np.sqrt(variance)
+        sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+        denominator = 1 + x_kurt * np.sqrt(2 / (a - 4.0))
+        term2 = np.sign(denominator) * np.where(denominator == 0, np.nan, ((1 - 2.0 / a) / np.abs(denominator)) ** (1 / 3.0))
+        z_kurt = (1 - 2 / (9.0 * a) - term2) / np.sqrt(2 / (9.0 * a))
+        k2 = np.where(n >= 8, z_skew ** 2 + z_kurt ** 2, np.nan)
+        
+        jarque_bera = n / 6 * (skewness ** 2 + (kurtosis - 3) ** 2 / 4)
+    
+    ad_stat, ad_p = anderson_darling_normal(x.to_numpy(), grouped.ngroup().to_numpy(), len(moments))
+    return pd.DataFrame({
+        'n': moments['n'],
+        'mean': moments['mean'],
+        'std': np.sqrt(m2 * n / (n - 1)),
+        'skewness': skewness,
+        'kurtosis': kurtosis - 3,
+        'dagostino_stat': k2,
+        'dagostino_p': stats.chi2.sf(k2, 2),
+        'jarque_bera_stat': jarque_bera,
+        'jarque_bera_p': stats.chi2.sf(jarque_bera, 2),
+        'anderson_stat': ad_stat,
+        'anderson_p': ad_p,
+    }, index=moments.index)
+
+def analyze_cny_sales(df, days_before=14, cny_holiday_days=5, events=None, n_resamples=None, seed=0, workers=None,
+                      store=None):
     """
     Perform hypothesis testing to check if daily sales are significantly higher before Chinese New Year,
     excluding the CNY holiday period itself. Handles transaction-level data by aggregating to daily totals.
@@ -147,44 +310,23 @@ def analyze_cny_sales(df, days_before=14, cny_holiday_days=5):
     df: DataFrame containing transaction-level sales data
     days_before: Number of days before CNY to consider as 'pre-CNY period'
     cny_holiday_days: Number of CNY holiday days to exclude
+    events: event table from stats.event_calendar, defaults to the CNY calendar
+    n_resamples: also run permutation tests and bootstrap CIs with this many resamples
+    seed, workers: seed and worker processes of the resampling (see stats.resampling)
+    store: store id(s) to keep when df comes from read_store_rollups, None sums all stores
     
     Returns:
     dict containing test results and summary statistics
     """
-    # Chinese New Year dates for recent years
-    cny_dates = {
-        2020: '2020-01-25',
-        2021: '2021-02-12',
-        2022: '2022-02-01',
-        2023: '2023-01-22',
-        2024: '2024-02-10'
-    }
-    
-    # Ensure Date is datetime
-    df['Date'] = pd.to_datetime(df['Date'])
+    if events is None:
+        events = cny_events()
     
     # Aggregate sales by date
-    daily_sales = df.groupby('Date')['Amount'].sum().reset_index()
+    daily_sales = daily_totals(select_stores(df, store))
     
-    # Create masks for pre-CNY periods and CNY holiday periods
-    pre_cny_mask = pd.Series(False, index=daily_sales.index)
-    cny_holiday_mask = pd.Series(False, index=daily_sales.index)
-    
-    for year, cny_date in cny_dates.items():
-        cny_datetime = pd.to_datetime(cny_date)
-        
-        # Define pre-CNY period (ending the day before CNY)
-        pre_cny_end = cny_datetime - timedelta(days=1)
-        pre_cny_start = pre_cny_end - timedelta(days=days_before-1)
-        pre_cny_period = pd.date_range(start=pre_cny_start, end=pre_cny_end)
-        
-        # Define CNY holiday period
-        cny_holiday_period = pd.date_range(start=cny_datetime, 
-                                         periods=cny_holiday_days)
-        
-        # Update masks
-        pre_cny_mask |= daily_sales['Date'].isin(pre_cny_period)
-        cny_holiday_mask |= daily_sales['Date'].isin(cny_holiday_period)
+    # Masks for pre-CNY periods and CNY holiday periods from one pass over the calendar
+    offsets = event_offsets(daily_sales['Date'], events)
+    pre_cny_mask, cny_holiday_mask, _ = window_masks(*offsets, days_before, cny_holiday_days, 0)
     
     # Split data into pre-CNY and regular periods
     pre_cny_sales = daily_sales[pre_cny_mask]['Amount']
@@ -212,6 +354,17 @@ def analyze_cny_sales(df, days_before=14, cny_holiday_days=5):
         'statistic': statistic
     }
     
+    # Permutation p-values and bootstrap CIs, reliable with only a few pre-CNY days
+    if n_resamples:
+        resampled = resampling_tests(pre_cny_sales, regular_sales, n_resamples=n_resamples,
+                                     alternative='greater', seed=seed, workers=workers)
+        results['resampling'] = resampled
+        results['permutation_p_value'] = resampled.loc['mean_diff', 'p_value']
+        results['mean_difference_ci'] = tuple(resampled.loc['mean_diff', ['ci_low', 'ci_high']])
+        results['median_difference_ci'] = tuple(resampled.loc['median_diff', ['ci_low', 'ci_high']])
+        results['cliffs_delta'] = resampled.loc['cliffs_delta', 'observed']
+        results['cohens_d'] = resampled.loc['cohens_d', 'observed']
+    
     return results, daily_sales
 
 def print_analysis_results(results):
@@ -236,6 +389,13 @@ def print_analysis_results(results):
     print(f"- Percentage difference in daily means: {results['percent_difference']:.2f}%")
     print(f"- P-value: {results['p_value']:.4f}")
     print(f"- Statistical significance: {'Significant' if results['p_value'] < 0.05 else 'Not significant'} at α=0.05")
+    
+    if 'resampling' in results:
+        print("\nResampling:")
+        print(f"- Permutation p-value (mean difference): {results['permutation_p_value']:.4f}")
+        print(f"- 95% bootstrap CI of the mean difference: {results['mean_difference_ci'][0]:.2f} to {results['mean_difference_ci'][1]:.2f}")
+        print(f"- 95% bootstrap CI of the median difference: {results['median_difference_ci'][0]:.2f} to {results['median_difference_ci'][1]:.2f}")
+        print(f"- Cliff's delta: {results['cliffs_delta']:.3f}, Cohen's d: {results['cohens_d']:.3f}")
 
 def plot_daily_sales(daily_sales, cny_dates, days_before=14):
     """
@@ -264,24 +424,41 @@ def plot_daily_sales(daily_sales, cny_dates, days_before=14):
     plt.tight_layout()
     plt.show()
 
-def main(db_path:str = 'data/database.db'):
-    table_name = 'clean_sales_data'
-    df = read_df_from_db(db_path, table_name)
+def main(db_path:str = 'data/database.db', save_dir: str = None, stores: list = None):
+    """
+    save_dir: write the plots there as PNG files instead of showing them
+    stores: test the summed sales of these stores (see data_processing.stores) instead of db_path
+    """
+    # one row per Date x Unit x Equipment_Category, summed again to daily totals below
+    if stores:
+        df = read_store_rollups(stores, DAILY_ROLLUP, columns= ['Date', 'Amount'])
+    else:
+        df = read_rollup(db_path, DAILY_ROLLUP, columns= ['Date', 'Amount'])
 
     # Test if Sales is norally distributed
     daily_sales = df.groupby('Date')['Amount'].sum().reset_index()
     analyzer = NormalityAnalyzer(daily_sales['Amount'], column_name='Daily Sales')
-    analyzer.analyze_normality()
+    if save_dir is not None:
+        Path(save_dir).mkdir(parents=True, exist_ok=True)
+    analyzer.analyze_normality(save_path= None if save_dir is None else Path(save_dir) / 'daily_sales_normality.png')
+    # and per weekday, all weekdays in one call
+    daily_sales['Weekday'] = pd.to_datetime(daily_sales['Date']).dt.weekday
+    print(normality_batch(daily_sales, value= 'Amount', by= 'Weekday'))
 
     # Mann-Whitney U test to check if the sales before Chinese New Year (CNY) are significantly higher
-    results, daily_sales = analyze_cny_sales(df, days_before=2, cny_holiday_days=0)
+    # with only a few pre-CNY days per year, also get permutation p-values and bootstrap CIs
+    results, daily_sales = analyze_cny_sales(df, days_before=2, cny_holiday_days=0, n_resamples=100000)
     print_analysis_results(results)
+    # the same test for a grid of window configurations, labelled in one batch
+    print(window_grid(daily_sales, cny_events(), days_before_grid=[2, 7, 14], event_days_grid=[0, 5]))
     # Optional: visualize the daily sales pattern
-    # cny_dates = {
-    #     2023: '2023-01-22',
-    #     2024: '2024-02-10'
-    # }
-    # plot_daily_sales(daily_sales, cny_dates, days_before=2)
+    # plot_daily_sales(daily_sales, CNY_DATES, days_before=2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    arg_parser = argparse.ArgumentParser(description='Normality and CNY hypothesis tests on daily sales')
+    arg_parser.add_argument('--db-path', default='data/database.db')
+    arg_parser.add_argument('--save-dir', help='save plots to this directory instead of showing them (no display needed)')
+    arg_parser.add_argument('--stores', nargs='+', metavar='ID', help='sum the rollups of these stores instead of --db-path')
+    args = arg_parser.parse_args()
+    main(db_path= args.db_path, save_dir= args.save_dir, stores= args.stores)
\ No newline at end of file
@@ -0,0 +1,200 @@
+"""
+Permutation tests and bootstrap confidence intervals for two samples.
+
+Each block of resamples is drawn as one index matrix (rows = resamples), turned into
+draw counts per sorted value, and every statistic is computed on it row-wise, so no
+Python loop runs per resample. Large resample counts are split into blocks of a fixed
+size, each seeded from SeedSequence(seed).spawn, and the blocks can run on a process
+pool: the results only depend on the seed, not on the number of workers.
+
+Statistics (group x minus group y):
+- mean_diff, median_diff
+- cohens_d     : mean difference over the pooled standard deviation
+- cliffs_delta : P(x > y) - P(x < y), the rank-based effect size matching Mann-Whitney U
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+STATISTICS = ['mean_diff', 'median_diff', 'cohens_d', 'cliffs_delta']
+# drawn indices per block, keeps the count matrices of a block around 16MB
+BLOCK_ELEMENTS = 2_000_000
+
+def _row_counts(index, size):
+    """How often each of `size` values is drawn in each row of an index matrix"""
+    rows = len(index)
+    flat = (index + np.arange(rows)[:, None] * size).ravel()
+    return np.bincount(flat, minlength= rows * size).reshape(rows, size)
+
+def _draw_subsets(rng, n, m, rows):
+    """
+    (rows, m) matrix of m distinct indices out of n per row, uniformly. For small m,
+    rows drawn with replacement are kept unless they repeat an index (each set of m
+    distinct indices stays equally likely), which avoids shuffling all n per row.
+    """
+    if m * m > n:
+        return rng.permuted(np.broadcast_to(np.arange(n), (rows, n)), axis=1)[:, :m]
+    index = rng.integers(0, n, size= (rows, m))
+    while True:
+        ordered = np.sort(index, axis=1)
+        repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if len(repeated) == 0:
+            return index
+        index[repeated] = rng.integers(0, n, size= (len(repeated), m))
+
+def _sample_moments(values, counts):
+    """
+    Size, mean, sample variance and median of each row's sample, where `counts` says how
+    often each of the sorted `values` is in the sample (rows, len(values))
+    """
+    n = counts.sum(axis=1)
+    weights = counts.astype(float)
+    # centered so the sum of squares does not lose precision
+    shift = values.mean()
+    centered = values - shift
+    total = weights @ centered
+    mean = total / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (weights @ centered ** 2 - total * mean) / (n - 1)
+    cumulative = np.cumsum(counts, axis=1)
+    # k-th smallest (0-based) = first sorted value whose cumulative count exceeds k
+    lower = (cumulative <= ((n - 1) // 2)[:, None]).sum(axis=1)
+    upper = (cumulative <= (n // 2)[:, None]).sum(axis=1)
+    median = (values[lower] + values[upper]) / 2
+    return n, mean + shift, variance, median, cumulative
+
+def _count_statistics(x_values, x_counts, y_values, y_counts, statistics):
+    """
+    Statistics of x sample minus y sample for every row, from draw counts over the sorted
+    x_values and y_values
+    """
+    n1, mean1, var1, median1, _ = _sample_moments(x_values, x_counts)
+    n2, mean2, var2, median2, below = _sample_moments(y_values, y_counts)
+    result = {}
+    for name in statistics:
+        if name == 'mean_diff':
+            result[name] = mean1 - mean2
+        elif name == 'median_diff':
+            result[name] = median1 - median2
+        elif name == 'cohens_d':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pooled = np.sqrt(((n1 - 1) * var1 + (n2 - 1) * var2) / (n1 + n2 - 2))
+                result[name] = (mean1 - mean2) / pooled
+        elif name == 'cliffs_delta':
+            lo = np.searchsorted(y_values, x_values, side='left')
+            hi = np.searchsorted(y_values, x_values, side='right')
+            if x_values is y_values:
+                # permutations split one pooled sample: Mann-Whitney U from its average ranks
+                wins = x_counts.astype(float) @ ((lo + hi + 1) / 2) - n1 * (n1 + 1) / 2
+            else:
+                # y draws below / equal to each x value are lookups in y's cumulative counts
+                below = np.concatenate([np.zeros((len(below), 1), dtype= below.dtype), below], axis=1)
+                wins = (x_counts * (below[:, lo] + 0.5 * (below[:, hi] - below[:, lo]))).sum(axis=1)
+            result[name] = 2 * wins / (n1 * n2) - 1
+        else:
+            raise ValueError(f"Unknown statistic {name!r}, expected one of {STATISTICS}")
+    return result
+
+def observed_statistics(x, y, statistics = STATISTICS):
+    """Statistics of the samples themselves"""
+    x, y = np.sort(np.asarray(x, dtype=float)), np.sort(np.asarray(y, dtype=float))
+    ones = lambda size: np.ones((1, size), dtype=np.int64)
+    return {name: value[0] for name, value in _count_statistics(x, ones(len(x)), y, ones(len(y)), statistics).items()}
+
+def _resample_block(kind, x, y, statistics, rows, seed):
+    """
+    Statistics of `rows` resamples drawn with the generator seeded by `seed`.
+    kind 'permutation': split the pooled samples into random groups of len(x) and len(y)
+    kind 'bootstrap'  : draw each sample with replacement from itself
+    Samples are kept as draw counts per sorted value, so every statistic is a matrix
+    product or a cumulative sum over the block.
+    """
+    rng = np.random.default_rng(seed)
+    n1, n2 = len(x), len(y)
+    if kind == 'permutation':
+        pooled = np.sort(np.concatenate([x, y]))
+        # draw the smaller group, the other one is everything else
+        smaller = _row_counts(_draw_subsets(rng, n1 + n2, min(n1, n2), rows), n1 + n2)
+        x_counts, y_counts = (smaller, 1 - smaller) if n1 <= n2 else (1 - smaller, smaller)
+        return _count_statistics(pooled, x_counts, pooled, y_counts, statistics)
+    x_counts = _row_counts(rng.integers(0, n1, size= (rows, n1)), n1)
+    y_counts = _row_counts(rng.integers(0, n2, size= (rows, n2)), n2)
+    return _count_statistics(x, x_counts, y, y_counts, statistics)
+
+def resample(kind, x, y, statistics = STATISTICS, n_resamples: int = 10000, seed: int = 0, workers: int = None):
+    """
+    Resampling distribution of each statistic.
+
+    Parameters:
+    -----------
+    kind : 'permutation' or 'bootstrap'
+    n_resamples : int
+        Number of resamples, split into blocks of about BLOCK_ELEMENTS drawn indices
+    seed : int
+        Root seed; block i uses SeedSequence(seed).spawn(...)[i]
+    workers : int
+        Processes for the blocks, None for os.cpu_count(), 1 to stay in this process
+
+    Returns dict of statistic -> array of n_resamples values
+    """
+    x, y = np.sort(np.asarray(x, dtype=float)), np.sort(np.asarray(y, dtype=float))
+    rows = max(1, BLOCK_ELEMENTS // (len(x) + len(y)))
+    sizes = [min(rows, n_resamples - start) for start in range(0, n_resamples, rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    if workers <= 1:
+        blocks = [_resample_block(kind, x, y, statistics, size, block_seed) for size, block_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers= workers) as executor:
+            blocks = list(executor.map(_resample_block, [kind] * len(sizes), [x] * len(sizes), [y] * len(sizes),
+                                       [statistics] * len(sizes), sizes, seeds))
+    return {name: np.concatenate([block[name] for block in blocks]) for name in statistics}
+
+def resampling_tests(x, y, statistics = STATISTICS, n_resamples: int = 10000, alternative = 'greater',
+                     confidence: float = 0.95, seed: int = 0, workers: int = None):
+    """
+    Permutation test and percentile bootstrap confidence interval of each statistic.
+
+    Parameters:
+    -----------
+    x, y : array-like
+        The two samples, e.g. pre-CNY and regular daily sales
+    alternative : str
+        'greater' (x larger than y), 'less' or 'two-sided'
+    confidence : float
+        Level of the bootstrap intervals
+
+    Returns:
+    --------
+    DataFrame indexed by statistic with the observed value, the permutation p-value
+    ((1 + resamples at least as extreme) / (1 + n_resamples), never 0) and ci_low / ci_high
+    """
+    observed = observed_statistics(x, y, statistics)
+    permuted = resample('permutation', x, y, statistics, n_resamples, seed, workers)
+    # a different stream for the bootstrap, derived from the same seed
+    bootstrapped = resample('bootstrap', x, y, statistics, n_resamples, [seed, 1], workers)
+
+    rows = []
+    for name in statistics:
+        value = observed[name]
+        null = permuted[name]
+        # tolerance so that statistics equal up to rounding count as ties
+        tolerance = 1e-12 * max(1.0, abs(value))
+        if alternative == 'greater':
+            extreme = null >= value - tolerance
+        elif alternative == 'less':
+            extreme = null <= value + tolerance
+        elif alternative == 'two-sided':
+            extreme = np.abs(null) >= abs(value) - tolerance
+        else:
+            raise ValueError(f"Unknown alternative {alternative!r}")
+        ci_low, ci_high = np.nanpercentile(bootstrapped[name], [50 * (1 - confidence), 50 * (1 + confidence)])
+        rows.append({
+            'statistic': name,
+            'observed': value,
+            'p_value': (1 + extreme.sum()) / (1 + n_resamples),
+            'ci_low': ci_low,
+            'ci_high': ci_high,
+        })
+    return pd.DataFrame(rows).set_index('statistic')
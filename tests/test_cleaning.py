@@ -0,0 +1,101 @@
+"""
+data_cleaning.main: incremental runs give the same tables as a full rebuild, and a cleaning
+run that fails part way leaves the database as it was.
+"""
+import sqlite3
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from benchmarks.synthetic_data import write_sales_db, generate_sales
+from data_processing import data_cleaning, rollups
+from data_processing.sales_store import SALES_KEY
+
+TABLES = ['clean_sales_data', 'equipment', rollups.DAILY_ROLLUP, rollups.MONTHLY_ROLLUP, 'etl_watermark']
+
+def clean(db_path, **kwargs):
+    data_cleaning.main(str(db_path), export= False, **kwargs)
+
+def read_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    tables = {table: pd.read_sql(f"SELECT * FROM {table} ORDER BY rowid", conn) for table in TABLES}
+    conn.close()
+    return tables
+
+def sort_rows(df, keys):
+    return df.sort_values(keys).reset_index(drop=True)
+
+def add_sales(db_path, df):
+    df = df.copy()
+    df['Time'] = df['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(f"INSERT OR IGNORE INTO sales_data ({', '.join(SALES_KEY)}) VALUES (?, ?, ?, ?, ?)",
+                         df[SALES_KEY].astype(object).itertuples(index=False, name=None))
+    conn.close()
+
+def test_incremental_runs_match_full_rebuild(tmp_path):
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 3000, start= '2024-01-01', days= 20, seed= 1)
+    clean(db_path)
+    # more sales on days that already have rows, and on new days
+    add_sales(db_path, generate_sales(400, start= '2024-01-15', days= 10, seed= 2))
+    clean(db_path)
+    # a machine the equipment table has not seen yet
+    new_machine = generate_sales(50, start= '2024-01-20', days= 2, seed= 3)
+    new_machine['Equipment'] = '【12上】烘衣機'
+    add_sales(db_path, new_machine)
+    clean(db_path)
+    incremental = read_tables(db_path)
+
+    clean(db_path, full_rebuild= True)
+    rebuilt = read_tables(db_path)
+    for table in ['clean_sales_data', 'equipment', 'etl_watermark']:
+        pdt.assert_frame_equal(incremental[table], rebuilt[table], obj= table)
+    # the upserted rollups hold the same rows as the ones aggregated in one go
+    for table, keys in rollups.ROLLUP_KEYS.items():
+        pdt.assert_frame_equal(sort_rows(incremental[table], keys), sort_rows(rebuilt[table], keys), obj= table)
+    # and they add up to the clean rows
+    clean_rows = data_cleaning.read_clean_sales(db_path)
+    daily = sort_rows(rebuilt[rollups.DAILY_ROLLUP], rollups.ROLLUP_KEYS[rollups.DAILY_ROLLUP])
+    expected = clean_rows.groupby([clean_rows['Date'].dt.strftime("%Y-%m-%d %H:%M:%S"), 'Unit', 'Equipment_Category'],
+                                  observed=True)['Amount'].agg(['sum', 'size'])
+    assert daily['Amount'].tolist() == expected['sum'].tolist()
+    assert daily['Transactions'].tolist() == expected['size'].tolist()
+    conn = sqlite3.connect(db_path)
+    assert len(rebuilt['clean_sales_data']) == conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0] > 3400
+    conn.close()
+    assert rebuilt['equipment']['Equipment'].iloc[-1] == '【12上】烘衣機'
+
+@pytest.fixture
+def cleaned_db(tmp_path):
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 2000, start= '2024-01-01', days= 30, seed= 7)
+    clean(db_path)
+    return db_path
+
+def fail(*args, **kwargs):
+    raise sqlite3.OperationalError('disk I/O error')
+
+@pytest.mark.parametrize('step', ['rollups', 'insert'])
+def test_failed_full_rebuild_keeps_old_tables(cleaned_db, step, monkeypatch):
+    before = read_tables(cleaned_db)
+    if step == 'rollups':
+        monkeypatch.setattr(rollups, 'update_rollups', fail)
+    else:
+        # to_sql fails while inserting, after the tables were dropped and recreated
+        monkeypatch.setattr(pd.io.sql.SQLiteTable, '_execute_insert', fail)
+    with pytest.raises(Exception, match='disk I/O error'):
+        clean(cleaned_db, full_rebuild= True)
+    monkeypatch.undo()
+
+    after = read_tables(cleaned_db)
+    for table in TABLES:
+        pdt.assert_frame_equal(after[table], before[table], obj= table)
+    # the connection was closed: the database is not left locked
+    conn = sqlite3.connect(cleaned_db, timeout= 0)
+    conn.execute("BEGIN IMMEDIATE")
+    conn.rollback()
+    conn.close()
+    # and the next run rebuilds it
+    clean(cleaned_db, full_rebuild= True)
+    pdt.assert_frame_equal(read_tables(cleaned_db)['equipment'], before['equipment'])
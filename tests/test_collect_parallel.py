@@ -0,0 +1,102 @@
+"""
+collect_parallel with headless Chrome against the local mock revenue site.
+Skipped where Chrome cannot be started; the scrape_day cleanup is tested without a browser.
+"""
+import sqlite3
+import threading
+import pytest
+from selenium.common.exceptions import TimeoutException, ElementNotInteractableException
+from benchmarks.synthetic_data import generate_sales
+from data_processing import data_collection
+from data_processing.mock_revenue_site import serve_site
+from data_processing.sales_store import DONE, FAILED
+
+YEAR_MONTHS = [(2024, 1), (2024, 2), (2024, 3)]
+# short waits so a broken page fails the test quickly
+TIMEOUTS = {'page': 10, 'month': 10, 'day': 10, 'close': 5}
+
+@pytest.fixture(scope='module')
+def chrome():
+    try:
+        driver = data_collection.get_chrome_driver(headless= True)
+    except Exception as e:
+        pytest.skip(f"Chrome is not available: {e}")
+    driver.quit()
+
+@pytest.fixture(scope='module')
+def sales():
+    # January and February 2024; March has no sales
+    df = generate_sales(400, start= '2024-01-01', days= 60, seed= 1)
+    return df.astype({'Equipment': str, 'Channel': str, 'Amount': str})
+
+@pytest.fixture
+def site(sales):
+    server = serve_site(sales)
+    yield {'username': 'mock', 'password': 'mock', 'login_url': f"http://127.0.0.1:{server.server_port}/login"}
+    server.shutdown()
+
+def test_collect_parallel(chrome, sales, site, tmp_path, monkeypatch):
+    db_path = tmp_path / 'database.db'
+    connections = []
+    connect_db = data_collection.connect_db
+    def recording_connect_db(*args, **kwargs):
+        connections.append(threading.current_thread())
+        return connect_db(*args, **kwargs)
+    monkeypatch.setattr(data_collection, 'connect_db', recording_connect_db)
+
+    data_collection.collect_parallel(db_path, workers= 2, timeouts= TIMEOUTS, year_months= YEAR_MONTHS, credentials= site)
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0]
+    states = dict(conn.execute("SELECT Date, State FROM scrape_progress").fetchall())
+    rows = dict(conn.execute("SELECT Date, Rows FROM scrape_progress").fetchall())
+    conn.close()
+    assert stored == len(sales)
+    days = sales['Time'].dt.strftime("%Y/%m/%d").value_counts()
+    assert all(rows[date] == count for date, count in days.items())
+    # every past day of the three months is done, the empty March with 0 rows
+    assert len(states) == 31 + 29 + 31 and set(states.values()) == {DONE}
+    assert rows['2024/03/15'] == 0
+    # one connection to read the done dates, one in the writer thread, none in the browser workers
+    assert connections[0] is threading.main_thread()
+    assert len(connections) == 2 and connections[1] is not threading.main_thread()
+
+def test_collect_parallel_resumes(chrome, sales, site, tmp_path):
+    db_path = tmp_path / 'database.db'
+    data_collection.collect_parallel(db_path, workers= 2, timeouts= TIMEOUTS, year_months= YEAR_MONTHS[:1], credentials= site)
+    data_collection.collect_parallel(db_path, workers= 2, timeouts= TIMEOUTS, year_months= YEAR_MONTHS, credentials= site)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0] == len(sales)
+    conn.close()
+
+def test_failed_month_query_is_not_done(chrome, sales, tmp_path):
+    server = serve_site(sales, fail_months= {'2024/02'})
+    site = {'username': 'mock', 'password': 'mock', 'login_url': f"http://127.0.0.1:{server.server_port}/login"}
+    db_path = tmp_path / 'database.db'
+    try:
+        data_collection.collect_parallel(db_path, workers= 2, timeouts= TIMEOUTS, year_months= YEAR_MONTHS, credentials= site)
+    finally:
+        server.shutdown()
+    conn = sqlite3.connect(db_path)
+    states = dict(conn.execute("SELECT Date, State FROM scrape_progress").fetchall())
+    conn.close()
+    assert {states[f'2024/02/{day:02d}'] for day in range(1, 30)} == {FAILED}
+    assert {states[f'2024/03/{day:02d}'] for day in range(1, 32)} == {DONE}
+
+class HiddenCloseDriver:
+    # a page whose Close link is in the DOM but cannot be clicked
+    def find_elements(self, by, value):
+        return [self]
+
+    def find_element(self, by, value):
+        return self
+
+    def click(self):
+        raise ElementNotInteractableException('element not interactable')
+
+def test_failed_close_keeps_the_day_error(monkeypatch):
+    def open_day(driver, date, timeouts = None):
+        raise TimeoutException(f"detailGrid of {date} did not load")
+    monkeypatch.setattr(data_collection, 'open_day', open_day)
+    with pytest.raises(TimeoutException, match='detailGrid of 2024/01/05'):
+        data_collection.scrape_day(HiddenCloseDriver(), '2024/01/05', TIMEOUTS)
@@ -0,0 +1,49 @@
+"""
+extract_detail_rows (detailGrid fragment, lxml or BeautifulSoup) against the original
+full-page BeautifulSoup parse of benchmarks/detail_grid_benchmark.py, on the saved
+synthetic page in tests/fixtures.
+"""
+from pathlib import Path
+import pytest
+from data_processing import detail_grid
+from benchmarks.detail_grid_benchmark import extract_with_full_soup, synthetic_page, SYNTHETIC_EQUIPMENT
+from data_processing.detail_grid import extract_detail_rows, detail_rows_to_df
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'detail_grid_page.html'
+
+@pytest.fixture
+def page():
+    return FIXTURE.read_text(encoding='utf-8')
+
+@pytest.fixture(params=['lxml', 'BeautifulSoup'])
+def parser(request, monkeypatch):
+    if request.param == 'BeautifulSoup':
+        monkeypatch.setattr(detail_grid, 'lxml', None)
+    elif detail_grid.lxml is None:
+        pytest.skip('lxml is not installed')
+    return request.param
+
+def test_fixture_matches_full_page_parse(page, parser):
+    rows = extract_detail_rows(page)
+    assert rows == extract_with_full_soup(page)
+    assert len(rows) == 40 and all(len(row) == 4 for row in rows)
+
+def test_nested_whitespace_cells(page, parser):
+    rows = extract_detail_rows(page)
+    # row 3 has the unit in a span with spaces and a &nbsp;, row 4 wraps the equipment over lines
+    assert rows[2][3] == '20元'
+    assert rows[3][1] in SYNTHETIC_EQUIPMENT
+
+@pytest.mark.parametrize('seed', range(5))
+def test_synthetic_pages_match(seed, parser):
+    page = synthetic_page(100, seed)
+    assert extract_detail_rows(page) == extract_with_full_soup(page)
+
+def test_page_without_grid():
+    assert extract_detail_rows('<html><body><table id="monthGrid"></table></body></html>') == []
+
+def test_rows_to_df(page):
+    df = detail_rows_to_df('2024/01/05', extract_detail_rows(page))
+    assert list(df.columns) == detail_grid.DETAIL_COLUMNS
+    assert df['Time'].dt.strftime('%Y/%m/%d').eq('2024/01/05').all()
+    assert df['Amount'].str.fullmatch(r'-?\d+[元點]').all()
@@ -0,0 +1,100 @@
+"""
+clean_equipment_column (distinct names parsed once) against the original per-row apply version.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+from benchmarks.synthetic_data import write_sales_db
+from data_processing import data_cleaning
+from data_processing.data_cleaning import clean_equipment_column, split_equipment, categorize_equipment, encode_equipment
+
+EQUIPMENT_COLUMNS = ['Equipment_ID', 'Equipment_Location', 'Equipment_Type', 'Equipment_Category', 'Wash_Scale']
+
+NAMES = [
+    '【01上】洗脫烘(中)',   # 【NN上】
+    '【02下】洗脫烘(大)',   # 【NN下】
+    '【03】洗衣機',         # 【NN】, wash without a scale
+    '【12上】烘衣機',
+    '【7】洗脫(中)',        # single digit id
+    '儲值 / 兌幣機',
+    '販賣機',
+    '洗鞋機',              # no id, still a washer
+    '烘鞋機',              # unmatched by every category
+    '【A1】洗脫烘(中)',     # malformed id, not split
+    '',
+]
+
+def clean_equipment_column_per_row(df):
+    # the implementation before parse_equipment, one split/categorize call per row
+    df[['Equipment_ID', 'Equipment_Location', 'Equipment_Type']]    = df['Equipment'].apply(split_equipment).apply(pd.Series)
+    df['Equipment_Location']                                        = df['Equipment_Location'].replace({'上': 'Up', '下': 'Down', '': np.nan})
+    df[['Equipment_Category', 'Wash_Scale']]                        = df['Equipment_Type'].apply(categorize_equipment).apply(pd.Series)
+    return df
+
+def sales_rows(names, repeat = 3, seed = 0):
+    rng = np.random.default_rng(seed)
+    equipment = rng.permutation(np.array(list(names) * repeat, dtype=object))
+    return pd.DataFrame({'Equipment': equipment, 'Amount': rng.integers(-10, 100, len(equipment))},
+                        index= pd.RangeIndex(10, 10 + len(equipment)))
+
+@pytest.mark.parametrize('names', [NAMES, NAMES + [np.nan], ['販賣機'], ['【01上】洗脫烘(中)', '【02上】洗脫烘(中)']])
+def test_matches_per_row_version(names):
+    expected = clean_equipment_column_per_row(sales_rows(names))
+    result = clean_equipment_column(sales_rows(names))
+    pdt.assert_frame_equal(result, expected)
+    # same dtypes column by column, not only equal values
+    assert list(result.dtypes) == list(expected.dtypes)
+
+def test_parsed_values():
+    result = clean_equipment_column(pd.DataFrame({'Equipment': NAMES[:3] + ['儲值 / 兌幣機', '販賣機', '烘鞋機', np.nan]}))
+    expected = pd.DataFrame({
+        'Equipment_ID': ['01', '02', '03', np.nan, np.nan, np.nan, np.nan],
+        'Equipment_Location': ['Up', 'Down', np.nan, np.nan, np.nan, np.nan, np.nan],
+        'Equipment_Type': ['洗脫烘(中)', '洗脫烘(大)', '洗衣機', '儲值 / 兌幣機', '販賣機', '烘鞋機', np.nan],
+        'Equipment_Category': ['wash', 'wash', 'wash', 'money changer', 'vending machine', 'others', np.nan],
+        'Wash_Scale': ['medium', 'large', np.nan, np.nan, np.nan, np.nan, np.nan],
+    })
+    # dtypes depend on the pandas string default and are covered by the test above
+    pdt.assert_frame_equal(result[EQUIPMENT_COLUMNS], expected, check_dtype=False)
+
+def test_empty_frame():
+    df = pd.DataFrame({'Equipment': pd.Series([], dtype=object)})
+    result = clean_equipment_column(df)
+    assert list(result.columns) == ['Equipment'] + EQUIPMENT_COLUMNS
+    assert len(result) == 0
+
+def test_encode_missing_equipment():
+    conn = sqlite3.connect(':memory:')
+    for _ in range(2):
+        df = encode_equipment(conn, pd.DataFrame({'Equipment': ['販賣機', np.nan, '【01上】洗脫烘(中)', None]}))
+        assert str(df['Equipment_Key'].dtype) == 'Int64'
+        assert df['Equipment_Key'].isna().tolist() == [False, True, False, True]
+    # no row for the missing name, however many runs saw it
+    assert conn.execute("SELECT Equipment FROM equipment ORDER BY Equipment_Key").fetchall() == [('販賣機',), ('【01上】洗脫烘(中)',)]
+    df = encode_equipment(conn, pd.DataFrame({'Equipment': ['販賣機']}))
+    assert df['Equipment_Key'].dtype == 'int64'
+
+def test_clean_rows_without_equipment(tmp_path):
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 500, start= '2024-01-01', days= 10, seed= 0)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE sales_data SET Equipment = NULL WHERE rowid IN (3, 4)")
+    conn.commit()
+    conn.close()
+    # an empty equipment cell no longer aborts cleaning, full or incremental
+    data_cleaning.main(str(db_path), export= False)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO sales_data (Time, Equipment, Channel, Amount, Seq) VALUES ('2024-01-11 10:00:00', NULL, '投幣', '60元', 0)")
+    conn.commit()
+    conn.close()
+    data_cleaning.main(str(db_path), export= False)
+
+    df = data_cleaning.read_clean_sales(db_path)
+    assert len(df) == 501
+    assert df['Equipment'].isna().sum() == 3 and df['Equipment_Category'].isna().sum() == 3
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM equipment WHERE Equipment IS NULL").fetchone()[0] == 0
+    assert conn.execute("SELECT SUM(Transactions) FROM daily_sales_rollup WHERE Equipment_Category = 'unknown'").fetchone()[0] == 3
+    conn.close()
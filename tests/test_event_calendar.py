@@ -0,0 +1,100 @@
+"""
+stats.event_calendar: mannwhitney_batch against scipy.stats.mannwhitneyu, window labels against a
+day-by-day walk over the events, and window_grid against one analyze_cny_sales run per configuration.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from stats.event_calendar import (mannwhitney_batch, event_offsets, label_windows, window_grid, make_events,
+                                  cny_events, REGULAR, PRE, DURING, POST)
+from stats.hypothesis_testing import analyze_cny_sales
+
+@pytest.mark.parametrize('alternative', ['greater', 'less', 'two-sided'])
+@pytest.mark.parametrize('ties', [False, True])
+def test_mannwhitney_batch_matches_scipy(alternative, ties):
+    rng = np.random.default_rng(0)
+    values = rng.gamma(4, 500, 300)
+    if ties:
+        values = np.round(values, -2)
+    # 20 configurations of two disjoint samples of different sizes
+    draw = rng.random((20, len(values)))
+    share = rng.uniform(0.02, 0.3, (20, 1))
+    group1 = draw < share
+    group2 = (draw > share) & (draw < share + rng.uniform(0.2, 0.7, (20, 1)))
+    statistic, p_value = mannwhitney_batch(values, group1, group2, alternative)
+    for i in range(20):
+        expected = stats.mannwhitneyu(values[group1[i]], values[group2[i]], alternative= alternative, method='asymptotic')
+        assert statistic[i] == pytest.approx(expected.statistic, rel=1e-12)
+        assert p_value[i] == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-300)
+
+def test_mannwhitney_batch_all_tied_and_empty():
+    values = np.array([5.0] * 6 + [1.0, 2.0])
+    group1 = np.array([[1, 1, 1, 0, 0, 0, 0, 0], [1, 1, 1, 1, 1, 1, 1, 1]], dtype=bool)
+    group2 = np.array([[0, 0, 0, 1, 1, 1, 1, 1], [0, 0, 0, 0, 0, 0, 0, 0]], dtype=bool)
+    statistic, p_value = mannwhitney_batch(values, group1, group2)
+    expected = stats.mannwhitneyu(values[group1[0]], values[group2[0]], alternative='greater', method='asymptotic')
+    assert statistic[0] == expected.statistic and p_value[0] == pytest.approx(expected.pvalue)
+    # an empty sample has no test
+    assert np.isnan(p_value[1])
+
+def brute_force_labels(dates, events, days_before, event_days, days_after):
+    labels = []
+    for date in pd.to_datetime(dates):
+        windows = set()
+        for start, days in zip(events['Start'], events['Days']):
+            length = days if event_days is None else event_days
+            offset = (date - start).days
+            if 0 <= offset < length:
+                windows.add(DURING)
+            elif -days_before <= offset < 0:
+                windows.add(PRE)
+            elif length <= offset < length + days_after:
+                windows.add(POST)
+        labels.append(next((label for label in [DURING, PRE, POST] if label in windows), REGULAR))
+    return np.array(labels)
+
+def test_label_windows_matches_day_by_day_walk():
+    # overlapping and nested events of different lengths, and a pre window running into the previous event
+    events = pd.concat([
+        make_events('CNY', ['2024-02-10', '2025-01-29'], 6),
+        make_events('typhoon', ['2024-02-05', '2024-07-24', '2024-07-25', '2024-10-31'], 2),
+        make_events('school', ['2024-07-01'], 60),
+    ], ignore_index=True)
+    dates = pd.date_range('2024-01-01', '2025-03-01')
+    for days_before, event_days, days_after in [(14, None, 0), (7, None, 3), (3, 5, 2), (30, 1, 0)]:
+        expected = brute_force_labels(dates, events, days_before, event_days, days_after)
+        np.testing.assert_array_equal(label_windows(dates, events, days_before, event_days, days_after), expected)
+        # unaffected by the order of the event rows
+        shuffled = events.sample(frac=1, random_state=0)
+        np.testing.assert_array_equal(label_windows(dates, shuffled, days_before, event_days, days_after), expected)
+
+def test_event_offsets_without_events():
+    since_start, since_end, until_next = event_offsets(pd.date_range('2024-01-01', periods=3), make_events('x', []))
+    assert np.isnan(since_start).all() and np.isnan(since_end).all() and np.isnan(until_next).all()
+
+@pytest.fixture
+def daily_sales():
+    # three Chinese New Years, busier before each one, amounts with ties
+    rng = np.random.default_rng(1)
+    dates = pd.date_range('2023-01-01', '2025-12-31')
+    amount = np.round(rng.gamma(8, 400, len(dates)), -1)
+    until_cny = label_windows(dates, cny_events(), days_before= 10)
+    amount[until_cny == PRE] *= 1.2
+    return pd.DataFrame({'Date': dates, 'Amount': amount})
+
+def test_window_grid_matches_separate_runs(daily_sales):
+    days_before_grid, event_days_grid = [3, 7, 14, 21], [3, 5, 8]
+    grid = window_grid(daily_sales, cny_events(), days_before_grid, event_days_grid)
+    assert len(grid) == len(days_before_grid) * len(event_days_grid)
+    for row in grid.itertuples():
+        results, _ = analyze_cny_sales(daily_sales, days_before= row.days_before, cny_holiday_days= row.event_days)
+        assert row.pre_days == results['pre_cny_days'] and row.regular_days == results['regular_days']
+        assert row.pre_daily_mean == pytest.approx(results['pre_cny_daily_mean'])
+        assert row.regular_daily_mean == pytest.approx(results['regular_daily_mean'])
+        assert row.pre_daily_median == pytest.approx(results['pre_cny_daily_median'])
+        assert row.regular_daily_median == pytest.approx(results['regular_daily_median'])
+        assert row.percent_difference == pytest.approx(results['percent_difference'])
+        assert row.statistic == pytest.approx(results['statistic'])
+        # the amounts have ties, so mannwhitneyu uses the normal approximation too
+        assert row.p_value == pytest.approx(results['p_value'], rel=1e-9)
@@ -0,0 +1,91 @@
+"""
+Incremental exports of data_cleaning.main: csv files are appended to, xlsx files keep the
+full export and get the new rows in a workbook of their own.
+"""
+import io
+import sqlite3
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_sales, write_sales_db
+from data_processing import data_cleaning
+from data_processing.sales_store import SALES_KEY
+
+pytest.importorskip('openpyxl')
+
+def add_sales(db_path, rows, start, seed):
+    df = generate_sales(rows, start= start, days= 5, seed= seed)
+    df['Time'] = df['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(db_path)
+    df[SALES_KEY].to_sql('sales_data', conn, if_exists='append', index=False)
+    conn.commit()
+    conn.close()
+
+def xlsx_rows(path):
+    return sum(len(sheet) for sheet in pd.read_excel(path, sheet_name=None).values())
+
+def run(db_path, export_new_only):
+    data_cleaning.main(str(db_path), export_new_only= export_new_only)
+
+def test_export_new_only(tmp_path):
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 500, start= '2024-01-01', days= 20, seed= 3)
+    run(db_path, export_new_only= True)
+    # nothing exported before: full exports
+    assert xlsx_rows(tmp_path / 'clean_sales_data.xlsx') == 500
+    assert len(pd.read_csv(tmp_path / 'clean_sales_data.csv')) == 500
+
+    add_sales(db_path, 120, '2024-02-01', seed= 4)
+    run(db_path, export_new_only= True)
+    # the full workbook is left alone, the new rows get their own
+    assert xlsx_rows(tmp_path / 'clean_sales_data.xlsx') == 500
+    deltas = sorted(tmp_path.glob('clean_sales_data.*.xlsx'))
+    assert len(deltas) == 1 and xlsx_rows(deltas[0]) == 120
+    assert len(pd.read_csv(tmp_path / 'clean_sales_data.csv')) == 620
+    assert xlsx_rows(tmp_path / 'raw_sales_data.xlsx') == 500
+    assert len(list(tmp_path.glob('raw_sales_data.*.xlsx'))) == 1
+
+    # no new rows: no empty workbook, nothing replaced
+    run(db_path, export_new_only= True)
+    assert xlsx_rows(tmp_path / 'clean_sales_data.xlsx') == 500
+    assert sorted(tmp_path.glob('clean_sales_data.*.xlsx')) == deltas
+    assert len(pd.read_csv(tmp_path / 'clean_sales_data.csv')) == 620
+
+def test_missing_export_is_written_in_full(tmp_path):
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 300, start= '2024-01-01', days= 10, seed= 5)
+    run(db_path, export_new_only= False)
+    (tmp_path / 'clean_sales_data.xlsx').unlink()
+    (tmp_path / 'clean_sales_data.csv').unlink()
+    add_sales(db_path, 50, '2024-02-01', seed= 6)
+    run(db_path, export_new_only= True)
+    assert xlsx_rows(tmp_path / 'clean_sales_data.xlsx') == 350
+    assert len(pd.read_csv(tmp_path / 'clean_sales_data.csv')) == 350
+
+@pytest.mark.parametrize('new_rows_only', [False, True])
+def test_failed_save_keeps_watermark(tmp_path, monkeypatch, new_rows_only):
+    from openpyxl import Workbook
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 200, start= '2024-01-01', days= 10, seed= 8)
+    excel_path = str(tmp_path / 'raw_sales_data.xlsx')
+    if new_rows_only:
+        data_cleaning.db2excel(excel_path, str(db_path), since_last_export= True)
+        add_sales(db_path, 30, '2024-02-01', seed= 9)
+    watermark = data_cleaning.get_export_watermark(db_path, excel_path)
+
+    save = Workbook.save
+    def locked(self, filename):
+        # e.g. the workbook is open in Excel; the workbook is still written out (to memory)
+        # so its write-only sheets are closed
+        save(self, io.BytesIO())
+        raise PermissionError(f"Permission denied: '{filename}'")
+    monkeypatch.setattr(Workbook, 'save', locked)
+    with pytest.raises(PermissionError):
+        data_cleaning.db2excel(excel_path, str(db_path), since_last_export= True)
+    monkeypatch.undo()
+    assert data_cleaning.get_export_watermark(db_path, excel_path) == watermark
+
+    # the rows that were not saved are exported by the next run
+    data_cleaning.db2excel(excel_path, str(db_path), since_last_export= True)
+    assert xlsx_rows(excel_path) == 200
+    assert [xlsx_rows(path) for path in tmp_path.glob('raw_sales_data.*.xlsx')] == ([30] if new_rows_only else [])
+    assert data_cleaning.get_export_watermark(db_path, excel_path) == (230 if new_rows_only else 200)
@@ -0,0 +1,78 @@
+"""
+normality_batch and anderson_darling_normal against scipy.stats and statsmodels, group by group.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.stats.diagnostic import normal_ad
+from stats.hypothesis_testing import normality_batch, anderson_darling_normal
+
+def grouped_sample(seed = 0):
+    rng = np.random.default_rng(seed)
+    groups = {
+        'normal': rng.normal(100, 15, 500),
+        'skewed': rng.exponential(50, 300),
+        'uniform': rng.uniform(0, 1, 200),
+        'heavy_tailed': rng.standard_t(3, 150),
+        'left_skewed': -rng.gamma(2, 3, 60),
+        # whole amounts with many ties, like transaction amounts
+        'amounts': rng.choice([10, 20, 30, 40, 60, 80, 100], 400, p=[0.1, 0.2, 0.2, 0.15, 0.15, 0.1, 0.1]).astype(float),
+        'small': rng.normal(0, 1, 8),
+        'twenty': rng.lognormal(0, 0.5, 20),
+    }
+    frame = pd.concat([pd.DataFrame({'Amount': values, 'Group': name}) for name, values in groups.items()])
+    # rows of the groups interleaved, as in the sales table
+    return frame.sample(frac=1, random_state=seed).reset_index(drop=True), groups
+
+def anderson_statistic(values):
+    return stats.anderson(values, 'norm', method='interpolate').statistic
+
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_scipy_and_statsmodels(seed):
+    frame, groups = grouped_sample(seed)
+    result = normality_batch(frame, 'Amount', 'Group')
+    assert set(result.index) == set(groups)
+    for name, values in groups.items():
+        row = result.loc[name]
+        assert row['n'] == len(values)
+        assert row['mean'] == pytest.approx(values.mean(), rel=1e-12)
+        assert row['std'] == pytest.approx(values.std(ddof=1), rel=1e-10)
+        assert row['skewness'] == pytest.approx(stats.skew(values), rel=1e-9, abs=1e-12)
+        assert row['kurtosis'] == pytest.approx(stats.kurtosis(values), rel=1e-9, abs=1e-12)
+
+        dagostino = stats.normaltest(values)
+        assert row['dagostino_stat'] == pytest.approx(dagostino.statistic, rel=1e-8), name
+        assert row['dagostino_p'] == pytest.approx(dagostino.pvalue, rel=1e-7, abs=1e-300), name
+        jarque_bera = stats.jarque_bera(values)
+        assert row['jarque_bera_stat'] == pytest.approx(jarque_bera.statistic, rel=1e-9), name
+        assert row['jarque_bera_p'] == pytest.approx(jarque_bera.pvalue, rel=1e-7, abs=1e-300), name
+        # statsmodels takes log(cdf), which loses digits far in the tails; scipy's anderson
+        # uses logcdf / logsf like anderson_darling_normal
+        assert row['anderson_stat'] == pytest.approx(anderson_statistic(values), rel=1e-10), name
+        ad_stat, ad_p = normal_ad(values)
+        assert row['anderson_stat'] == pytest.approx(ad_stat, rel=1e-6), name
+        assert row['anderson_p'] == pytest.approx(ad_p, rel=1e-5, abs=1e-300), name
+
+def test_several_group_columns():
+    frame, _ = grouped_sample(4)
+    frame['Half'] = np.arange(len(frame)) % 2
+    result = normality_batch(frame, 'Amount', ['Group', 'Half'])
+    values = frame.loc[(frame['Group'] == 'skewed') & (frame['Half'] == 1), 'Amount'].to_numpy()
+    row = result.loc[('skewed', 1)]
+    assert row['dagostino_stat'] == pytest.approx(stats.normaltest(values).statistic, rel=1e-8)
+    assert row['anderson_stat'] == pytest.approx(anderson_statistic(values), rel=1e-10)
+
+def test_small_groups_have_no_dagostino():
+    frame = pd.DataFrame({'Amount': np.arange(7, dtype=float) ** 2, 'Group': 'a'})
+    row = normality_batch(frame, 'Amount', 'Group').loc['a']
+    assert np.isnan(row['dagostino_stat']) and np.isnan(row['dagostino_p'])
+    assert row['jarque_bera_stat'] == pytest.approx(stats.jarque_bera(frame['Amount']).statistic)
+
+def test_anderson_darling_single_group():
+    values = np.random.default_rng(5).gamma(4, 2, 1000)
+    statistic, p_value = anderson_darling_normal(values)
+    expected = normal_ad(values)
+    assert statistic[0] == pytest.approx(anderson_statistic(values), rel=1e-10)
+    assert statistic[0] == pytest.approx(expected[0], rel=1e-6)
+    assert p_value[0] == pytest.approx(expected[1], rel=1e-5, abs=1e-300)
@@ -0,0 +1,120 @@
+"""
+compare_monthly / compare_daily lag alignment against a lookup of the same period one lag
+earlier, and the rollup cache of load_rollup.
+"""
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import write_sales_db, generate_sales
+from data_processing import data_cleaning
+from data_processing.period_comparison import compare_monthly, compare_daily, load_rollup, _cached_rollup
+from data_processing.rollups import DAILY_ROLLUP, MONTHLY_ROLLUP
+from data_processing.sales_store import SALES_KEY
+
+def expected_row(totals, period, group, previous_period, first_period):
+    """value, previous (NaN before the first period, 0 for a period without sales) and percent change"""
+    value = totals.get((period, group), 0)
+    previous = np.nan if previous_period < first_period else totals.get((previous_period, group), 0)
+    pct = (value - previous) / abs(previous) * 100 if previous else np.nan
+    return value, previous, pct
+
+def check(result, totals, periods, groups, lags, previous_of, group_column = 'Unit'):
+    assert len(result) == len(periods) * len(groups)
+    for row in result.to_dict('records'):
+        group = row.get(group_column, 'all')
+        for name, lag in lags.items():
+            value, previous, pct = expected_row(totals, row['Period'], group, previous_of(row['Period'], lag), periods[0])
+            assert row['Amount'] == value
+            np.testing.assert_equal(row[f'{name}_Previous'], previous, err_msg= f"{row['Period']} {group} {name}")
+            np.testing.assert_equal(row[f'{name}_Change'], value - previous)
+            np.testing.assert_allclose(row[f'{name}_Pct'], pct)
+
+@pytest.fixture
+def monthly():
+    rng = np.random.default_rng(0)
+    rows = [(year, month, unit, int(rng.integers(-50, 5000)))
+            for year in [2022, 2023, 2024] for month in range(1, 13) for unit in ['元', '點']]
+    frame = pd.DataFrame(rows, columns= ['Year', 'Month', 'Unit', 'Amount'])
+    # months without any sales, one unit missing in others, and a zero month
+    frame = frame[~((frame['Year'] == 2023) & frame['Month'].isin([2, 3]))]
+    frame = frame[~((frame['Year'] == 2022) & (frame['Month'] == 7) & (frame['Unit'] == '點'))]
+    frame.loc[(frame['Year'] == 2024) & (frame['Month'] == 5), 'Amount'] = 0
+    # starts in March 2022, ends in October 2024
+    frame = frame[(frame['Year'] * 12 + frame['Month'] >= 2022 * 12 + 3) & (frame['Year'] * 12 + frame['Month'] <= 2024 * 12 + 10)]
+    return frame.sample(frac=1, random_state=0)
+
+def months_before(period, lag):
+    return period - pd.DateOffset(months= lag)
+
+def test_compare_monthly(monthly):
+    result = compare_monthly(monthly, by= ['Unit'])
+    result['Period'] = pd.to_datetime(pd.DataFrame({'year': result['Year'], 'month': result['Month'], 'day': 1}))
+    totals = {(pd.Timestamp(year, month, 1), unit): amount for year, month, unit, amount in monthly.itertuples(index=False)}
+    periods = pd.date_range('2022-03-01', '2024-10-01', freq='MS')
+    check(result, totals, periods, ['元', '點'], {'MoM': 1, 'YoY': 12}, months_before)
+    # the missing months are in the calendar, with 0
+    assert (result.loc[(result['Year'] == 2023) & (result['Month'] == 2), 'Amount'] == 0).all()
+
+def test_compare_monthly_store_total(monthly):
+    result = compare_monthly(monthly, by= [])
+    result['Period'] = pd.to_datetime(pd.DataFrame({'year': result['Year'], 'month': result['Month'], 'day': 1}))
+    totals = {(pd.Timestamp(year, month, 1), 'all'): amount
+              for (year, month), amount in monthly.groupby(['Year', 'Month'])['Amount'].sum().items()}
+    periods = pd.date_range('2022-03-01', '2024-10-01', freq='MS')
+    check(result, totals, periods, ['all'], {'MoM': 1, 'YoY': 12}, months_before)
+
+def test_compare_daily_same_weekday_last_year():
+    rng = np.random.default_rng(1)
+    dates = pd.date_range('2023-01-01', '2024-12-31')
+    daily = pd.DataFrame({'Date': np.repeat(dates, 2), 'Unit': np.tile(['元', '點'], len(dates)),
+                          'Amount': rng.integers(0, 3000, 2 * len(dates))})
+    # a week without sales and single days without one of the units
+    daily = daily[~daily['Date'].between('2023-08-07', '2023-08-13')]
+    daily = daily.drop(index= rng.choice(daily.index, 40, replace=False))
+    result = compare_daily(daily, by= ['Unit']).rename(columns= {'Date': 'Period'})
+    totals = {(date, unit): amount for date, unit, amount in daily.itertuples(index=False)}
+    days_before = lambda period, lag: period - pd.Timedelta(days= lag)
+    check(result, totals, dates, ['元', '點'], {'DoD': 1, 'WoW': 7, 'SWLY': 364}, days_before)
+    swly = result[result['Period'] >= '2024-01-01']
+    assert (swly['Period'].dt.weekday == (swly['Period'] - pd.Timedelta(days=364)).dt.weekday).all()
+    # the first year has nothing to compare with
+    assert result.loc[result['Period'] < '2023-12-31', 'SWLY_Previous'].isna().all()
+
+def test_lag_longer_than_history():
+    monthly = pd.DataFrame({'Year': 2024, 'Month': [1, 2, 3], 'Unit': '元', 'Amount': [1, 2, 3]})
+    result = compare_monthly(monthly)
+    assert result['YoY_Previous'].isna().all()
+    assert result['MoM_Previous'].tolist()[1:] == [1, 2]
+
+def add_sales(db_path, rows, start, seed):
+    df = generate_sales(rows, start= start, days= 3, seed= seed)
+    df['Time'] = df['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    conn = sqlite3.connect(db_path)
+    df[SALES_KEY].to_sql('sales_data', conn, if_exists='append', index=False)
+    conn.commit()
+    conn.close()
+
+def test_rollup_cache_follows_the_database(tmp_path, monkeypatch):
+    _cached_rollup.cache_clear()
+    db_path = tmp_path / 'database.db'
+    write_sales_db(db_path, 1000, start= '2024-01-01', days= 20, seed= 2)
+    data_cleaning.main(str(db_path), export= False)
+    first = load_rollup(db_path, MONTHLY_ROLLUP)
+    # relative and absolute paths share the cached frame
+    monkeypatch.chdir(tmp_path)
+    assert load_rollup('database.db', MONTHLY_ROLLUP) is first
+    assert load_rollup(db_path, DAILY_ROLLUP) is not first
+    assert _cached_rollup.cache_info().misses == 2
+
+    # an incremental clean appends rows, a full rebuild changes the schema version
+    add_sales(db_path, 200, '2024-02-01', seed= 3)
+    data_cleaning.main(str(db_path), export= False)
+    second = load_rollup(db_path, MONTHLY_ROLLUP)
+    assert second is not first
+    assert second['Transactions'].sum() == first['Transactions'].sum() + 200
+    assert load_rollup(db_path, MONTHLY_ROLLUP) is second
+    data_cleaning.main(str(db_path), full_rebuild= True, export= False)
+    third = load_rollup(db_path, MONTHLY_ROLLUP)
+    assert third is not second
+    pd.testing.assert_frame_equal(third, second)
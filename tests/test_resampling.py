@@ -0,0 +1,112 @@
+"""
+stats.resampling against scipy.stats.permutation_test / bootstrap and direct computation.
+"""
+import numpy as np
+import pytest
+from scipy import stats
+from stats import resampling
+from stats.resampling import observed_statistics, resample, resampling_tests, STATISTICS
+
+def direct_statistics(x, y):
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    pooled_sd = np.sqrt(((len(x) - 1) * x.var(ddof=1) + (len(y) - 1) * y.var(ddof=1)) / (len(x) + len(y) - 2))
+    greater = (x[:, None] > y[None, :]).mean()
+    less = (x[:, None] < y[None, :]).mean()
+    return {
+        'mean_diff': x.mean() - y.mean(),
+        'median_diff': np.median(x) - np.median(y),
+        'cohens_d': (x.mean() - y.mean()) / pooled_sd,
+        'cliffs_delta': greater - less,
+    }
+
+def samples(seed, n1 = 40, n2 = 55, ties = False):
+    rng = np.random.default_rng(seed)
+    x, y = rng.normal(1.3, 1, n1), rng.normal(1, 1.2, n2)
+    if ties:
+        # daily sales in whole tens
+        x, y = np.round(x * 3) * 10, np.round(y * 3) * 10
+    return x, y
+
+# a sample of one has no variance, so cohens_d is left out there
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+@pytest.mark.parametrize('ties', [False, True])
+@pytest.mark.parametrize('sizes', [(40, 55), (7, 3), (1, 4)])
+def test_observed_statistics(sizes, ties):
+    x, y = samples(0, *sizes, ties= ties)
+    result = observed_statistics(x, y)
+    expected = direct_statistics(x, y)
+    for name in ['mean_diff', 'median_diff', 'cliffs_delta'] + (['cohens_d'] if min(sizes) > 1 else []):
+        assert result[name] == pytest.approx(expected[name], rel=1e-12, abs=1e-12), name
+
+@pytest.mark.parametrize('kind', ['permutation', 'bootstrap'])
+@pytest.mark.parametrize('ties', [False, True])
+def test_resamples_match_direct_computation(kind, ties):
+    # rebuild each resample from the same generator draws and compute its statistics directly
+    x, y = samples(1, 12, 9, ties= ties)
+    result = resample(kind, x, y, n_resamples= 50, seed= 3, workers= 1)
+    x, y = np.sort(x), np.sort(y)
+    pooled = np.sort(np.concatenate([x, y]))
+    # same draws as _resample_block, in the same order
+    rng = np.random.default_rng(np.random.SeedSequence(3).spawn(1)[0])
+    if kind == 'permutation':
+        subsets = resampling._draw_subsets(rng, len(pooled), len(y), 50)
+    else:
+        x_index, y_index = rng.integers(0, len(x), size= (50, len(x))), rng.integers(0, len(y), size= (50, len(y)))
+    for i in range(50):
+        if kind == 'permutation':
+            chosen = np.zeros(len(pooled), dtype=bool)
+            chosen[subsets[i]] = True
+            resample_x, resample_y = pooled[~chosen], pooled[chosen]
+        else:
+            resample_x, resample_y = x[x_index[i]], y[y_index[i]]
+        expected = direct_statistics(resample_x, resample_y)
+        for name in STATISTICS:
+            assert result[name][i] == pytest.approx(expected[name], rel=1e-9, abs=1e-12), (name, i)
+
+@pytest.mark.parametrize('alternative', ['greater', 'less', 'two-sided'])
+@pytest.mark.parametrize('name', ['mean_diff', 'median_diff', 'cliffs_delta'])
+def test_permutation_p_value_matches_scipy(name, alternative):
+    # C(13, 6) = 1716 splits: scipy runs the exact test
+    x, y = samples(2, 6, 7, ties= True)
+    ours = resampling_tests(x, y, [name], n_resamples= 20000, alternative= alternative, seed= 4, workers= 1)
+    statistic = lambda a, b: observed_statistics(a, b, [name])[name]
+    if alternative == 'two-sided':
+        # ours counts |resample| >= |observed|; scipy doubles the smaller one-sided p-value instead
+        exact = stats.permutation_test((x, y), lambda a, b: abs(statistic(a, b)), permutation_type='independent',
+                                       n_resamples= np.inf, alternative= 'greater')
+    else:
+        exact = stats.permutation_test((x, y), statistic, permutation_type='independent', n_resamples= np.inf,
+                                       alternative= alternative)
+    assert abs(ours.loc[name, 'observed']) == pytest.approx(abs(exact.statistic))
+    # Monte Carlo estimate of the exact p-value, within about 4 standard errors
+    assert ours.loc[name, 'p_value'] == pytest.approx(exact.pvalue, abs= 4 * np.sqrt(0.25 / 20000) + 1e-3)
+
+@pytest.mark.parametrize('name', ['median_diff', 'mean_diff'])
+def test_bootstrap_ci_matches_scipy(name):
+    x, y = samples(5, 80, 60)
+    ours = resampling_tests(x, y, [name], n_resamples= 20000, seed= 6, workers= 1)
+    statistic = {'median_diff': lambda a, b, axis: np.median(a, axis=axis) - np.median(b, axis=axis),
+                 'mean_diff': lambda a, b, axis: np.mean(a, axis=axis) - np.mean(b, axis=axis)}[name]
+    ci = stats.bootstrap((x, y), statistic, n_resamples= 20000, method='percentile', confidence_level= 0.95,
+                         rng= np.random.default_rng(7)).confidence_interval
+    width = ci.high - ci.low
+    assert ours.loc[name, 'ci_low'] == pytest.approx(ci.low, abs= 0.05 * width)
+    assert ours.loc[name, 'ci_high'] == pytest.approx(ci.high, abs= 0.05 * width)
+
+@pytest.mark.parametrize('kind', ['permutation', 'bootstrap'])
+def test_results_do_not_depend_on_workers(kind, monkeypatch):
+    # small blocks, so 2000 resamples make 20 blocks spread over the workers
+    monkeypatch.setattr(resampling, 'BLOCK_ELEMENTS', 100 * 95)
+    x, y = samples(8)
+    single = resample(kind, x, y, n_resamples= 2000, seed= 9, workers= 1)
+    for workers in [2, 3]:
+        parallel = resample(kind, x, y, n_resamples= 2000, seed= 9, workers= workers)
+        for name in STATISTICS:
+            np.testing.assert_array_equal(parallel[name], single[name])
+    assert all(len(values) == 2000 for values in single.values())
+    other_seed = resample(kind, x, y, n_resamples= 2000, seed= 10, workers= 1)
+    assert not np.array_equal(other_seed['mean_diff'], single['mean_diff'])
+
+def test_unknown_statistic():
+    with pytest.raises(ValueError):
+        observed_statistics([1, 2], [3, 4], ['variance_ratio'])
@@ -0,0 +1,51 @@
+"""
+rolling_stats against pandas .rolling, with NaN values and short windows.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.rolling import rolling_stats, complete_calendar
+
+STATS = ('sum', 'mean', 'std')
+
+def expected(values, window, stat, min_periods=None):
+    return getattr(values.rolling(window, min_periods= min_periods), stat)().to_numpy()
+
+def test_nan_is_skipped():
+    values = pd.Series([1, np.nan, 2, 3, 4])
+    result = rolling_stats(values, 2)
+    np.testing.assert_allclose(result['mean_2'], [np.nan, np.nan, np.nan, 2.5, 3.5])
+    result = rolling_stats(values, 2, min_periods= 1)
+    np.testing.assert_allclose(result['mean_2'], [1, 1, 2, 2.5, 3.5])
+
+@pytest.mark.parametrize('min_periods', [None, 1, 2])
+@pytest.mark.parametrize('seed', range(3))
+def test_matches_pandas(seed, min_periods):
+    rng = np.random.default_rng(seed)
+    values = pd.Series(rng.normal(1000, 50, 200))
+    values[rng.random(200) < 0.2] = np.nan
+    windows = [2, 3, 7, 30] if min_periods == 2 else [1, 2, 3, 7, 30]
+    result = rolling_stats(values, windows, STATS, min_periods= min_periods)
+    for window in windows:
+        for stat in STATS:
+            np.testing.assert_allclose(result[f'{stat}_{window}'], expected(values, window, stat, min_periods),
+                                       rtol=1e-9, atol=1e-6, err_msg=f'{stat}_{window}')
+
+def test_std_needs_two_values():
+    values = pd.Series([5.0, 5.0, 7.0])
+    result = rolling_stats(values, [1, 2], ('std',))
+    assert result['std_1'].isna().all()
+    np.testing.assert_allclose(result['std_2'], [np.nan, 0, np.sqrt(2)])
+
+def test_empty_and_all_nan():
+    assert rolling_stats(pd.Series([], dtype=float), 3).empty
+    assert rolling_stats(pd.Series([np.nan] * 4), 2, STATS).isna().all().all()
+
+def test_unknown_stat():
+    with pytest.raises(ValueError):
+        rolling_stats(pd.Series([1.0, 2.0]), 2, ('median',))
+
+def test_complete_calendar_fills_gaps():
+    values = pd.Series([1, 2], index= pd.to_datetime(['2024-01-01', '2024-01-04']))
+    filled = complete_calendar(values)
+    assert filled.tolist() == [1, 0, 0, 2]
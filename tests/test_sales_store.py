@@ -0,0 +1,85 @@
+"""
+sales_data natural key: the Seq backfill of create_sales_table and the INSERT OR IGNORE
+writes of SalesWriter.
+"""
+import sqlite3
+import pandas as pd
+import pytest
+from data_processing.sales_store import create_sales_table, SalesWriter, SALES_COLUMNS, DONE
+
+# two identical coin washes in the same minute, then one paid in points, on two days
+DAY = pd.DataFrame([
+    ('2024-01-05 10:15:00', '【01上】洗脫烘(中)', '投幣', '60元'),
+    ('2024-01-05 10:15:00', '【01上】洗脫烘(中)', '投幣', '60元'),
+    ('2024-01-05 10:15:00', '【01上】洗脫烘(中)', '會員儲值', '60點'),
+    ('2024-01-05 11:02:00', '販賣機', '投幣', '20元'),
+    ('2024-01-05 11:02:00', '販賣機', '投幣', '20元'),
+    ('2024-01-05 11:02:00', '販賣機', '投幣', '20元'),
+], columns= SALES_COLUMNS)
+
+def day(date):
+    df = DAY.copy()
+    df['Time'] = pd.to_datetime(df['Time'].str.replace('2024-01-05', date))
+    return df
+
+def rows(conn):
+    return conn.execute("SELECT Time, Equipment, Channel, Amount, Seq FROM sales_data ORDER BY rowid").fetchall()
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'database.db')
+    yield conn
+    conn.close()
+
+def test_seq_backfill_keeps_identical_rows(conn):
+    # a table from before Seq existed, written by to_sql, days interleaved
+    legacy = pd.concat([day('2024-01-05'), day('2024-01-06')]).sample(frac=1, random_state=0)
+    legacy['Time'] = legacy['Time'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    legacy.to_sql('sales_data', conn, index=False)
+    before = conn.execute("SELECT rowid, Time, Equipment, Channel, Amount FROM sales_data ORDER BY rowid").fetchall()
+
+    create_sales_table(conn)
+    # every row survives, identical ones are numbered 0, 1, 2 ... in rowid order
+    after = conn.execute("SELECT rowid, Time, Equipment, Channel, Amount, Seq FROM sales_data ORDER BY rowid").fetchall()
+    assert [row[:5] for row in after] == before
+    seen = {}
+    for row in after:
+        assert row[5] == seen.get(row[1:5], 0)
+        seen[row[1:5]] = row[5] + 1
+    assert max(row[5] for row in after) == 2
+    assert conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0] == 12
+    # the unique key index is in place and a second call changes nothing
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_sales_data_key'").fetchone()
+    create_sales_table(conn)
+    assert conn.execute("SELECT rowid, Time, Equipment, Channel, Amount, Seq FROM sales_data ORDER BY rowid").fetchall() == after
+
+def test_scraping_a_day_again_is_a_no_op(conn):
+    with SalesWriter(conn) as writer:
+        writer.add('2024/01/05', day('2024-01-05'))
+        writer.add('2024/01/06', day('2024-01-06'))
+    stored = rows(conn)
+    assert len(stored) == 12 and writer.saved_rows == 12
+
+    # a crashed run scrapes the same day again
+    with SalesWriter(conn) as writer:
+        writer.add('2024/01/05', day('2024-01-05'))
+    assert writer.saved_rows == 0
+    assert rows(conn) == stored
+    assert conn.execute("SELECT State, Rows, Attempts FROM scrape_progress WHERE Date = '2024/01/05'").fetchone() == (DONE, 6, 2)
+
+def test_only_new_identical_transactions_are_added(conn):
+    with SalesWriter(conn) as writer:
+        writer.add('2024/01/05', day('2024-01-05'))
+    # the page now shows a third identical coin wash in the same minute
+    grown = pd.concat([day('2024-01-05').iloc[:1], day('2024-01-05')], ignore_index=True)
+    with SalesWriter(conn) as writer:
+        writer.add('2024/01/05', grown)
+    assert writer.saved_rows == 1
+    washes = conn.execute("SELECT Seq FROM sales_data WHERE Equipment = '【01上】洗脫烘(中)' AND Channel = '投幣' ORDER BY Seq").fetchall()
+    assert washes == [(0,), (1,), (2,)]
+
+def test_unique_key_rejects_plain_duplicates(conn):
+    create_sales_table(conn)
+    conn.execute("INSERT INTO sales_data VALUES ('2024-01-05 10:15:00', '販賣機', '投幣', '20元', 0)")
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO sales_data VALUES ('2024-01-05 10:15:00', '販賣機', '投幣', '20元', 0)")
@@ -0,0 +1,88 @@
+"""
+scrape_progress states of the HTTP backend against the replay server: a month whose
+query fails ends as failed and is fetched again, only a month the site shows as empty is done.
+The mock site answers the HTTP backend like the recordings of the same sales.
+"""
+import json
+import sqlite3
+import pytest
+from benchmarks.synthetic_data import write_sales_db, generate_sales
+from data_processing.http_collection import HttpCollector, record_response, DEFAULT_QUERY_PATH
+from data_processing.mock_revenue_server import serve, write_recordings_from_db
+from data_processing.mock_revenue_site import serve_site
+from data_processing.sales_store import connect_db, load_done_dates, SalesWriter, DONE, FAILED
+
+YEAR_MONTHS = [(2024, 1), (2024, 2), (2024, 3)]
+
+@pytest.fixture
+def recordings(tmp_path):
+    source = tmp_path / 'source.db'
+    # January and February 2024
+    write_sales_db(source, 300, start= '2024-01-01', days= 60, seed= 2)
+    record_dir = tmp_path / 'recordings'
+    write_recordings_from_db(source, record_dir)
+    # the site answers March with an empty grid
+    record_response(record_dir, DEFAULT_QUERY_PATH, {'startDate': '2024/03/01', 'endDate': '2024/03/31'}, {'rows': []})
+    conn = sqlite3.connect(source)
+    rows = conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0]
+    conn.close()
+    return record_dir, rows
+
+def collect(db_path, server, year_months):
+    collector = HttpCollector(f"http://127.0.0.1:{server.server_port}/login", workers= 2)
+    collector.login('mock', 'mock')
+    conn = connect_db(db_path)
+    try:
+        with SalesWriter(conn) as writer:
+            collector.collect(writer, load_done_dates(conn), year_months, retries= 1, backoff= 0)
+        return dict(conn.execute("SELECT Date, State FROM scrape_progress").fetchall())
+    finally:
+        conn.close()
+
+def test_failed_month_is_not_done(recordings, tmp_path):
+    record_dir, rows = recordings
+    db_path = tmp_path / 'database.db'
+    # February's month query is answered with 404 until its recording is back
+    index_path = record_dir / 'index.json'
+    index = index_path.read_text()
+    february_key = next(key for key in json.loads(index) if 'startDate=2024%2F02%2F01' in key)
+    index_path.write_text(index.replace(february_key, 'unavailable'))
+    server = serve(record_dir)
+    try:
+        states = collect(db_path, server, YEAR_MONTHS)
+    finally:
+        server.shutdown()
+    assert {states[f'2024/02/{day:02d}'] for day in range(1, 30)} == {FAILED}
+    assert {states[f'2024/01/{day:02d}'] for day in range(1, 32)} == {DONE}
+    assert {states[f'2024/03/{day:02d}'] for day in range(1, 32)} == {DONE}
+
+    # failed days are fetched again on the next run
+    index_path.write_text(index)
+    server = serve(record_dir)
+    try:
+        states = collect(db_path, server, YEAR_MONTHS)
+    finally:
+        server.shutdown()
+    assert set(states.values()) == {DONE}
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM sales_data").fetchone()[0] == rows
+    assert conn.execute("SELECT SUM(Rows) FROM scrape_progress WHERE Date LIKE '2024/03/%'").fetchone()[0] == 0
+    conn.close()
+
+def test_site_answers_like_its_recordings(tmp_path):
+    sales = generate_sales(300, start= '2024-01-01', days= 60, seed= 2)
+    source = tmp_path / 'source.db'
+    write_sales_db(source, 300, start= '2024-01-01', days= 60, seed= 2)
+    write_recordings_from_db(source, tmp_path / 'recordings')
+    stored = {}
+    for name, server in [('site', serve_site(sales)), ('recordings', serve(tmp_path / 'recordings'))]:
+        try:
+            states = collect(tmp_path / f'{name}.db', server, YEAR_MONTHS[:2])
+        finally:
+            server.shutdown()
+        assert set(states.values()) == {DONE}
+        conn = sqlite3.connect(tmp_path / f'{name}.db')
+        stored[name] = conn.execute("SELECT Time, Equipment, Channel, Amount, Seq FROM sales_data ORDER BY rowid").fetchall()
+        conn.close()
+    assert len(stored['site']) == len(sales)
+    assert stored['site'] == stored['recordings']
@@ -0,0 +1,107 @@
+"""
+util.time_select against the loop-based implementations it replaced.
+"""
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil import parser
+from util.time_select import (get_all_dates, iter_dates, date_range_array, format_dates, to_day,
+                              get_first_and_last_dates, get_month_dates, month_bounds, get_all_year_months)
+
+def get_all_dates_loop(start_date, end_date):
+    # the implementation before numpy, with end_date given explicitly
+    today = datetime.today()
+    if isinstance(start_date, str):
+        start_date = parser.parse(start_date)
+    if isinstance(end_date, str):
+        end_date = parser.parse(end_date)
+    if end_date > today:
+        end_date = today
+    date_list = []
+    current_date = start_date
+    while current_date <= end_date:
+        date_list.append(current_date.strftime("%Y/%m/%d"))
+        current_date += timedelta(days=1)
+    return date_list
+
+def get_first_and_last_dates_loop(year, month):
+    first_date = datetime(year, month, 1)
+    if month == 12:
+        last_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        last_date = datetime(year, month + 1, 1) - timedelta(days=1)
+    return first_date.strftime("%Y/%m/%d"), last_date.strftime("%Y/%m/%d")
+
+def get_all_year_months_loop(start_year, start_month, end_year=None, end_month=None):
+    current_year, current_month = start_year, start_month
+    year_months = []
+    if end_year is None or end_month is None:
+        current_date = datetime.today()
+        if end_year is None:
+            end_year = current_date.year
+        if end_month is None:
+            end_month = current_date.month
+    while (current_year < end_year) or (current_year == end_year and current_month <= end_month):
+        year_months.append((current_year, current_month))
+        if current_month == 12:
+            current_year += 1
+            current_month = 1
+        else:
+            current_month += 1
+    return year_months
+
+RANGES = [
+    ('2023/10/30', '2023/11/05'),
+    ('2023-10-30', '2023-11-05'),
+    ('2019/12/25', '2020/03/02'),       # leap day
+    ('2023/02/27', '2023/03/01'),
+    ('2024/01/01', '2024/01/01'),       # one day
+    ('2024/01/05', '2024/01/01'),       # end before start
+    ('Oct 30 2023', '5 Nov 2023'),      # parsed by dateutil
+    (datetime(2023, 9, 1), datetime(2024, 9, 1)),
+    ('2020/01/01', '2030/12/31'),       # past today
+]
+
+@pytest.mark.parametrize('start_date, end_date', RANGES)
+def test_get_all_dates_matches_loop(start_date, end_date):
+    expected = get_all_dates_loop(start_date, end_date)
+    assert get_all_dates(start_date, end_date) == expected
+    assert list(iter_dates(start_date, end_date, chunk_days= 30)) == expected
+    assert format_dates(date_range_array(start_date, end_date)).tolist() == expected
+
+def test_default_end_is_today():
+    today = datetime.today().strftime("%Y/%m/%d")
+    assert get_all_dates(datetime.today() - timedelta(days=3))[-1] == today
+    assert get_all_dates("2023/09/01") == get_all_dates_loop(datetime(2023, 9, 1), datetime.today())
+
+def test_end_day_is_included_whatever_the_time():
+    # the loop counted days from 12:00, so it stopped at 11/04; whole days include 11/05
+    start, end = datetime(2023, 10, 30, 12), datetime(2023, 11, 5, 9)
+    assert get_all_dates_loop(start, end)[-1] == '2023/11/04'
+    assert get_all_dates(start, end)[-1] == '2023/11/05'
+    assert get_all_dates(start, end) == get_all_dates('2023/10/30', '2023/11/05')
+
+@pytest.mark.parametrize('value', ['2023/10/30', '2023-10-30', '30 Oct 2023', datetime(2023, 10, 30, 23, 59),
+                                   date(2023, 10, 30), pd.Timestamp('2023-10-30 08:00'), np.datetime64('2023-10-30T08:00')])
+def test_to_day(value):
+    assert to_day(value) == np.datetime64('2023-10-30', 'D')
+
+def test_months_match_loop():
+    today = datetime.today().strftime("%Y/%m/%d")
+    for year in range(2019, 2031):
+        for month in range(1, 13):
+            first, last = get_first_and_last_dates_loop(year, month)
+            assert get_first_and_last_dates(year, month) == (first, last)
+            # get_month_dates also has the days after today, which the loop stops at
+            month_dates = get_month_dates(year, month)
+            assert month_dates[0] == first and month_dates[-1] == last
+            assert [day for day in month_dates if day <= today] == get_all_dates_loop(first, last)
+    firsts, lasts = month_bounds(2019, 1, 2030, 12)
+    assert list(zip(format_dates(firsts).tolist(), format_dates(lasts).tolist())) == \
+        [get_first_and_last_dates_loop(year, month) for year in range(2019, 2031) for month in range(1, 13)]
+
+@pytest.mark.parametrize('args', [(2023, 4, 2024, 2), (2023, 11, 2023, 11), (2024, 3, 2023, 12), (2019, 1, 2030, 12),
+                                  (2023, 9), (2023, 9, 2025), (2023, 9, None, 6)])
+def test_get_all_year_months_matches_loop(args):
+    assert get_all_year_months(*args) == get_all_year_months_loop(*args)
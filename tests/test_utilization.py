@@ -0,0 +1,130 @@
+"""
+occupancy_intervals, hourly_busy_fraction and peak_concurrency against a brute-force
+minute-by-minute occupancy grid.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing.utilization import (occupancy_intervals, hourly_busy_fraction, peak_concurrency,
+                                         cycle_seconds, CYCLE_MINUTES)
+
+START = pd.Timestamp('2024-01-01')
+DAYS = 3
+# machine -> (Equipment_Category, Wash_Scale)
+MACHINES = {
+    '01': ('wash', 'medium'),
+    '02': ('wash', 'medium'),
+    '03': ('wash', 'large'),
+    '08': ('dry', 'large'),
+    '09': ('dry', np.nan),      # scale missing, falls back to ('dry', None)
+    '10': ('dry', 'large'),
+    '11': ('others', np.nan),   # vending machine, never occupied
+}
+
+def transactions(seed):
+    rng = np.random.default_rng(seed)
+    machine = rng.choice(list(MACHINES), 250)
+    minute = rng.integers(0, DAYS * 1440 - 200, 250)
+    amount = np.where(rng.random(250) < 0.05, -60, 60)
+    rows = list(zip(machine, minute, amount))
+    rows += [
+        ('01', 100, 60), ('01', 100, 20),       # same cycle paid in 元 and 點
+        ('01', 130, 60),                        # overlaps the cycle above
+        ('02', 300, 60), ('02', 360, 60),       # back to back: 300 + 60
+        ('08', 1420, 30), ('08', 1460, 30),     # back to back across midnight
+        ('03', 500, -70),                       # refund, no cycle
+        (None, 700, 60),                        # no machine
+    ]
+    frame = pd.DataFrame(rows, columns= ['Equipment_ID', 'Minute', 'Amount'])
+    frame['Time'] = START + pd.to_timedelta(frame.pop('Minute'), unit='min')
+    frame['Equipment_Category'] = frame['Equipment_ID'].map(lambda m: MACHINES[m][0] if isinstance(m, str) else np.nan)
+    frame['Wash_Scale'] = frame['Equipment_ID'].map(lambda m: MACHINES[m][1] if isinstance(m, str) else np.nan)
+    return frame.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def minute_grid(frame):
+    """machine -> boolean occupancy of every minute"""
+    grid = {}
+    for row in frame.itertuples():
+        if not isinstance(row.Equipment_ID, str) or row.Amount <= 0:
+            continue
+        minutes = CYCLE_MINUTES.get((row.Equipment_Category, row.Wash_Scale if isinstance(row.Wash_Scale, str) else None))
+        if minutes is None:
+            continue
+        occupied = grid.setdefault(row.Equipment_ID, np.zeros((DAYS + 1) * 1440, dtype=bool))
+        first = int((row.Time - START) / pd.Timedelta(minutes=1))
+        occupied[first:first + minutes] = True
+    return grid
+
+def runs(occupied):
+    edges = np.diff(np.r_[0, occupied.astype(int), 0])
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+@pytest.mark.parametrize('seed', range(3))
+def test_intervals_are_the_occupied_minutes(seed):
+    frame = transactions(seed)
+    grid = minute_grid(frame)
+    intervals = occupancy_intervals(frame)
+    start_minute = int(START.timestamp()) // 60
+    for machine, occupied in grid.items():
+        rows = intervals[intervals['Equipment_ID'] == machine]
+        found = list(zip(rows['Start'] // 60 - start_minute, rows['End'] // 60 - start_minute))
+        assert found == runs(occupied), machine
+        assert (rows['Equipment_Category'] == MACHINES[machine][0]).all()
+    assert set(intervals['Equipment_ID']) == set(grid)
+
+def test_back_to_back_and_overlapping_cycles_merge():
+    frame = pd.DataFrame([
+        ('01', 100, 60), ('01', 100, 20), ('01', 130, 60),    # 100-160, 130-190
+        ('02', 300, 60), ('02', 360, 60),                     # 300-360, 360-420
+        ('02', 421, 60),                                      # a minute later: a new interval
+        ('08', 1420, 30), ('08', 1460, 30),                   # 1420-1460, 1460-1500
+        ('10', 1440, 30),                                     # another dryer, same time
+    ], columns= ['Equipment_ID', 'Minute', 'Amount'])
+    frame['Time'] = START + pd.to_timedelta(frame.pop('Minute'), unit='min')
+    frame['Equipment_Category'] = frame['Equipment_ID'].map(lambda m: MACHINES[m][0])
+    frame['Wash_Scale'] = frame['Equipment_ID'].map(lambda m: MACHINES[m][1])
+    intervals = occupancy_intervals(frame)
+    start_minute = int(START.timestamp()) // 60
+    found = list(zip(intervals['Equipment_ID'], intervals['Start'] // 60 - start_minute, intervals['End'] // 60 - start_minute))
+    assert found == [('01', 100, 190), ('02', 300, 420), ('02', 421, 481), ('08', 1420, 1500), ('10', 1440, 1480)]
+    # the two dryers overlap from 00:00 to 00:20 on the second day, the washers never
+    peak = peak_concurrency(intervals, days= DAYS)
+    assert peak[('dry', 'Peak')].tolist() == [2] + [0] * 22 + [1]
+    assert peak[('wash', 'Peak')].max() == 1
+
+@pytest.mark.parametrize('seed', range(3))
+def test_hourly_busy_fraction(seed):
+    frame = transactions(seed)
+    grid = minute_grid(frame)
+    result = hourly_busy_fraction(occupancy_intervals(frame), days= DAYS)
+    for machine, occupied in grid.items():
+        busy_minutes = occupied.reshape(-1, 60).sum(axis=1)
+        expected = np.bincount(np.arange(len(busy_minutes)) % 24, weights= busy_minutes, minlength=24) / (DAYS * 60)
+        np.testing.assert_allclose(result.loc[machine].to_numpy(), expected, err_msg= machine)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_peak_concurrency(seed):
+    frame = transactions(seed)
+    grid = minute_grid(frame)
+    result = peak_concurrency(occupancy_intervals(frame), days= DAYS)
+    for category in ['wash', 'dry']:
+        running = sum(occupied.astype(int) for machine, occupied in grid.items() if MACHINES[machine][0] == category)
+        by_hour = running.reshape(-1, 60)
+        peak = np.zeros(24, dtype=int)
+        np.maximum.at(peak, np.arange(len(by_hour)) % 24, by_hour.max(axis=1))
+        np.testing.assert_array_equal(result[(category, 'Peak')].to_numpy(), peak, err_msg= category)
+        mean = np.bincount(np.arange(len(by_hour)) % 24, weights= by_hour.sum(axis=1), minlength=24) / (DAYS * 60)
+        np.testing.assert_allclose(result[(category, 'Mean')].to_numpy(), mean, err_msg= category)
+    assert set(result.columns.get_level_values(0)) == {'wash', 'dry'}
+
+def test_cycle_seconds_fallback():
+    category = pd.Series(['wash', 'wash', 'dry', 'others', np.nan])
+    scale = pd.Series(['large', 'small', np.nan, np.nan, 'large'])
+    np.testing.assert_array_equal(cycle_seconds(category, scale), [70 * 60, 60 * 60, 40 * 60, np.nan, np.nan])
+
+def test_no_intervals():
+    frame = transactions(0)
+    intervals = occupancy_intervals(frame[frame['Equipment_Category'] == 'others'])
+    assert len(intervals) == 0
+    assert hourly_busy_fraction(intervals).empty
+    assert peak_concurrency(intervals).empty
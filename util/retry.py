@@ -0,0 +1,27 @@
+
+import time
+
+def with_retries(action, description: str, retries: int = 3, backoff: float = 2.0):
+    """
+    Call action(), retrying a failure after backoff, 2 * backoff, 4 * backoff ... seconds.
+
+    Args
+    ------
+    - action (callable): Function without arguments to call.
+    - description (str): What is being tried, for the retry message.
+    - retries (int): How many times to retry before re-raising the last error.
+    - backoff (float): Seconds to wait before the first retry.
+
+    Returns
+    ------
+    - The return value of action().
+    """
+    for attempt in range(retries + 1):
+        try:
+            return action()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f"Retrying {description} in {delay:.0f}s after: {e}")
+            time.sleep(delay)
@@ -1,19 +1,80 @@
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
 from dateutil import parser
 
-def get_all_dates(start_date: datetime = datetime(2023,9,1), end_date: datetime = datetime.today()) -> list:
+def to_day(value) -> np.datetime64:
+    """
+    Convert a datetime, date, numpy/pandas timestamp or date string to np.datetime64[D].
+    ISO-like strings ("2023/10/30", "2023-10-30") are converted directly, anything else
+    is parsed with dateutil.
+    """
+    if isinstance(value, str):
+        try:
+            return np.datetime64(value.replace('/', '-'), 'D')
+        except ValueError:
+            value = parser.parse(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+def date_range_array(start_date = datetime(2023,9,1), end_date = None) -> np.ndarray:
+    """
+    Every day from start_date to end_date (inclusive, at most today) as a datetime64[D] array.
+    Only the day of a datetime counts, its time of day is ignored.
+
+    Args
+    ------
+    - start_date: The start date of the range, see to_day.
+    - end_date: The end date of the range; None (the default) means today, evaluated at call time.
+
+    Example usage
+    ------
+    >>> days = date_range_array("2023/10/30", "2023/11/05")
+    >>> days.astype(str)
+    """
+    today = np.datetime64(datetime.today().date(), 'D')
+    end = today if end_date is None else min(to_day(end_date), today)
+    return np.arange(to_day(start_date), end + 1, dtype='datetime64[D]')
+
+def format_dates(days: np.ndarray) -> np.ndarray:
+    """
+    datetime64[D] array -> array of "YYYY/MM/DD" strings, without a per-day strftime
+    """
+    strings = np.datetime_as_string(days, unit='D').astype('U10')
+    # overwrite the two '-' separators of "YYYY-MM-DD" in place
+    strings.view('U1').reshape(len(strings), 10)[:, [4, 7]] = '/'
+    return strings
+
+def iter_dates(start_date = datetime(2023,9,1), end_date = None, chunk_days: int = 366):
+    """
+    Yield the "YYYY/MM/DD" strings of get_all_dates one by one, formatting them a chunk
+    at a time, so scanning a long span never holds the whole list.
+    """
+    today = np.datetime64(datetime.today().date(), 'D')
+    end = today if end_date is None else min(to_day(end_date), today)
+    chunk_start = to_day(start_date)
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + chunk_days - 1, end)
+        yield from format_dates(np.arange(chunk_start, chunk_end + 1, dtype='datetime64[D]')).tolist()
+        chunk_start = chunk_end + 1
+
+def get_all_dates(start_date: datetime = datetime(2023,9,1), end_date: datetime = None) -> list:
     """
     Generate a list of date strings within the specified date range.
 
     Args
     ------
     - start_date (datetime): The start date of the range.
-    - end_date (datetime): The end date of the range.
+    - end_date (datetime): The end date of the range. Defaults to today, evaluated when called.
 
     Returns
     ------
     - list: A list of date strings in the format "YYYY/MM/DD" within the specified date range.
+      The range is in whole days, so end_date's day is included whatever the times of day are.
+      (Before, the days were counted from start_date's time of day, and the last day was
+      dropped when end_date had an earlier time, e.g. 10/30 12:00 to 11/05 09:00 stopped at 11/04.)
 
     Example usage
     ------
@@ -25,29 +86,12 @@ def get_all_dates(start_date: datetime = datetime(2023,9,1), end_date: datetime
     >>> date_range2 = get_all_dates("2023/10/30", "2023/11/05")
     >>> print(date_range2)
     """
-    today = datetime.today()
-    # Parse start_date and end_date if they are provided as strings
-    if isinstance(start_date, str):
-        start_date = parser.parse(start_date)
-    if isinstance(end_date, str):
-        end_date = parser.parse(end_date)
-    if end_date > today:
-        end_date = today
-    # Create an empty list to store the date strings
-    date_list = []
-
-    # Iterate through the date range and add each day to the list
-    current_date = start_date
-    while current_date <= end_date:
-        formatted_date = current_date.strftime("%Y/%m/%d")
-        date_list.append(formatted_date)
-        current_date += timedelta(days=1)
-
-    return date_list
+    return format_dates(date_range_array(start_date, end_date)).tolist()
 
+@lru_cache(maxsize=None)
 def get_first_and_last_dates(year: int, month:int) -> tuple:
     """
-    Get the first and last dates of a specified year and month.
+    Get the first and last dates of a specified year and month (memoized).
 
     Args
     ------
@@ -66,13 +110,40 @@ def get_first_and_last_dates(year: int, month:int) -> tuple:
     >>> print("First Date:", first_date)
     >>> print("Last Date:", last_date)
     """
-    first_date = datetime(year, month, 1)
-    if month == 12:
-        last_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        last_date = datetime(year, month + 1, 1) - timedelta(days=1)
-    
-    return first_date.strftime("%Y/%m/%d"), last_date.strftime("%Y/%m/%d")
+    first_date = np.datetime64(f"{year:04d}-{month:02d}", 'M')
+    bounds = np.array([first_date.astype('datetime64[D]'), (first_date + 1).astype('datetime64[D]') - 1])
+    first, last = format_dates(bounds).tolist()
+    return first, last
+
+@lru_cache(maxsize=None)
+def get_month_dates(year: int, month: int) -> tuple:
+    """
+    Every "YYYY/MM/DD" day of the month, also days after today (memoized).
+    """
+    first_date = np.datetime64(f"{year:04d}-{month:02d}", 'M')
+    days = np.arange(first_date.astype('datetime64[D]'), (first_date + 1).astype('datetime64[D]'), dtype='datetime64[D]')
+    return tuple(format_dates(days).tolist())
+
+def month_bounds(start_year: int, start_month: int, end_year: int = None, end_month: int = None) -> tuple:
+    """
+    First and last days (datetime64[D] arrays) of every month in the range, in one shot.
+    end_year / end_month default to the current year / month.
+
+    Example usage
+    ------
+    >>> firsts, lasts = month_bounds(2023, 11, 2024, 2)
+    >>> format_dates(lasts)
+    """
+    months = _month_range(start_year, start_month, end_year, end_month)
+    return months.astype('datetime64[D]'), (months + 1).astype('datetime64[D]') - 1
+
+def _month_range(start_year, start_month, end_year = None, end_month = None) -> np.ndarray:
+    today = datetime.today()
+    end_year = today.year if end_year is None else end_year
+    end_month = today.month if end_month is None else end_month
+    start = np.datetime64(f"{start_year:04d}-{start_month:02d}", 'M')
+    end = np.datetime64(f"{end_year:04d}-{end_month:02d}", 'M')
+    return np.arange(start, end + 1, dtype='datetime64[M]')
 
 def get_all_year_months(start_year, start_month, end_year=None, end_month=None):
     """
@@ -98,24 +169,5 @@ def get_all_year_months(start_year, start_month, end_year=None, end_month=None):
     >>> year_months_range = get_all_year_months(start_year, start_month, end_year, end_month)
     >>> print(year_months_range)
     """
-    current_year = start_year
-    current_month = start_month
-    year_months = []
-
-    if end_year is None or end_month is None:
-        current_date = datetime.today()
-        if end_year is None:
-            end_year = current_date.year
-        if end_month is None:
-            end_month = current_date.month
-
-    while (current_year < end_year) or (current_year == end_year and current_month <= end_month):
-        year_months.append((current_year, current_month))
-        
-        if current_month == 12:
-            current_year += 1
-            current_month = 1
-        else:
-            current_month += 1
-
-    return year_months
\ No newline at end of file
+    months = _month_range(start_year, start_month, end_year, end_month).astype(np.int64)
+    return list(zip((months // 12 + 1970).tolist(), (months % 12 + 1).tolist()))